@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+_LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def measure(module: str) -> Dict[str, Any]:
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    modules: List[Dict[str, Any]] = []
+    for line in completed.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append(
+                {"module": name, "self_us": int(self_us), "cumulative_us": int(cumulative_us), "depth": len(indent) // 2}
+            )
+    total_us = next((entry["cumulative_us"] for entry in reversed(modules) if entry["module"] == module), 0)
+    return {"module": module, "import_ms": round(total_us / 1000, 2), "process_ms": round(wall_ms, 2), "modules": modules}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure cold import time of server and pipeline modules")
+    parser.add_argument(
+        "modules",
+        nargs="*",
+        default=["services.mcp_server.main", "src.pipelines.stock_pipeline", "services.mcp_server.model_router"],
+    )
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    report = []
+    for module in args.modules:
+        runs = [measure(module) for _ in range(args.repeat)]
+        best = min(runs, key=lambda run: run["import_ms"])
+        top = sorted(best["modules"], key=lambda entry: entry["self_us"], reverse=True)[: args.top]
+        report.append(
+            {
+                "module": module,
+                "import_ms": best["import_ms"],
+                "process_ms": best["process_ms"],
+                "slowest_modules": [{key: entry[key] for key in ("module", "self_us", "cumulative_us")} for entry in top],
+            }
+        )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
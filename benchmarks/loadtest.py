@@ -0,0 +1,406 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.synthetic import make_analysis_packet, make_watchlist
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+MOCK_MODEL_ID = "cluster:mock"
+DEFAULT_MIX = "query=5,analysis=3,status=1,run=1"
+
+
+# -- mock model endpoint -----------------------------------------------------
+
+
+class MockModelHandler(BaseHTTPRequestHandler):
+    latency_ms = 50.0
+    error_rate = 0.0
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.latency_ms / 1000)
+        if random.random() < self.error_rate:
+            self.send_error(503, "injected failure")
+            return
+        payload = json.dumps(
+            {
+                "responses": [
+                    {"text": "Mock answer.", "usage": {"prompt_tokens": 100, "completion_tokens": 20}}
+                    for _ in body.get("requests", [])
+                ]
+            }
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *_args: Any) -> None:
+        pass
+
+
+def start_mock_model(latency_ms: float, error_rate: float) -> Tuple[ThreadingHTTPServer, str]:
+    MockModelHandler.latency_ms = latency_ms
+    MockModelHandler.error_rate = error_rate
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockModelHandler)
+    threading.Thread(target=server.serve_forever, name="mock-model", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/generate"
+
+
+# -- server process ----------------------------------------------------------
+
+
+def serve(port: int, provider_latency_ms: float, cpu_affinity: Optional[int]) -> None:
+    # Runs inside the child process: slow down the offline data providers, then serve the app.
+    import uvicorn
+
+    from src.tools import placeholder_tools
+
+    if cpu_affinity and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, sorted(os.sched_getaffinity(0))[:cpu_affinity])
+    if provider_latency_ms > 0:
+        for name in dir(placeholder_tools):
+            if name.startswith("fetch_"):
+                setattr(placeholder_tools, name, _delayed(getattr(placeholder_tools, name), provider_latency_ms))
+    uvicorn.run("services.mcp_server.main:app", host="127.0.0.1", port=port, log_level="warning")
+
+
+def _delayed(fn: Callable[..., Any], latency_ms: float) -> Callable[..., Any]:
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        time.sleep(latency_ms / 1000)
+        return fn(*args, **kwargs)
+
+    wrapper.__name__ = fn.__name__
+    return wrapper
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _rss_mib(pid: int) -> Optional[float]:
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def seed_runs(runs_dir: Path, tickers: List[str]) -> Dict[str, str]:
+    from src.core.storage.local_storage import LocalStorage
+    from src.core.storage.run_index import RunIndex
+
+    storage = LocalStorage(str(runs_dir), fsync_policy="never")
+    index = RunIndex(str(runs_dir / "run_index.json"), fsync_policy="never")
+    run_ids = {}
+    for ticker in tickers:
+        run_id = f"{ticker.lower()}seed"
+        base = f"{ticker}/2024-01-01/{run_id}"
+        packet = make_analysis_packet(ticker=ticker, articles=100, posts=100).model_dump()
+        index.put(
+            ticker,
+            "2024-01-01",
+            run_id,
+            {
+                "run_id": run_id,
+                "status": "approved",
+                "approved": True,
+                "model_id": MOCK_MODEL_ID,
+                "created_at": "2024-01-01T12:00:00",
+                "report_s3_path": storage.write_text(f"{base}/report/final_report.md", f"# {ticker}\n\nCash runway is 14 months."),
+                "analysis_packet_s3_path": storage.write_json(f"{base}/parsed/analysis_packet.json", packet),
+                "citations_map_s3_path": None,
+            },
+        )
+        run_ids[ticker] = run_id
+    return run_ids
+
+
+# -- load generator ----------------------------------------------------------
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in REQUESTS:
+            raise ValueError(f"Unknown request type {name!r}; expected one of {sorted(REQUESTS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def _run(client: httpx.Client, ticker: str, run_ids: Dict[str, str]) -> httpx.Response:
+    return client.post("/v1/run", json={"ticker": ticker, "as_of_date": "2024-01-02", "model_id": MOCK_MODEL_ID})
+
+
+def _query(client: httpx.Client, ticker: str, run_ids: Dict[str, str]) -> httpx.Response:
+    return client.post(
+        "/v1/query", json={"ticker": ticker, "query_text": "How long is the cash runway?", "model_id": MOCK_MODEL_ID}
+    )
+
+
+def _analysis(client: httpx.Client, ticker: str, run_ids: Dict[str, str]) -> httpx.Response:
+    return client.get(f"/v1/analysis/{ticker}", headers={"Accept-Encoding": "gzip"})
+
+
+def _status(client: httpx.Client, ticker: str, run_ids: Dict[str, str]) -> httpx.Response:
+    return client.get(f"/v1/run/{run_ids[ticker]}")
+
+
+REQUESTS: Dict[str, Callable[[httpx.Client, str, Dict[str, str]], httpx.Response]] = {
+    "run": _run,
+    "query": _query,
+    "analysis": _analysis,
+    "status": _status,
+}
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 3)
+
+
+def summarize(samples: List[Tuple[str, float, bool]], elapsed_s: float) -> Dict[str, Any]:
+    by_type: Dict[str, Any] = {}
+    for kind in sorted({kind for kind, _, _ in samples}):
+        latencies = sorted(latency for name, latency, _ in samples if name == kind)
+        errors = sum(1 for name, _, ok in samples if name == kind and not ok)
+        by_type[kind] = {
+            "count": len(latencies),
+            "errors": errors,
+            "error_rate": round(errors / len(latencies), 4),
+            "p50_ms": _percentile(latencies, 0.50),
+            "p90_ms": _percentile(latencies, 0.90),
+            "p99_ms": _percentile(latencies, 0.99),
+            "max_ms": round(latencies[-1], 3),
+        }
+    errors = sum(1 for _, _, ok in samples if not ok)
+    return {
+        "requests": len(samples),
+        "elapsed_s": round(elapsed_s, 3),
+        "throughput_rps": round(len(samples) / elapsed_s, 2) if elapsed_s else 0.0,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "by_type": by_type,
+    }
+
+
+def generate_load(
+    base_url: str,
+    mix: Dict[str, float],
+    rate: float,
+    duration_s: float,
+    concurrency: int,
+    tickers: List[str],
+    run_ids: Dict[str, str],
+    seed: int = 7,
+    timeout_s: float = 30.0,
+) -> Tuple[List[Tuple[str, float, bool]], float]:
+    rng = random.Random(seed)
+    kinds, weights = zip(*mix.items())
+    samples: List[Tuple[str, float, bool]] = []
+    lock = threading.Lock()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    with httpx.Client(base_url=base_url, timeout=timeout_s, limits=limits) as client:
+
+        def fire(kind: str, ticker: str, scheduled: float) -> None:
+            try:
+                ok = REQUESTS[kind](client, ticker, run_ids).status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            # Measured from the scheduled arrival so queueing in the generator counts as latency.
+            latency_ms = (time.perf_counter() - scheduled) * 1000
+            with lock:
+                samples.append((kind, latency_ms, ok))
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            # Open-loop Poisson arrivals at the requested rate.
+            arrival = start
+            while arrival - start < duration_s:
+                delay = arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(fire, rng.choices(kinds, weights)[0], rng.choice(tickers), arrival)
+                arrival += rng.expovariate(rate)
+        elapsed = time.perf_counter() - start
+    return samples, elapsed
+
+
+def run_loadtest(
+    mix: str = DEFAULT_MIX,
+    rate: float = 20.0,
+    duration_s: float = 30.0,
+    concurrency: int = 32,
+    tickers: int = 20,
+    model_latency_ms: float = 50.0,
+    model_error_rate: float = 0.0,
+    provider_latency_ms: float = 0.0,
+    cpu_affinity: Optional[int] = None,
+    memory_limit_mib: float = 512.0,
+    sample_interval_s: float = 1.0,
+) -> Dict[str, Any]:
+    mix_weights = parse_mix(mix)
+    watchlist = make_watchlist(tickers)
+    model_server, model_endpoint = start_mock_model(model_latency_ms, model_error_rate)
+    with tempfile.TemporaryDirectory(prefix="stock-load-") as tmp:
+        runs_dir = Path(tmp) / "runs"
+        run_ids = seed_runs(runs_dir, watchlist)
+        registry_path = Path(tmp) / "models.yaml"
+        registry_path.write_text(
+            f"models:\n"
+            f"  - model_id: public:gpt-x\n    type: public\n    endpoint: http://127.0.0.1:9/unused\n    max_tokens: 4096\n"
+            f"  - model_id: {MOCK_MODEL_ID}\n    type: cluster\n    endpoint: {model_endpoint}\n    max_tokens: 4096\n",
+            encoding="utf-8",
+        )
+        port = _free_port()
+        env = {
+            **os.environ,
+            "STOCK_RUNS_DIR": str(runs_dir),
+            "STOCK_MODEL_REGISTRY_PATH": str(registry_path),
+            "STOCK_DEFAULT_MODEL_ID": MOCK_MODEL_ID,
+            "STOCK_LOG_LEVEL": "WARNING",
+        }
+        command = [sys.executable, "-m", "benchmarks.loadtest", "serve", "--port", str(port)]
+        command += ["--provider-latency-ms", str(provider_latency_ms)]
+        if cpu_affinity:
+            command += ["--cpu-affinity", str(cpu_affinity)]
+        process = subprocess.Popen(command, cwd=PROJECT_ROOT, env=env)
+        base_url = f"http://127.0.0.1:{port}"
+        memory: List[Tuple[float, float]] = []
+        stop = threading.Event()
+        try:
+            _wait_healthy(base_url, process)
+
+            def sample_memory() -> None:
+                began = time.perf_counter()
+                while True:
+                    rss = _rss_mib(process.pid)
+                    if rss is not None:
+                        memory.append((round(time.perf_counter() - began, 2), round(rss, 2)))
+                    if stop.wait(sample_interval_s):
+                        break
+
+            sampler = threading.Thread(target=sample_memory, name="rss-sampler", daemon=True)
+            sampler.start()
+            samples, elapsed = generate_load(
+                base_url, mix_weights, rate, duration_s, concurrency, watchlist, run_ids
+            )
+            stop.set()
+            sampler.join()
+        finally:
+            stop.set()
+            process.terminate()
+            process.wait(timeout=10)
+            model_server.shutdown()
+
+    report = summarize(samples, elapsed)
+    report["config"] = {
+        "mix": mix_weights,
+        "rate_rps": rate,
+        "duration_s": duration_s,
+        "concurrency": concurrency,
+        "tickers": tickers,
+        "model_latency_ms": model_latency_ms,
+        "model_error_rate": model_error_rate,
+        "provider_latency_ms": provider_latency_ms,
+        "cpu_affinity": cpu_affinity,
+    }
+    report["memory"] = _memory_report(memory, memory_limit_mib)
+    return report
+
+
+def _wait_healthy(base_url: str, process: subprocess.Popen, timeout_s: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited during startup with code {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/healthz", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("Server did not become healthy in time")
+
+
+def _memory_report(samples: List[Tuple[float, float]], limit_mib: float) -> Dict[str, Any]:
+    if not samples:
+        return {"samples": [], "limit_mib": limit_mib}
+    values = [rss for _, rss in samples]
+    return {
+        "start_mib": values[0],
+        "end_mib": values[-1],
+        "peak_mib": max(values),
+        "growth_mib": round(values[-1] - values[0], 2),
+        "limit_mib": limit_mib,
+        "headroom_mib": round(limit_mib - max(values), 2),
+        "samples": samples,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline load test of the MCP server with mock providers and model")
+    subparsers = parser.add_subparsers(dest="command")
+
+    serve_parser = subparsers.add_parser("serve", help="Run the server with delayed mock providers (used internally)")
+    serve_parser.add_argument("--port", type=int, required=True)
+    serve_parser.add_argument("--provider-latency-ms", type=float, default=0.0)
+    serve_parser.add_argument("--cpu-affinity", type=int, default=None)
+
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted request mix, e.g. query=5,analysis=3,status=1,run=1")
+    parser.add_argument("--rate", type=float, default=20.0, help="Mean arrival rate in requests per second")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--tickers", type=int, default=20)
+    parser.add_argument("--model-latency-ms", type=float, default=50.0)
+    parser.add_argument("--model-error-rate", type=float, default=0.0)
+    parser.add_argument("--provider-latency-ms", type=float, default=0.0)
+    parser.add_argument("--cpu-affinity", type=int, default=None, help="Pin the server to this many CPUs")
+    parser.add_argument("--memory-limit-mib", type=float, default=512.0, help="Task memory limit (stack.py: 512)")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.port, args.provider_latency_ms, args.cpu_affinity)
+        return
+    report = run_loadtest(
+        mix=args.mix,
+        rate=args.rate,
+        duration_s=args.duration,
+        concurrency=args.concurrency,
+        tickers=args.tickers,
+        model_latency_ms=args.model_latency_ms,
+        model_error_rate=args.model_error_rate,
+        provider_latency_ms=args.provider_latency_ms,
+        cpu_affinity=args.cpu_affinity,
+        memory_limit_mib=args.memory_limit_mib,
+    )
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Any, Dict, List
+
+from benchmarks.synthetic import make_packet_dump
+from src.core.storage import serialization
+from src.core.storage.serialization import Serializer, decode
+
+
+def _time(fn: Any, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def available_serializers() -> List[Serializer]:
+    serializers = [Serializer("json"), Serializer("compact")]
+    if serialization.msgpack is not None:
+        serializers.append(Serializer("msgpack"))
+    if serialization.zstandard is not None:
+        serializers.append(Serializer("compact", "zstd"))
+        if serialization.msgpack is not None:
+            serializers.append(Serializer("msgpack", "zstd"))
+    return serializers
+
+
+def run(articles: int, posts: int, repeat: int) -> List[Dict[str, Any]]:
+    payload = make_packet_dump(articles=articles, posts=posts)
+    results = []
+    for serializer in available_serializers():
+        body = serializer.encode(payload)
+        decode(body)
+        results.append(
+            {
+                "format": serializer.format,
+                "compression": serializer.compression,
+                "bytes": len(body),
+                "encode_ms": round(_time(lambda: serializer.encode(payload), repeat) * 1000, 3),
+                "decode_ms": round(_time(lambda: decode(body), repeat) * 1000, 3),
+            }
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark artifact serializers on synthetic AnalysisPackets")
+    parser.add_argument("--articles", type=int, default=2000)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.articles, args.posts, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from benchmarks.synthetic import make_analysis_packet, make_run_index, make_watchlist
+from src.core.config import get_settings
+from src.core.schemas.models import NewsArticle, NewsBundle, SocialBundle, trusted, trusted_list
+from src.core.storage.local_storage import LocalStorage
+from src.core.storage.run_index import RunIndex
+from src.core.storage.serialization import Serializer
+
+SCALES: Dict[str, Dict[str, int]] = {
+    "quick": {"repeat": 3, "pipeline_runs": 3, "tickers": 20, "runs_per_ticker": 20, "articles": 200, "requests": 50},
+    "default": {"repeat": 7, "pipeline_runs": 10, "tickers": 200, "runs_per_ticker": 50, "articles": 2000, "requests": 400},
+}
+
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, Any]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, Any]:
+    ordered = sorted(samples_ms)
+    return {
+        "runs": len(ordered),
+        "min_ms": round(ordered[0], 4),
+        "median_ms": round(statistics.median(ordered), 4),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+        "mean_ms": round(statistics.fmean(ordered), 4),
+    }
+
+
+@contextmanager
+def _runs_dir() -> Iterator[Path]:
+    previous = os.environ.get("STOCK_RUNS_DIR")
+    with tempfile.TemporaryDirectory(prefix="stock-bench-") as tmp:
+        os.environ["STOCK_RUNS_DIR"] = tmp
+        get_settings.cache_clear()
+        try:
+            yield Path(tmp)
+        finally:
+            if previous is None:
+                os.environ.pop("STOCK_RUNS_DIR", None)
+            else:
+                os.environ["STOCK_RUNS_DIR"] = previous
+            get_settings.cache_clear()
+
+
+def bench_pipeline(scale: Dict[str, int]) -> Dict[str, Dict[str, Any]]:
+    from src.pipelines.stock_pipeline import run_pipeline
+
+    tickers = make_watchlist(scale["pipeline_runs"])
+    with _runs_dir():
+        samples = []
+        for ticker in tickers:
+            start = time.perf_counter()
+            run_pipeline(ticker=ticker, as_of_date=date(2024, 1, 1), mode="feeder", model_id="public:gpt-x")
+            samples.append((time.perf_counter() - start) * 1000)
+    return {"pipeline.run_pipeline": summarize(samples)}
+
+
+def bench_run_index(scale: Dict[str, int]) -> Dict[str, Dict[str, Any]]:
+    tickers = make_watchlist(scale["tickers"])
+    data = make_run_index(tickers, scale["runs_per_ticker"])
+    last_run_id = next(reversed(data[tickers[-1]].values()))["run_id"]
+    with tempfile.TemporaryDirectory(prefix="stock-bench-") as tmp:
+        path = Path(tmp) / "run_index.json"
+        path.write_text(json.dumps(data), encoding="utf-8")
+        index = RunIndex(str(path), fsync_policy="never")
+        counter = iter(range(10**9))
+        entry = next(iter(data[tickers[0]].values()))
+        return {
+            "run_index.put": measure(
+                lambda: index.put(tickers[0], "2030-01-01", f"bench{next(counter)}", entry), scale["repeat"]
+            ),
+            "run_index.latest_approved": measure(lambda: index.latest_approved(tickers[-1]), scale["repeat"]),
+            "run_index.find_by_run_id": measure(lambda: index.find_by_run_id(last_run_id), scale["repeat"]),
+        }
+
+
+def bench_storage(scale: Dict[str, int]) -> Dict[str, Dict[str, Any]]:
+    payload = make_analysis_packet(articles=scale["articles"], posts=scale["articles"]).model_dump()
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="stock-bench-") as tmp:
+        for policy in ("never", "batch", "always"):
+            storage = LocalStorage(str(Path(tmp) / policy), fsync_policy=policy)
+            counter = iter(range(10**9))
+
+            def write() -> None:
+                storage.write_json(f"ACME/2024-01-01/run{next(counter)}/parsed/analysis_packet.json", payload)
+                storage.flush()
+
+            results[f"storage.local_write_json[{policy}]"] = measure(write, scale["repeat"])
+    return results
+
+
+def bench_serialization(scale: Dict[str, int]) -> Dict[str, Dict[str, Any]]:
+    packet = make_analysis_packet(articles=scale["articles"], posts=scale["articles"])
+    payload = packet.model_dump()
+    results = {
+        "serialization.model_dump": measure(packet.model_dump, scale["repeat"]),
+        "serialization.model_dump_json": measure(packet.model_dump_json, scale["repeat"]),
+    }
+    for serializer in (Serializer("json"), Serializer("compact")):
+        results[f"serialization.encode[{serializer.format}]"] = measure(
+            lambda serializer=serializer: serializer.encode(payload), scale["repeat"]
+        )
+    return results
+
+
+def bench_models(scale: Dict[str, int]) -> Dict[str, Dict[str, Any]]:
+    # Per-packet cost of building the bulk collections (articles and notable
+    # posts) with validation versus the trusted path the tools use.
+    packet = make_analysis_packet(articles=scale["articles"], posts=scale["articles"])
+    articles = [article.model_dump() for article in packet.news.articles]
+    posts = packet.social.notable_posts
+
+    def validated() -> Any:
+        return (
+            NewsBundle(articles=[NewsArticle(**row) for row in articles]),
+            SocialBundle(notable_posts=posts),
+        )
+
+    def construct() -> Any:
+        return (
+            trusted(NewsBundle, articles=trusted_list(NewsArticle, articles)),
+            trusted(SocialBundle, notable_posts=posts),
+        )
+
+    results = {}
+    for name, build in (("models.validated", validated), ("models.trusted", construct)):
+        stats = measure(build, scale["repeat"])
+        cpu = []
+        for _ in range(scale["repeat"]):
+            start = time.process_time()
+            build()
+            cpu.append((time.process_time() - start) * 1000)
+        tracemalloc.start()
+        build()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = {**stats, "cpu_median_ms": round(statistics.median(cpu), 4), "peak_kib": round(peak / 1024, 1)}
+    return results
+
+
+def bench_server(scale: Dict[str, int], concurrency: int = 8) -> Dict[str, Dict[str, Any]]:
+    from fastapi.testclient import TestClient
+
+    with _runs_dir():
+        import services.mcp_server.main as main
+
+        main = importlib.reload(main)
+        storage = main.storage.get()
+        tickers = make_watchlist(min(scale["tickers"], 20))
+        run_ids = []
+        for ticker in tickers:
+            run_id = f"{ticker.lower()}run"
+            base = f"{ticker}/2024-01-01/{run_id}"
+            packet = make_analysis_packet(ticker=ticker, articles=50, posts=50).model_dump()
+            main.run_index.get().put(
+                ticker,
+                "2024-01-01",
+                run_id,
+                {
+                    "run_id": run_id,
+                    "status": "approved",
+                    "approved": True,
+                    "model_id": "public:gpt-x",
+                    "created_at": "2024-01-01T12:00:00",
+                    "report_s3_path": storage.write_text(f"{base}/report/final_report.md", f"# {ticker}\n\nReport."),
+                    "analysis_packet_s3_path": storage.write_json(f"{base}/parsed/analysis_packet.json", packet),
+                    "citations_map_s3_path": None,
+                },
+            )
+            run_ids.append(run_id)
+        storage.flush()
+        requests: List[Callable[[Any, int], Any]] = [
+            lambda client, i: client.get("/healthz"),
+            lambda client, i: client.get(f"/v1/run/{run_ids[i % len(run_ids)]}"),
+            lambda client, i: client.get(f"/v1/analysis/{tickers[i % len(tickers)]}"),
+            lambda client, i: client.post(
+                "/v1/query", json={"ticker": tickers[i % len(tickers)], "query_text": "What is the cash runway?"}
+            ),
+        ]
+        names = ["server.healthz", "server.get_run", "server.get_analysis", "server.query"]
+        results = {}
+        with TestClient(main.app) as client:
+            for name, request in zip(names, requests):
+                request(client, 0)
+
+                def timed(i: int, request: Callable[[Any, int], Any] = request) -> float:
+                    start = time.perf_counter()
+                    response = request(client, i)
+                    response.raise_for_status()
+                    return (time.perf_counter() - start) * 1000
+
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    samples = list(pool.map(timed, range(scale["requests"])))
+                elapsed = time.perf_counter() - start
+                results[name] = {**summarize(samples), "throughput_rps": round(len(samples) / elapsed, 2)}
+        main.router.get().close()
+        if main.registry.initialized:
+            main.registry.get().stop_watching()
+    return results
+
+
+BENCHMARKS: Dict[str, Callable[[Dict[str, int]], Dict[str, Dict[str, Any]]]] = {
+    "pipeline": bench_pipeline,
+    "run_index": bench_run_index,
+    "storage": bench_storage,
+    "serialization": bench_serialization,
+    "models": bench_models,
+    "server": bench_server,
+}
+
+
+def run(scale_name: str = "default", only: Optional[List[str]] = None) -> Dict[str, Any]:
+    scale = SCALES[scale_name]
+    results: Dict[str, Any] = {}
+    for name, bench in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        results.update(bench(scale))
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "scale": scale_name,
+        },
+        "results": results,
+    }
+
+
+def compare(
+    current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.15, metric: str = "median_ms"
+) -> List[Dict[str, Any]]:
+    rows = []
+    for name, stats in sorted(current["results"].items()):
+        before = baseline.get("results", {}).get(name)
+        if not before or not before.get(metric):
+            rows.append({"benchmark": name, "status": "new", metric: stats[metric]})
+            continue
+        change = (stats[metric] - before[metric]) / before[metric]
+        if change > threshold:
+            status = "regression"
+        elif change < -threshold:
+            status = "improvement"
+        else:
+            status = "unchanged"
+        rows.append(
+            {
+                "benchmark": name,
+                "status": status,
+                "baseline": before[metric],
+                "current": stats[metric],
+                "change": round(change, 4),
+            }
+        )
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark pipeline, storage and server hot paths")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="default")
+    parser.add_argument("--only", nargs="*", choices=sorted(BENCHMARKS), default=None)
+    parser.add_argument("--output", default=None, help="Write results JSON here (use as a later --baseline)")
+    parser.add_argument("--baseline", default=None, help="Compare against a saved results JSON")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Relative median slowdown flagged as regression")
+    args = parser.parse_args()
+
+    report = run(args.scale, args.only)
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        report["comparison"] = compare(report, baseline, args.threshold)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(json.dumps(report, indent=2))
+    if any(row["status"] == "regression" for row in report.get("comparison", [])):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import hashlib
+import random
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List
+
+from src.core.schemas.models import (
+    AnalysisPacket,
+    BoostersDowntrends,
+    ChecklistItemResult,
+    ChecklistResult,
+    DerivedMetrics,
+    Financials,
+    FinancialStatement,
+    FilingRef,
+    GuidanceClaims,
+    MarketSnapshot,
+    NewsArticle,
+    NewsBundle,
+    OwnershipSnapshot,
+    PersonaReview,
+    PersonaScore,
+    RunContext,
+    RunPaths,
+    SocialBundle,
+)
+
+WORDS = (
+    "revenue margin guidance backlog satellite launch contract dilution runway capex "
+    "spectrum partner regulatory approval quarter growth cash burn offering warrant "
+    "constellation coverage subscriber carrier agreement milestone delay risk upside"
+).split()
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _sha(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def _statement(rng: random.Random, items: int, period_end: date) -> FinancialStatement:
+    return FinancialStatement(
+        line_items={f"{rng.choice(WORDS)}_{index}": rng.uniform(-1e9, 1e9) for index in range(items)},
+        currency="USD",
+        period_start=period_end - timedelta(days=90),
+        period_end=period_end,
+    )
+
+
+def make_analysis_packet(
+    ticker: str = "ACME",
+    as_of_date: date = date(2024, 1, 1),
+    articles: int = 500,
+    posts: int = 500,
+    line_items: int = 200,
+    seed: int = 7,
+) -> AnalysisPacket:
+    rng = random.Random(seed)
+    run_id = _sha(f"{ticker}-{as_of_date}-{seed}")[:32]
+    base_path = f"{ticker}/{as_of_date}/{run_id}"
+    run_context = RunContext(
+        run_id=run_id,
+        ticker=ticker,
+        as_of_date=as_of_date,
+        created_at=datetime(as_of_date.year, as_of_date.month, as_of_date.day, 12, 0, 0),
+        mode="feeder",
+        model_id="public:gpt-x",
+        status="initialized",
+        paths=RunPaths(
+            base_path=base_path,
+            raw_path=f"{base_path}/raw",
+            parsed_path=f"{base_path}/parsed",
+            report_path=f"{base_path}/report",
+            trace_path=f"{base_path}/trace",
+        ),
+    )
+    news = NewsBundle(
+        articles=[
+            NewsArticle(
+                title=_sentence(rng, 8),
+                date=as_of_date - timedelta(days=rng.randint(0, 30)),
+                source=rng.choice(["wire", "blog", "newspaper", "press_release"]),
+                url=f"https://news.example.com/{ticker}/{index}",
+                snippet=_sentence(rng, 40),
+                sha256=_sha(f"{ticker}-article-{index}"),
+            )
+            for index in range(articles)
+        ]
+    )
+    social = SocialBundle(
+        themes=[_sentence(rng, 4) for _ in range(20)],
+        bull_cases=[_sentence(rng, 12) for _ in range(20)],
+        bear_cases=[_sentence(rng, 12) for _ in range(20)],
+        notable_posts=[
+            {
+                "platform": rng.choice(["reddit", "stocktwits", "x"]),
+                "author": f"user{rng.randint(0, 10_000)}",
+                "text": _sentence(rng, 30),
+                "score": rng.randint(0, 5000),
+                "posted_at": (as_of_date - timedelta(hours=rng.randint(0, 336))).isoformat(),
+            }
+            for _ in range(posts)
+        ],
+    )
+    return AnalysisPacket(
+        run_context=run_context,
+        filings=[
+            FilingRef(
+                form=form,
+                period_end=as_of_date - timedelta(days=30 * index),
+                filed_at=as_of_date - timedelta(days=30 * index - 20),
+                url=f"https://www.sec.gov/Archives/{ticker}/{form}/{index}",
+                sha256=_sha(f"{ticker}-{form}-{index}"),
+            )
+            for index, form in enumerate(["10-Q", "10-K", "8-K"] * 4)
+        ],
+        financials=Financials(
+            income_statement=_statement(rng, line_items, as_of_date),
+            balance_sheet=_statement(rng, line_items, as_of_date),
+            cash_flow=_statement(rng, line_items, as_of_date),
+            shares={"basic": rng.randint(1_000_000, 500_000_000), "diluted": rng.randint(1_000_000, 600_000_000)},
+            notes=[_sentence(rng, 20) for _ in range(10)],
+        ),
+        derived_metrics=DerivedMetrics(fcf=-1.2e8, cfo=-8e7, capex=4e7, burn_rate=1e7, runway_months_estimate=14.5),
+        guidance=GuidanceClaims(
+            guidance=[_sentence(rng, 15) for _ in range(10)],
+            management_claims=[_sentence(rng, 15) for _ in range(10)],
+        ),
+        market_snapshot=MarketSnapshot(
+            price=21.4, market_cap=5.6e9, high_52w=29.9, low_52w=2.1, returns={"1m": 0.12, "3m": -0.05, "1y": 3.4}
+        ),
+        ownership_snapshot=OwnershipSnapshot(
+            top_holders=[{"holder": f"Fund {index}", "pct": rng.uniform(0, 0.1)} for index in range(25)],
+            institutional_ownership=0.41,
+        ),
+        news=news,
+        social=social,
+        boosters_downtrends=BoostersDowntrends(
+            boosters=[_sentence(rng, 10) for _ in range(10)],
+            downtrends=[_sentence(rng, 10) for _ in range(10)],
+        ),
+        checklist=ChecklistResult(
+            results=[
+                ChecklistItemResult(check=f"check_{index}", score=rng.random(), evidence_refs=[f"news:{index}"])
+                for index in range(30)
+            ],
+            overall_score=0.62,
+        ),
+        persona_review=PersonaReview(
+            persona_scores=[
+                PersonaScore(persona=persona, score=rng.random(), issues=[_sentence(rng, 10)], asks=[_sentence(rng, 8)])
+                for persona in ["hf_pm", "sell_side", "trader", "credit"]
+            ],
+            approved=True,
+        ),
+        citations_map={f"news:{index}": f"https://news.example.com/{ticker}/{index}" for index in range(articles)},
+    )
+
+
+def make_packet_dump(**kwargs: Any) -> Dict[str, Any]:
+    return make_analysis_packet(**kwargs).model_dump()
+
+
+def make_watchlist(size: int = 50, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    tickers: List[str] = []
+    while len(tickers) < size:
+        ticker = "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(rng.randint(3, 4)))
+        if ticker not in tickers:
+            tickers.append(ticker)
+    return tickers
+
+
+def make_run_index(tickers: List[str], runs_per_ticker: int = 50, runs_dir: str = "runs", seed: int = 7) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    data: Dict[str, Any] = {}
+    start = date(2023, 1, 1)
+    for ticker in tickers:
+        entries = data.setdefault(ticker, {})
+        for index in range(runs_per_ticker):
+            as_of_date = start + timedelta(days=index)
+            run_id = _sha(f"{ticker}-{index}-{seed}")[:32]
+            approved = rng.random() < 0.3
+            base_path = f"{runs_dir}/{ticker}/{as_of_date}/{run_id}"
+            entries[f"{as_of_date}#{run_id}"] = {
+                "run_id": run_id,
+                "status": "approved" if approved else "blocked",
+                "approved": approved,
+                "model_id": "public:gpt-x",
+                "created_at": datetime(as_of_date.year, as_of_date.month, as_of_date.day, 12).isoformat(),
+                "report_s3_path": f"{base_path}/report/final_report.md",
+                "analysis_packet_s3_path": f"{base_path}/parsed/analysis_packet.json",
+                "citations_map_s3_path": f"{base_path}/report/citations_map.json",
+            }
+    return data
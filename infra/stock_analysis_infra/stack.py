@@ -89,6 +89,7 @@ class StockAnalysisStack(Stack):
             ),
             environment={
                 "RUNS_BUCKET": runs_bucket.bucket_name,
+                "STOCK_STORAGE_BACKEND": "s3",
             },
             command=cdk.Fn.split(" ", server_command.value_as_string),
         )
@@ -138,6 +139,7 @@ class StockAnalysisStack(Stack):
             ),
             environment={
                 "RUNS_BUCKET": runs_bucket.bucket_name,
+                "STOCK_STORAGE_BACKEND": "s3",
             },
             command=cdk.Fn.split(" ", pipeline_command.value_as_string),
         )
@@ -1,31 +1,165 @@
 from __future__ import annotations
 
 import argparse
+import logging
+import os
+import socket
+import time
 from datetime import date
+from typing import Any, Dict, Optional
 
+from src.core.config import get_settings
+from src.core.metrics import REGISTRY, WATCHLIST_TICKERS
+from src.core.queue.backend import LeaseKeeper, WorkQueue
+from src.core.queue.factory import create_queue
+from src.core.storage.factory import close_storage, create_run_index, get_storage
+from src.core.storage.run_index import RunIndex
+from src.pipelines.change_detection import carry_forward, plan_watchlist
+from src.pipelines.prefetch import ProviderCache
 from src.pipelines.stock_pipeline import run_pipeline
 
+logger = logging.getLogger(__name__)
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Run daily watchlist pipeline")
-    parser.add_argument("--tickers", nargs="+", required=True)
+    parser.add_argument(
+        "--queue-mode",
+        choices=["local", "enqueue", "worker"],
+        default="local",
+        help="local: run every ticker here; enqueue: add tickers to the work queue; worker: drain the work queue",
+    )
+    parser.add_argument("--tickers", nargs="+", default=[])
     parser.add_argument("--model-id", default="public:gpt-x")
     parser.add_argument("--as-of-date", default=str(date.today()))
     parser.add_argument("--max-iters", type=int, default=1)
-    return parser.parse_args()
+    parser.add_argument(
+        "--metrics-textfile",
+        default=None,
+        help="Write Prometheus metrics here after each ticker (node_exporter textfile collector)",
+    )
+    parser.add_argument("--force", action="store_true", help="Run every ticker, skipping change detection")
+    parser.add_argument(
+        "--price-move-threshold",
+        type=float,
+        default=0.05,
+        help="Relative price move since the last approved run that counts as a change",
+    )
+    parser.add_argument(
+        "--prefetch-batch-size",
+        type=int,
+        default=100,
+        help="Local mode: tickers per bulk market/ownership request (0 disables prefetch)",
+    )
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}:{os.getpid()}")
+    parser.add_argument("--lease-seconds", type=float, default=None, help="Defaults to STOCK_QUEUE_LEASE_SECONDS")
+    parser.add_argument(
+        "--wait",
+        type=float,
+        default=0.0,
+        help="Worker mode: keep polling an empty queue for this many seconds before exiting",
+    )
+    args = parser.parse_args()
+    if args.queue_mode != "worker" and not args.tickers:
+        parser.error("--tickers is required unless --queue-mode worker")
+    return args
+
+
+def process_ticker(
+    ticker: str,
+    as_of_date: date,
+    args: argparse.Namespace,
+    run_index: RunIndex,
+    provider_cache: Optional[ProviderCache] = None,
+) -> Dict[str, Any]:
+    # The change-detection pre-pass seeds the cache, so a changed ticker's run
+    # does not fetch the same filings, news and market data again.
+    provider_cache = provider_cache or ProviderCache()
+    if not args.force:
+        decision = plan_watchlist([ticker], run_index, args.price_move_threshold, provider_cache)[0]
+        if not decision.changed:
+            entry = carry_forward(run_index, decision, as_of_date)
+            print(f"{ticker}: carried forward ({entry['run_id']} from {entry['carried_forward_from']})")
+            return _processed(args, entry["run_id"], "carried_forward")
+    result = run_pipeline(
+        ticker=ticker,
+        as_of_date=as_of_date,
+        mode="feeder",
+        model_id=args.model_id,
+        max_iters=args.max_iters,
+        provider_cache=provider_cache,
+    )
+    print(f"{ticker}: {result['status']} ({result['run_id']})")
+    return _processed(args, result["run_id"], result["status"])
+
+
+def _processed(args: argparse.Namespace, run_id: str, status: str) -> Dict[str, Any]:
+    # Carried-forward tickers refresh the textfile too, so a day without any
+    # pipeline run does not leave yesterday's numbers in place.
+    WATCHLIST_TICKERS.inc(outcome=status)
+    if args.metrics_textfile:
+        REGISTRY.write_textfile(args.metrics_textfile)
+    return {"run_id": run_id, "status": status}
+
+
+def run_worker(args: argparse.Namespace, queue: WorkQueue, run_index: RunIndex, lease_seconds: float) -> int:
+    processed = 0
+    idle_since = time.monotonic()
+    while True:
+        lease = queue.claim(args.worker_id, lease_seconds)
+        if lease is None:
+            if time.monotonic() - idle_since >= args.wait:
+                return processed
+            time.sleep(min(1.0, max(0.05, args.wait / 10)))
+            continue
+        payload = lease.payload
+        result = None
+        with LeaseKeeper(queue, lease, lease_seconds) as keeper:
+            try:
+                result = process_ticker(payload["ticker"], date.fromisoformat(payload["as_of_date"]), args, run_index)
+                # run_pipeline returns before write-behind has persisted the run
+                # and published its index entry; completing the lease first
+                # would lose the run if this worker died in between.
+                get_storage().wait()
+            except Exception as exc:
+                logger.exception("Ticker %s failed (attempt %s)", payload["ticker"], lease.attempts)
+                queue.fail(lease, repr(exc))
+                result = None
+        if result is not None and not queue.complete(lease, result):
+            # The lease expired while we worked and another worker owns the task now.
+            logger.warning("Lease for %s lost before completion (lost=%s)", lease.key, keeper.lost.is_set())
+        processed += 1
+        idle_since = time.monotonic()
 
 
 def main() -> None:
     args = parse_args()
-    for ticker in args.tickers:
-        result = run_pipeline(
-            ticker=ticker,
-            as_of_date=date.fromisoformat(args.as_of_date),
-            mode="feeder",
-            model_id=args.model_id,
-            max_iters=args.max_iters,
-        )
-        print(f"{ticker}: {result['status']} ({result['run_id']})")
+    settings = get_settings()
+    run_index = create_run_index(settings, get_storage())
+    try:
+        if args.queue_mode == "local":
+            as_of_date = date.fromisoformat(args.as_of_date)
+            provider_cache = None
+            if args.prefetch_batch_size > 0:
+                provider_cache = ProviderCache(batch_size=args.prefetch_batch_size)
+                provider_cache.prefetch(args.tickers)
+            for ticker in args.tickers:
+                process_ticker(ticker, as_of_date, args, run_index, provider_cache)
+        elif args.queue_mode == "enqueue":
+            queue = create_queue(settings)
+            added = queue.enqueue(
+                [{"ticker": ticker.strip().upper(), "as_of_date": args.as_of_date} for ticker in args.tickers]
+            )
+            print(f"Enqueued {added} of {len(args.tickers)} tickers for {args.as_of_date}: {queue.stats()}")
+        else:
+            queue = create_queue(settings)
+            processed = run_worker(args, queue, run_index, args.lease_seconds or settings.queue_lease_seconds)
+            print(f"Worker {args.worker_id} processed {processed} tickers: {queue.stats()}")
+    finally:
+        close_storage()
+        # Every invocation replaces the textfile, even one that fails part way.
+        if args.metrics_textfile:
+            REGISTRY.write_textfile(args.metrics_textfile)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class BatcherClosedError(RuntimeError):
+    pass
+
+
+# Coalesces concurrent generate calls for one cluster model into batched POSTs.
+# The cluster endpoint receives {"requests": [...]} and must answer with
+# {"responses": [...]} in the same order.
+class MicroBatcher:
+    def __init__(
+        self,
+        endpoint: str,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        client: Optional[httpx.Client] = None,
+        timeout: float = 60.0,
+        on_stop: Optional[Callable[[], None]] = None,
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.endpoint = endpoint
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.timeout = timeout
+        self._client = client or httpx.Client(timeout=timeout)
+        self._owns_client = client is None
+        # Called from the worker once it has dispatched its last batch, i.e.
+        # once it no longer uses the client.
+        self._on_stop = on_stop
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        # Guards _closed so no request is queued behind _STOP, where the worker
+        # would never see it.
+        self._closed = False
+        self._closed_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name=f"batcher-{endpoint}", daemon=True)
+        self._thread.start()
+
+    def submit(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        future: Future = Future()
+        with self._closed_lock:
+            if self._closed:
+                raise BatcherClosedError(f"batcher for {self.endpoint} is closed")
+            self._queue.put((request, future))
+        return future.result(timeout=self.timeout)
+
+    def close(self) -> None:
+        with self._closed_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout=self.timeout)
+        if self._owns_client:
+            self._client.close()
+
+    def _run(self) -> None:
+        try:
+            self._loop()
+        finally:
+            if self._on_stop is not None:
+                self._on_stop()
+
+    def _loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._drain()
+                return
+            batch: List[Tuple[Dict[str, Any], Future]] = [item]
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._dispatch(batch)
+            if stop:
+                self._drain()
+                return
+
+    def _drain(self) -> None:
+        pending: List[Tuple[Dict[str, Any], Future]] = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                pending.append(item)
+        for start in range(0, len(pending), self.max_batch_size):
+            self._dispatch(pending[start:start + self.max_batch_size])
+
+    def _dispatch(self, batch: List[Tuple[Dict[str, Any], Future]]) -> None:
+        try:
+            response = self._client.post(self.endpoint, json={"requests": [request for request, _ in batch]})
+            response.raise_for_status()
+            results = response.json()["responses"]
+            if len(results) != len(batch):
+                raise ValueError(f"Cluster returned {len(results)} responses for {len(batch)} requests")
+        except Exception as exc:
+            logger.warning("Batch of %d requests to %s failed: %s", len(batch), self.endpoint, exc)
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.core.metrics import CACHE_REQUESTS
+from src.core.storage.artifacts import MEMBER_SEPARATOR, read_artifact
+from src.core.storage.serialization import decode
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4) if text else 0
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+@dataclass
+class Chunk:
+    chunk_id: str
+    text: str
+    tokens: int
+    term_counts: Counter = field(repr=False)
+    length: int = 0
+
+
+@dataclass
+class PackedContext:
+    text: str
+    chunks: List[Chunk]
+    tokens: int
+
+
+def flatten_json(payload: Any, prefix: str = "") -> Iterable[str]:
+    if isinstance(payload, dict):
+        for key, value in payload.items():
+            yield from flatten_json(value, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(payload, list):
+        if not payload:
+            return
+        for index, value in enumerate(payload):
+            yield from flatten_json(value, f"{prefix}[{index}]")
+    elif payload is not None and payload != "":
+        yield f"{prefix}: {payload}"
+
+
+def chunk_lines(source: str, lines: Iterable[str], max_chunk_tokens: int) -> List[Chunk]:
+    chunks: List[Chunk] = []
+    buffer: List[str] = []
+    buffer_tokens = 0
+
+    def emit() -> None:
+        text = "\n".join(buffer)
+        terms = tokenize(text)
+        chunks.append(
+            Chunk(
+                chunk_id=f"{source}#{len(chunks)}",
+                text=text,
+                tokens=estimate_tokens(text),
+                term_counts=Counter(terms),
+                length=len(terms),
+            )
+        )
+
+    for line in lines:
+        line_tokens = estimate_tokens(line)
+        if buffer and buffer_tokens + line_tokens > max_chunk_tokens:
+            emit()
+            buffer, buffer_tokens = [], 0
+        buffer.append(line)
+        buffer_tokens += line_tokens
+    if buffer:
+        emit()
+    return chunks
+
+
+def chunk_artifact(source: str, body: bytes, max_chunk_tokens: int) -> List[Chunk]:
+    try:
+        payload = decode(body)
+    except (ValueError, RuntimeError):
+        payload = None
+    if isinstance(payload, (dict, list)):
+        return chunk_lines(source, flatten_json(payload), max_chunk_tokens)
+    text = body.decode("utf-8", errors="replace")
+    paragraphs = [paragraph.strip() for paragraph in re.split(r"\n\s*\n", text) if paragraph.strip()]
+    return chunk_lines(source, paragraphs, max_chunk_tokens)
+
+
+def bm25_scores(query: str, chunks: List[Chunk], k1: float = 1.5, b: float = 0.75) -> List[float]:
+    terms = set(tokenize(query))
+    if not chunks or not terms:
+        return [0.0] * len(chunks)
+    average_length = sum(chunk.length for chunk in chunks) / len(chunks) or 1.0
+    document_frequency = {term: sum(1 for chunk in chunks if term in chunk.term_counts) for term in terms}
+    scores = []
+    for chunk in chunks:
+        score = 0.0
+        for term in terms:
+            frequency = chunk.term_counts.get(term, 0)
+            if not frequency:
+                continue
+            idf = math.log(1 + (len(chunks) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            score += idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * chunk.length / average_length))
+        scores.append(score)
+    return scores
+
+
+class ContextPacker:
+    def __init__(
+        self,
+        max_chunk_tokens: int = 256,
+        cache_size: int = 256,
+        reader: Optional[Callable[[str], bytes]] = None,
+    ) -> None:
+        self.max_chunk_tokens = max_chunk_tokens
+        self.cache_size = cache_size
+        # Reads refs that are not plain local files (S3 objects, archive members).
+        self.reader = reader or read_artifact
+        self._chunks: "OrderedDict[str, List[Chunk]]" = OrderedDict()
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}
+        self._lock = threading.Lock()
+
+    def chunks_for(self, ref: str) -> List[Chunk]:
+        remote = _remote(ref)
+        path = Path(ref)
+        try:
+            version = _ref_version(ref)
+        except OSError:
+            logger.warning("Skipping unreadable context ref: %s", ref)
+            return []
+        with self._lock:
+            known = self._hashes.get(ref)
+            if known and known[:2] == version and known[2] in self._chunks:
+                self._chunks.move_to_end(known[2])
+                CACHE_REQUESTS.inc(cache="context_chunks", result="hit")
+                return self._chunks[known[2]]
+        try:
+            body = self.reader(ref) if remote else path.read_bytes()
+        except OSError:
+            logger.warning("Skipping unreadable context ref: %s", ref)
+            return []
+        digest = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            self._hashes[ref] = (*version, digest)
+            chunks = self._chunks.get(digest)
+            CACHE_REQUESTS.inc(cache="context_chunks", result="miss" if chunks is None else "hit")
+            if chunks is None:
+                chunks = chunk_artifact(path.name, body, self.max_chunk_tokens)
+                self._chunks[digest] = chunks
+                while len(self._chunks) > self.cache_size:
+                    self._chunks.popitem(last=False)
+            self._chunks.move_to_end(digest)
+            return chunks
+
+    def prime(self, ref: str, digest: str, chunks: List[Chunk]) -> None:
+        # Serving snapshots hand in the chunks they persisted, so the first
+        # query after a restart does not re-read and re-chunk the artifacts.
+        try:
+            version = _ref_version(ref)
+        except OSError:
+            return
+        with self._lock:
+            self._hashes[ref] = (*version, digest)
+            self._chunks.setdefault(digest, chunks)
+            self._chunks.move_to_end(digest)
+            while len(self._chunks) > self.cache_size:
+                self._chunks.popitem(last=False)
+
+    def pack(self, query: str, refs: List[str], budget_tokens: int) -> PackedContext:
+        candidates = [chunk for ref in refs for chunk in self.chunks_for(ref)]
+        return pack_chunks(query, candidates, budget_tokens)
+
+
+def _remote(ref: str) -> bool:
+    return "://" in ref or MEMBER_SEPARATOR in ref
+
+
+def _ref_version(ref: str) -> Tuple[int, int]:
+    # Local files are revalidated by mtime and size. Other refs point at run
+    # artifacts, which are written once, so the ref alone is the key.
+    if _remote(ref):
+        return (0, 0)
+    stat = Path(ref).stat()
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def pack_chunks(query: str, candidates: List[Chunk], budget_tokens: int) -> PackedContext:
+    scores = bm25_scores(query, candidates)
+    ranked = sorted(range(len(candidates)), key=lambda index: (-scores[index], index))
+    selected: List[int] = []
+    used = 0
+    for index in ranked:
+        chunk = candidates[index]
+        if used + chunk.tokens > budget_tokens:
+            continue
+        selected.append(index)
+        used += chunk.tokens
+    # Keep the packed chunks in document order so the prompt reads naturally.
+    chunks = [candidates[index] for index in sorted(selected)]
+    text = "\n\n".join(f"[{chunk.chunk_id}]\n{chunk.text}" for chunk in chunks)
+    return PackedContext(text=text, chunks=chunks, tokens=used)
+
+
+def context_budget(model: Optional[Dict[str, Any]], messages: List[Dict[str, Any]]) -> int:
+    model = model or {}
+    max_tokens = int(model.get("max_tokens", 4096))
+    reserve = int(model.get("completion_reserve_tokens", 1024))
+    prompt = sum(estimate_tokens(str(message.get("content", ""))) for message in messages)
+    return max(0, max_tokens - reserve - prompt)
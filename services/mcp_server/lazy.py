@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+import threading
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class Lazy(Generic[T]):
+    def __init__(self, factory: Callable[[], T]) -> None:
+        self._factory = factory
+        self._value: Optional[T] = None
+        self._initialized = False
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self) -> bool:
+        return self._initialized
+
+    def get(self) -> T:
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    self._value = self._factory()
+                    self._initialized = True
+        return self._value  # type: ignore[return-value]
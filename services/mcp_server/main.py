@@ -1,45 +1,191 @@
 from __future__ import annotations
 
+import json
 import logging
+import threading
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import asynccontextmanager
 from datetime import date
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from pydantic import Field, field_validator
+from starlette.routing import Match
 
 from src.core.config import get_settings
 from src.core.logging import configure_logging
-from services.mcp_server.model_registry import ModelRegistry
-from services.mcp_server.model_router import ModelRouter
-from services.mcp_server.tool_registry import ToolRegistry
-from src.core.storage.local_storage import LocalStorage
-from src.core.storage.run_index import RunIndex
-from src.pipelines.stock_pipeline import run_pipeline
+from src.core.metrics import HTTP_IN_FLIGHT, HTTP_REQUEST_SECONDS, REGISTRY
+from src.core.profiling import ProfilerBusyError
+from services.mcp_server.lazy import Lazy
 
-app = FastAPI(title="MCP Server")
+if TYPE_CHECKING:
+    from services.mcp_server.model_registry import ModelRegistry
+    from services.mcp_server.model_router import ModelRouter
+    from services.mcp_server.snapshots import SnapshotStore
+    from services.mcp_server.tool_registry import ToolRegistry
+    from src.core.storage.backend import StorageBackend
+    from src.core.storage.run_index import RunIndex
 
 settings = get_settings()
 configure_logging(settings.log_level)
 logger = logging.getLogger(__name__)
 
-registry = ModelRegistry(Path(settings.model_registry_path))
-router = ModelRouter()
-tool_registry = ToolRegistry()
-run_index = RunIndex(str(Path(settings.runs_dir) / "run_index.json"))
-storage = LocalStorage(settings.runs_dir)
+
+# Heavy subsystems are built on first use (or by the startup warm-up thread) so
+# the process can answer /healthz before models.yaml, the run index and the
+# pipeline stack have been loaded.
+def _build_registry() -> ModelRegistry:
+    from services.mcp_server.model_registry import ModelRegistry
+
+    model_registry = ModelRegistry(Path(settings.model_registry_path))
+    if settings.model_registry_reload_interval_s > 0:
+        model_registry.start_watching(settings.model_registry_reload_interval_s)
+    return model_registry
+
+
+def _build_router() -> ModelRouter:
+    from services.mcp_server.context_packer import ContextPacker
+    from services.mcp_server.model_router import ModelRouter
+    from src.core.storage.artifacts import read_artifact
+
+    return ModelRouter(
+        registry.get(),
+        default_max_batch_size=settings.model_batch_max_size,
+        default_max_wait_ms=settings.model_batch_max_wait_ms,
+        packer=ContextPacker(reader=lambda ref: read_artifact(ref, storage.get())),
+    )
+
+
+def _build_tool_registry() -> ToolRegistry:
+    from services.mcp_server.tool_registry import ToolRegistry
+
+    return ToolRegistry()
+
+
+def _build_run_index() -> RunIndex:
+    from src.core.storage.factory import create_run_index
+
+    index = create_run_index(settings, storage.get())
+    index.recover()
+    return index
+
+
+def _build_storage() -> StorageBackend:
+    from src.core.storage.factory import get_storage
+
+    # Shared with run_pipeline, so the server holds one backend and one S3 pool.
+    return get_storage()
+
+
+def _build_snapshot_store() -> SnapshotStore:
+    from services.mcp_server.snapshots import SnapshotStore
+
+    return SnapshotStore(run_index.get(), str(Path(settings.runs_dir) / "snapshots"), packer=router.get().packer)
+
+
+registry: Lazy[ModelRegistry] = Lazy(_build_registry)
+router: Lazy[ModelRouter] = Lazy(_build_router)
+tool_registry: Lazy[ToolRegistry] = Lazy(_build_tool_registry)
+run_index: Lazy[RunIndex] = Lazy(_build_run_index)
+storage: Lazy[StorageBackend] = Lazy(_build_storage)
+snapshot_store: Lazy[SnapshotStore] = Lazy(_build_snapshot_store)
+
+
+def run_pipeline(**kwargs: Any) -> Dict[str, Any]:
+    from src.pipelines.stock_pipeline import run_pipeline as _run_pipeline
+
+    return _run_pipeline(**kwargs)
+
+
+def warm_up() -> None:
+    for name, subsystem in (
+        ("run_index", run_index),
+        ("registry", registry),
+        ("router", router),
+        ("tool_registry", tool_registry),
+        ("storage", storage),
+        ("snapshot_store", snapshot_store),
+    ):
+        try:
+            subsystem.get()
+        except Exception:
+            logger.exception("Warm-up of %s failed; it will be retried on first use", name)
+    try:
+        import src.pipelines.stock_pipeline  # noqa: F401
+    except Exception:
+        logger.exception("Warm-up import of the pipeline failed")
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    if settings.warm_up_on_startup:
+        threading.Thread(target=warm_up, name="mcp-warm-up", daemon=True).start()
+    yield
+    if router.initialized:
+        router.get().close()
+    if registry.initialized:
+        registry.get().stop_watching()
+    # Runs started from the server share this backend even if no endpoint
+    # touched `storage`, so close it unconditionally.
+    from src.core.storage.factory import close_storage
+
+    close_storage()
+
+
+app = FastAPI(title="MCP Server", lifespan=lifespan)
+
+
+def _route_template(request: Request) -> str:
+    # Label by route template rather than raw path so /v1/run/{run_id} stays one series.
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", request.url.path)
+    return "unmatched"
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+    route = _route_template(request)
+    start = time.perf_counter()
+    status = 500
+    HTTP_IN_FLIGHT.inc(route=route)
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    except BaseException:
+        HTTP_IN_FLIGHT.dec(route=route)
+        raise
+    finally:
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method, route=route, status=status)
+    # call_next returns once the headers are ready; a streamed body is still
+    # being sent, so the request stays in flight until its iterator finishes.
+    response.body_iterator = _in_flight_until_sent(response.body_iterator, route)  # type: ignore[attr-defined]
+    return response
+
+
+async def _in_flight_until_sent(body: AsyncIterator[bytes], route: str) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        HTTP_IN_FLIGHT.dec(route=route)
 
 
 class RunRequest(BaseModel):
     ticker: str
     as_of_date: Optional[date] = None
     mode: str = "interactive"
-    model_id: str = Field(default_factory=lambda: settings.default_model_id)
+    model_id: str = Field(default_factory=lambda: get_settings().default_model_id)
     refresh: bool = False
     thresholds: Dict[str, Any] = Field(default_factory=dict)
     max_iters: int = Field(default=1, ge=1)
+    profile: bool = False
 
     @field_validator("ticker")
     @classmethod
@@ -50,11 +196,9 @@ class RunRequest(BaseModel):
         return normalized
 
 
-class QueryRequest(BaseModel):
+class QueryItem(BaseModel):
     ticker: str
-    as_of_date: Optional[date] = None
     query_text: str
-    refresh: bool = False
     model_id: Optional[str] = None
 
     @field_validator("ticker")
@@ -73,6 +217,17 @@ class QueryRequest(BaseModel):
         return value
 
 
+class QueryRequest(QueryItem):
+    as_of_date: Optional[date] = None
+    refresh: bool = False
+    stream: bool = False
+
+
+class BatchQueryRequest(BaseModel):
+    queries: list[QueryItem] = Field(min_length=1, max_length=200)
+    max_concurrency: int = Field(default=8, ge=1, le=64)
+
+
 class ModelGenerateRequest(BaseModel):
     model_id: str
     messages: list[Dict[str, Any]]
@@ -81,6 +236,12 @@ class ModelGenerateRequest(BaseModel):
     context_refs: list[str] = Field(default_factory=list)
     run_id: str
     temperature: float = Field(default=0.2, ge=0.0, le=2.0)
+    stream: bool = False
+
+
+def _ndjson(events: Iterator[Dict[str, Any]]) -> Iterator[bytes]:
+    for event in events:
+        yield (json.dumps(event) + "\n").encode("utf-8")
 
 
 @app.post("/v1/run")
@@ -95,24 +256,47 @@ def run_pipeline_endpoint(payload: RunRequest) -> Dict[str, Any]:
             refresh=payload.refresh,
             thresholds=payload.thresholds,
             max_iters=payload.max_iters,
+            profile=payload.profile,
         )
+    except ProfilerBusyError as exc:
+        raise HTTPException(status_code=409, detail="Another profiled run is in progress") from exc
     except Exception as exc:
         logger.exception("Pipeline run failed for %s", payload.ticker)
         raise HTTPException(status_code=500, detail="Pipeline execution failed") from exc
-    return {"job_id": run_id, "run_id": result["run_id"], "status": result["status"]}
+    if result["status"] == "approved":
+        snapshot_store.get().refresh(payload.ticker)
+    response = {"job_id": run_id, "run_id": result["run_id"], "status": result["status"]}
+    if "profile_path" in result:
+        response["profile_path"] = result["profile_path"]
+    return response
 
 
 @app.get("/v1/run/{run_id}")
 def get_run_status(run_id: str) -> Dict[str, Any]:
-    entry = run_index.find_by_run_id(run_id)
+    entry = run_index.get().find_by_run_id(run_id)
     if entry:
         return entry
     raise HTTPException(status_code=404, detail="Run not found")
 
 
-@app.post("/v1/query")
-def query(payload: QueryRequest) -> Dict[str, Any]:
-    approved = run_index.latest_approved(payload.ticker)
+@app.get("/v1/run/{run_id}/diff")
+def get_run_diff(run_id: str, against: Optional[str] = None) -> Dict[str, Any]:
+    from src.core.storage.packet_delta import diff_runs
+
+    try:
+        result = diff_runs(run_index.get(), run_id, against)
+    except (OSError, ValueError, KeyError) as exc:
+        logger.exception("Cannot diff run %s", run_id)
+        raise HTTPException(status_code=500, detail="Run artifacts unreadable") from exc
+    if result is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return result
+
+
+@app.post("/v1/query", response_model=None)
+def query(payload: QueryRequest) -> Dict[str, Any] | StreamingResponse:
+    snapshot = snapshot_store.get().get(payload.ticker)
+    approved = snapshot.entry if snapshot else run_index.get().latest_approved(payload.ticker)
     if approved and not payload.refresh:
         report_path = approved.get("report_s3_path")
         analysis_packet_path = approved.get("analysis_packet_s3_path")
@@ -123,16 +307,10 @@ def query(payload: QueryRequest) -> Dict[str, Any]:
                 "report_path": report_path,
                 "analysis_packet_path": analysis_packet_path,
             }
-        response = router.generate(
-            model_id=payload.model_id or approved.get("model_id", settings.default_model_id),
-            messages=[{"role": "user", "content": payload.query_text}],
-            tools_enabled=False,
-            tool_schema={},
-            context_refs=[report_path, analysis_packet_path],
-            run_id=approved.get("run_id", ""),
-            temperature=0.2,
-        )
-        return response
+        generate_args = _generate_args(payload, approved)
+        if payload.stream:
+            return StreamingResponse(_ndjson(router.get().generate_stream(**generate_args)), media_type="application/x-ndjson")
+        return router.get().generate(**generate_args)
     result = run_pipeline(
         ticker=payload.ticker,
         as_of_date=payload.as_of_date or date.today(),
@@ -142,27 +320,121 @@ def query(payload: QueryRequest) -> Dict[str, Any]:
     return {"job_id": result["run_id"], "run_id": result["run_id"], "status": result["status"]}
 
 
-@app.post("/v1/model/generate")
-def model_generate(payload: ModelGenerateRequest) -> Dict[str, Any]:
-    return router.generate(
+def _generate_args(item: QueryItem, approved: Dict[str, Any]) -> Dict[str, Any]:
+    return dict(
+        model_id=item.model_id or approved.get("model_id", settings.default_model_id),
+        messages=[{"role": "user", "content": item.query_text}],
+        tools_enabled=False,
+        tool_schema={},
+        context_refs=[approved["report_s3_path"], approved["analysis_packet_s3_path"]],
+        run_id=approved.get("run_id", ""),
+        temperature=0.2,
+    )
+
+
+def _batch_events(
+    queries: list[QueryItem], approved: Dict[str, Optional[Dict[str, Any]]], max_concurrency: int
+) -> Iterator[Dict[str, Any]]:
+    # Results are emitted as each one completes, tagged with the position of
+    # its query. Concurrent requests to a cluster model coalesce in its
+    # MicroBatcher, so a batch also becomes few upstream calls.
+    errors = 0
+    pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="query-batch")
+    try:
+        futures = {}
+        for index, item in enumerate(queries):
+            entry = approved.get(item.ticker)
+            event = {"type": "result", "index": index, "ticker": item.ticker}
+            if entry is None:
+                errors += 1
+                yield {**event, "status": "not_found", "detail": "No approved run for ticker"}
+            elif not entry.get("report_s3_path") or not entry.get("analysis_packet_s3_path"):
+                errors += 1
+                yield {**event, "status": "error", "detail": "Approved run is missing artifacts"}
+            elif item.query_text.strip().lower() == "give me the analysis":
+                response = {
+                    "report_path": entry["report_s3_path"],
+                    "analysis_packet_path": entry["analysis_packet_s3_path"],
+                }
+                yield {**event, "status": "ok", "run_id": entry.get("run_id"), "response": response}
+            else:
+                event["run_id"] = entry.get("run_id")
+                futures[pool.submit(router.get().generate, **_generate_args(item, entry))] = event
+        for future in as_completed(futures):
+            event = futures[future]
+            try:
+                yield {**event, "status": "ok", "response": future.result()}
+            except Exception:
+                logger.exception("Batch query failed for %s", event["ticker"])
+                errors += 1
+                yield {**event, "status": "error", "detail": "Model generation failed"}
+        yield {"type": "done", "count": len(queries), "errors": errors}
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+@app.post("/v1/query/batch")
+def query_batch(payload: BatchQueryRequest) -> StreamingResponse:
+    # One index read resolves every ticker instead of one per query.
+    approved = run_index.get().latest_approved_many({item.ticker for item in payload.queries})
+    return StreamingResponse(
+        _ndjson(_batch_events(payload.queries, approved, payload.max_concurrency)), media_type="application/x-ndjson"
+    )
+
+
+@app.get("/v1/analysis/{ticker}")
+def get_analysis(ticker: str, request: Request) -> Response:
+    snapshot = snapshot_store.get().get(ticker.strip().upper())
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="No approved run for ticker")
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if snapshot.etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        return Response(
+            content=snapshot.body_gzip,
+            media_type="application/json",
+            headers={**headers, "Content-Encoding": "gzip"},
+        )
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+
+@app.post("/v1/model/generate", response_model=None)
+def model_generate(payload: ModelGenerateRequest) -> Dict[str, Any] | StreamingResponse:
+    from src.core.storage.artifacts import resolve_artifact_ref
+
+    # Client refs are paths relative to the runs tree; nothing outside it is read.
+    try:
+        context_refs = [resolve_artifact_ref(ref, storage.get()) for ref in payload.context_refs]
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    generate_args = dict(
         model_id=payload.model_id,
         messages=payload.messages,
         tools_enabled=payload.tools_enabled,
         tool_schema=payload.tool_schema,
-        context_refs=payload.context_refs,
+        context_refs=context_refs,
         run_id=payload.run_id,
         temperature=payload.temperature,
     )
+    if payload.stream:
+        return StreamingResponse(_ndjson(router.get().generate_stream(**generate_args)), media_type="application/x-ndjson")
+    return router.get().generate(**generate_args)
 
 
 @app.get("/v1/models")
 def list_models() -> Dict[str, Any]:
-    return {"models": registry.list_models()}
+    return {"models": registry.get().list_models()}
 
 
 @app.get("/v1/tools")
 def list_tools() -> Dict[str, Any]:
-    return {"tools": tool_registry.list_tools()}
+    return {"tools": tool_registry.get().list_tools()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @app.get("/healthz")
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+import httpx
+
+
+def _auth_headers(model: Dict[str, Any]) -> Dict[str, str]:
+    auth = str(model.get("auth") or "none")
+    if auth.startswith("env:"):
+        token = os.environ.get(auth[len("env:"):])
+        if token:
+            return {"Authorization": f"Bearer {token}"}
+    return {}
+
+
+def build_client(model: Dict[str, Any]) -> httpx.Client:
+    pool = model.get("pool") or {}
+    limits = httpx.Limits(
+        max_connections=int(pool.get("max_connections", 20)),
+        max_keepalive_connections=int(pool.get("max_keepalive_connections", 10)),
+        keepalive_expiry=float(pool.get("keepalive_expiry_s", 30.0)),
+    )
+    return httpx.Client(
+        timeout=float(model.get("timeout_s", 60.0)),
+        limits=limits,
+        headers=_auth_headers(model),
+    )
+
+
+# One warm, pooled HTTP client per model endpoint, reused across requests and
+# dropped when the model is removed or its registry entry changes. A dropped
+# client that requests still hold is retired and closed by its last release.
+class ModelClientPool:
+    def __init__(self) -> None:
+        self._clients: Dict[str, httpx.Client] = {}
+        self._in_use: Dict[httpx.Client, int] = {}
+        self._retired: Set[httpx.Client] = set()
+        self._lock = threading.Lock()
+
+    def get(self, model: Dict[str, Any]) -> httpx.Client:
+        with self._lock:
+            return self._client(model)
+
+    def acquire(self, model: Dict[str, Any]) -> httpx.Client:
+        with self._lock:
+            client = self._client(model)
+            self._in_use[client] = self._in_use.get(client, 0) + 1
+            return client
+
+    def release(self, client: httpx.Client) -> None:
+        with self._lock:
+            count = self._in_use.get(client, 0) - 1
+            if count > 0:
+                self._in_use[client] = count
+                return
+            self._in_use.pop(client, None)
+            if client not in self._retired:
+                return
+            self._retired.discard(client)
+        client.close()
+
+    @contextmanager
+    def lease(self, model: Dict[str, Any]) -> Iterator[httpx.Client]:
+        client = self.acquire(model)
+        try:
+            yield client
+        finally:
+            self.release(client)
+
+    def peek(self, model_id: str) -> Optional[httpx.Client]:
+        with self._lock:
+            return self._clients.get(model_id)
+
+    def drop(self, model_ids: Iterable[str]) -> None:
+        with self._lock:
+            clients = [self._clients.pop(model_id) for model_id in list(model_ids) if model_id in self._clients]
+            idle = self._retire(clients)
+        for client in idle:
+            client.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle = self._retire(list(self._clients.values()))
+            self._clients.clear()
+        for client in idle:
+            client.close()
+
+    def _client(self, model: Dict[str, Any]) -> httpx.Client:
+        client = self._clients.get(model["model_id"])
+        if client is None:
+            client = build_client(model)
+            self._clients[model["model_id"]] = client
+        return client
+
+    def _retire(self, clients: List[httpx.Client]) -> List[httpx.Client]:
+        busy = {client for client in clients if self._in_use.get(client)}
+        self._retired.update(busy)
+        return [client for client in clients if client not in busy]
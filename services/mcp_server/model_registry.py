@@ -1,27 +1,116 @@
 from __future__ import annotations
 
+import logging
+import threading
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 import yaml
 
+logger = logging.getLogger(__name__)
+
+RegistryListener = Callable[[Set[str]], None]
+
 
 class ModelRegistry:
     def __init__(self, config_path: str) -> None:
         self.config_path = Path(config_path)
         if not self.config_path.exists():
             raise FileNotFoundError(f"Model registry not found: {self.config_path}")
-        self._models = self._load()
+        self._listeners: List[RegistryListener] = []
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._version = self._file_version()
+        self._state = self._index(self._load())
 
     def _load(self) -> List[Dict[str, Any]]:
-        data = yaml.safe_load(self.config_path.read_text(encoding="utf-8"))
+        data = yaml.safe_load(self.config_path.read_text(encoding="utf-8")) or {}
         return data.get("models", [])
 
+    @staticmethod
+    def _index(models: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        by_id: Dict[str, Dict[str, Any]] = {}
+        for model in models:
+            model_id = model.get("model_id")
+            if not model_id:
+                raise ValueError("Every model entry needs a model_id")
+            if model_id in by_id:
+                raise ValueError(f"Duplicate model_id: {model_id}")
+            by_id[model_id] = model
+        return models, by_id
+
+    def _file_version(self) -> Tuple[int, int]:
+        stat = self.config_path.stat()
+        return (stat.st_mtime_ns, stat.st_size)
+
     def list_models(self) -> List[Dict[str, Any]]:
-        return self._models
+        return self._state[0]
 
     def get(self, model_id: str) -> Dict[str, Any]:
-        for model in self._models:
-            if model.get("model_id") == model_id:
-                return model
-        raise KeyError(f"Unknown model_id: {model_id}")
+        model = self._state[1].get(model_id)
+        if model is None:
+            raise KeyError(f"Unknown model_id: {model_id}")
+        return model
+
+    def add_listener(self, listener: RegistryListener) -> None:
+        self._listeners.append(listener)
+
+    def reload(self) -> Set[str]:
+        with self._reload_lock:
+            try:
+                version = self._file_version()
+            except OSError as exc:
+                logger.error("Keeping previous model registry; cannot stat %s: %s", self.config_path, exc)
+                return set()
+            try:
+                models, by_id = self._index(self._load())
+            except (OSError, ValueError, yaml.YAMLError) as exc:
+                # Remember the broken version so the watcher does not retry it every tick.
+                self._version = version
+                logger.error("Keeping previous model registry; reload of %s failed: %s", self.config_path, exc)
+                return set()
+            previous = self._state[1]
+            # A single reference swap: readers see either the old or the new registry.
+            self._state = (models, by_id)
+            self._version = version
+        changed = {
+            model_id
+            for model_id in set(previous) | set(by_id)
+            if previous.get(model_id) != by_id.get(model_id)
+        }
+        if changed:
+            logger.info("Model registry reloaded; changed models: %s", sorted(changed))
+            for listener in list(self._listeners):
+                try:
+                    listener(changed)
+                except Exception:
+                    logger.exception("Model registry listener failed")
+        return changed
+
+    def reload_if_changed(self) -> Set[str]:
+        try:
+            version = self._file_version()
+        except OSError:
+            return set()
+        if version == self._version:
+            return set()
+        return self.reload()
+
+    def start_watching(self, interval_seconds: float = 5.0) -> None:
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+
+        def watch() -> None:
+            while not self._stop.wait(interval_seconds):
+                self.reload_if_changed()
+
+        self._watcher = threading.Thread(target=watch, name="model-registry-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=1.0)
+            self._watcher = None
@@ -1,11 +1,35 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import json
+import threading
+from functools import partial
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from services.mcp_server.batching import BatcherClosedError, MicroBatcher
+from services.mcp_server.context_packer import ContextPacker, PackedContext, context_budget, estimate_tokens
+from services.mcp_server.model_clients import ModelClientPool
+from services.mcp_server.model_registry import ModelRegistry
+from src.core.metrics import MODEL_TOKENS
 
 
 class ModelRouter:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        registry: Optional[ModelRegistry] = None,
+        default_max_batch_size: int = 8,
+        default_max_wait_ms: float = 10.0,
+        packer: Optional[ContextPacker] = None,
+    ) -> None:
         self._trace = []
+        self.registry = registry
+        self.packer = packer or ContextPacker()
+        self.default_max_batch_size = default_max_batch_size
+        self.default_max_wait_ms = default_max_wait_ms
+        self._batchers: Dict[str, MicroBatcher] = {}
+        self._batchers_lock = threading.Lock()
+        self.clients = ModelClientPool()
+        if registry is not None:
+            registry.add_listener(self._on_registry_change)
 
     def generate(
         self,
@@ -17,18 +41,211 @@ class ModelRouter:
         run_id: str,
         temperature: float,
     ) -> Dict[str, Any]:
+        model = self._model(model_id)
+        prompt, packed = self._with_context(model, messages, context_refs)
         self._trace.append({
             "model_id": model_id,
             "messages": messages,
             "tools_enabled": tools_enabled,
             "context_refs": context_refs,
+            "context_chunks": [chunk.chunk_id for chunk in packed.chunks] if packed else [],
+            "context_tokens": packed.tokens if packed else 0,
             "run_id": run_id,
             "temperature": temperature,
         })
-        return {
-            "text": "Model routing placeholder response.",
-            "tool_calls": [],
-            "usage": {"prompt_tokens": 0, "completion_tokens": 0},
-            "model_version": model_id,
+        if model is not None and model.get("type") == "cluster":
+            result = self._submit_batched(
+                model, _cluster_request(model, prompt, tools_enabled, tool_schema, context_refs, temperature)
+            )
+            response = {
+                "text": result.get("text", ""),
+                "tool_calls": result.get("tool_calls", []),
+                "usage": result.get("usage", {"prompt_tokens": 0, "completion_tokens": 0}),
+                "model_version": result.get("model_version", model_id),
+                "trace_id": run_id,
+            }
+        else:
+            response = {
+                "text": "Model routing placeholder response.",
+                "tool_calls": [],
+                "usage": {"prompt_tokens": _prompt_tokens(prompt), "completion_tokens": 0},
+                "model_version": model_id,
+                "trace_id": run_id,
+            }
+        _record_usage(model_id, response["usage"], packed)
+        return response
+
+    def generate_stream(
+        self,
+        model_id: str,
+        messages: List[Dict[str, Any]],
+        tools_enabled: bool,
+        tool_schema: Dict[str, Any],
+        context_refs: List[str],
+        run_id: str,
+        temperature: float,
+    ) -> Iterator[Dict[str, Any]]:
+        model = self._model(model_id)
+        prompt, packed = self._with_context(model, messages, context_refs)
+        usage = {"prompt_tokens": _prompt_tokens(prompt), "completion_tokens": 0}
+        model_version = model_id
+        tool_calls: List[Dict[str, Any]] = []
+        if model is not None and model.get("type") == "cluster":
+            events = self._stream_cluster(
+                model, _cluster_request(model, prompt, tools_enabled, tool_schema, context_refs, temperature)
+            )
+        else:
+            events = _placeholder_stream("Model routing placeholder response.", usage["prompt_tokens"])
+        status = "cancelled"
+        error: Optional[Exception] = None
+        try:
+            for event in events:
+                if event.get("type") == "token":
+                    yield {"type": "token", "text": event.get("text", "")}
+                elif event.get("type") == "done":
+                    usage = event.get("usage", usage)
+                    model_version = event.get("model_version", model_version)
+                    tool_calls = event.get("tool_calls", tool_calls)
+            status = "completed"
+        except Exception as exc:
+            # The response has already started, so the failure is reported as
+            # the terminal event instead of cutting the body short.
+            status = "error"
+            error = exc
+        finally:
+            self._trace.append({
+                "model_id": model_id,
+                "messages": messages,
+                "tools_enabled": tools_enabled,
+                "context_refs": context_refs,
+                "context_chunks": [chunk.chunk_id for chunk in packed.chunks] if packed else [],
+                "context_tokens": packed.tokens if packed else 0,
+                "run_id": run_id,
+                "temperature": temperature,
+                "stream": True,
+                "status": status,
+                "usage": usage,
+            })
+            _record_usage(model_id, usage, packed)
+        if error is not None:
+            yield {"type": "error", "message": str(error) or type(error).__name__, "trace_id": run_id}
+            return
+        yield {
+            "type": "done",
+            "tool_calls": tool_calls,
+            "usage": usage,
+            "model_version": model_version,
             "trace_id": run_id,
         }
+
+    def close(self) -> None:
+        with self._batchers_lock:
+            batchers = list(self._batchers.values())
+            self._batchers.clear()
+        for batcher in batchers:
+            batcher.close()
+        self.clients.close()
+
+    def _on_registry_change(self, model_ids: Set[str]) -> None:
+        with self._batchers_lock:
+            batchers = [self._batchers.pop(model_id) for model_id in model_ids if model_id in self._batchers]
+        for batcher in batchers:
+            batcher.close()
+        self.clients.drop(model_ids)
+
+    # Streaming cluster endpoints answer {"stream": true} requests with NDJSON
+    # events: {"type": "token", "text": ...} lines followed by one {"type": "done"}.
+    def _stream_cluster(self, model: Dict[str, Any], request: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        # The lease keeps a registry reload from closing the client mid-stream.
+        with self.clients.lease(model) as client:
+            with client.stream("POST", model["endpoint"], json={**request, "stream": True}) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if line.strip():
+                        yield json.loads(line)
+
+    def _with_context(
+        self, model: Optional[Dict[str, Any]], messages: List[Dict[str, Any]], context_refs: List[str]
+    ) -> Tuple[List[Dict[str, Any]], Optional[PackedContext]]:
+        if not context_refs:
+            return messages, None
+        query = next(
+            (str(message.get("content", "")) for message in reversed(messages) if message.get("role") == "user"),
+            "",
+        )
+        packed = self.packer.pack(query, context_refs, context_budget(model, messages))
+        if not packed.chunks:
+            return messages, packed
+        context_message = {"role": "system", "content": f"Context from run artifacts:\n\n{packed.text}"}
+        return [context_message, *messages], packed
+
+    def _model(self, model_id: str) -> Optional[Dict[str, Any]]:
+        if self.registry is None:
+            return None
+        try:
+            return self.registry.get(model_id)
+        except KeyError:
+            return None
+
+    def _submit_batched(self, model: Dict[str, Any], request: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return self._batcher(model).submit(request)
+        except BatcherClosedError:
+            # A registry reload closed the batcher after it was looked up; the
+            # reloaded model gets a fresh one.
+            model = self._model(model["model_id"]) or model
+            return self._batcher(model).submit(request)
+
+    def _batcher(self, model: Dict[str, Any]) -> MicroBatcher:
+        model_id = model["model_id"]
+        with self._batchers_lock:
+            batcher = self._batchers.get(model_id)
+            if batcher is None:
+                batching = model.get("batching") or {}
+                client = self.clients.acquire(model)
+                batcher = MicroBatcher(
+                    model["endpoint"],
+                    client=client,
+                    on_stop=partial(self.clients.release, client),
+                    timeout=float(model.get("timeout_s", 60.0)),
+                    max_batch_size=int(batching.get("max_batch_size", self.default_max_batch_size)),
+                    max_wait_ms=float(batching.get("max_wait_ms", self.default_max_wait_ms)),
+                )
+                self._batchers[model_id] = batcher
+            return batcher
+
+
+def _cluster_request(
+    model: Dict[str, Any],
+    messages: List[Dict[str, Any]],
+    tools_enabled: bool,
+    tool_schema: Dict[str, Any],
+    context_refs: List[str],
+    temperature: float,
+) -> Dict[str, Any]:
+    return {
+        "messages": messages,
+        "tools_enabled": tools_enabled,
+        "tool_schema": tool_schema,
+        "context_refs": context_refs,
+        "temperature": temperature,
+        "max_tokens": model.get("max_tokens"),
+    }
+
+
+def _prompt_tokens(messages: List[Dict[str, Any]]) -> int:
+    return sum(estimate_tokens(str(message.get("content", ""))) for message in messages)
+
+
+def _record_usage(model_id: str, usage: Dict[str, Any], packed: Optional[PackedContext]) -> None:
+    MODEL_TOKENS.inc(usage.get("prompt_tokens") or 0, model_id=model_id, kind="prompt")
+    MODEL_TOKENS.inc(usage.get("completion_tokens") or 0, model_id=model_id, kind="completion")
+    if packed is not None:
+        MODEL_TOKENS.inc(packed.tokens, model_id=model_id, kind="context")
+
+
+def _placeholder_stream(text: str, prompt_tokens: int) -> Iterator[Dict[str, Any]]:
+    tokens = text.split(" ")
+    for index, token in enumerate(tokens):
+        yield {"type": "token", "text": token if index == 0 else f" {token}"}
+    yield {"type": "done", "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens)}}
@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.mcp_server.context_packer import Chunk, ContextPacker, chunk_artifact, tokenize
+from src.core.metrics import CACHE_REQUESTS
+from src.core.storage.artifacts import read_artifact
+from src.core.storage.atomic import atomic_write_bytes
+from src.core.storage.run_index import RunIndex
+from src.core.storage.serialization import Serializer, decode
+
+logger = logging.getLogger(__name__)
+
+_serializer = Serializer("compact")
+
+
+@dataclass
+class ServingSnapshot:
+    ticker: str
+    run_id: str
+    etag: str
+    entry: Dict[str, Any]
+    body: bytes
+    body_gzip: bytes
+    # Context chunks per artifact ref, keyed by the artifact's sha256; the
+    # router's packer is primed with them.
+    chunks: Dict[str, Tuple[str, List[Chunk]]]
+
+
+class SnapshotStore:
+    def __init__(self, run_index: RunIndex, snapshot_dir: str, packer: Optional[ContextPacker] = None) -> None:
+        self.run_index = run_index
+        self.snapshot_dir = Path(snapshot_dir)
+        self.packer = packer or ContextPacker()
+        self._snapshots: Dict[str, ServingSnapshot] = {}
+        self._index_versions: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, ticker: str) -> Optional[ServingSnapshot]:
+        version = self.run_index.version()
+        with self._lock:
+            snapshot = self._snapshots.get(ticker)
+            if snapshot is not None and self._index_versions.get(ticker) == version:
+                CACHE_REQUESTS.inc(cache="serving_snapshot", result="hit")
+                return snapshot
+        CACHE_REQUESTS.inc(cache="serving_snapshot", result="miss")
+        return self.refresh(ticker, version)
+
+    def refresh(self, ticker: str, version: Any = None) -> Optional[ServingSnapshot]:
+        version = self.run_index.version() if version is None else version
+        entry = self.run_index.latest_approved(ticker)
+        with self._lock:
+            current = self._snapshots.get(ticker)
+        if entry is None:
+            snapshot = None
+        elif current is not None and current.run_id == entry.get("run_id") and current.entry == entry:
+            snapshot = current
+        else:
+            snapshot = self._load_from_disk(ticker, entry) or self._build(ticker, entry)
+        with self._lock:
+            if snapshot is None:
+                self._snapshots.pop(ticker, None)
+            else:
+                self._snapshots[ticker] = snapshot
+            self._index_versions[ticker] = version
+        return snapshot
+
+    def _snapshot_path(self, ticker: str) -> Path:
+        return self.snapshot_dir / f"{ticker}.snapshot"
+
+    def _build(self, ticker: str, entry: Dict[str, Any]) -> Optional[ServingSnapshot]:
+        report_path = entry.get("report_s3_path")
+        packet_path = entry.get("analysis_packet_s3_path")
+        if not report_path or not packet_path:
+            return None
+        try:
+            report_body = read_artifact(report_path, self.run_index.storage)
+            packet_body = read_artifact(packet_path, self.run_index.storage)
+            report = report_body.decode("utf-8")
+            packet = decode(packet_body)
+        except (OSError, ValueError):
+            logger.warning("Cannot build serving snapshot for %s from %s", ticker, packet_path)
+            return None
+        run_id = entry.get("run_id", "")
+        document = {"ticker": ticker, "run_id": run_id, "entry": entry, "report": report, "analysis_packet": packet}
+        body = _serializer.encode(document)
+        chunks = {
+            ref: (hashlib.sha256(body).hexdigest(), chunk_artifact(Path(ref).name, body, self.packer.max_chunk_tokens))
+            for ref, body in ((report_path, report_body), (packet_path, packet_body))
+        }
+        snapshot = ServingSnapshot(
+            ticker=ticker,
+            run_id=run_id,
+            etag=_etag(body),
+            entry=entry,
+            body=body,
+            body_gzip=gzip.compress(body, compresslevel=6),
+            chunks=chunks,
+        )
+        self._save_to_disk(snapshot, document)
+        self._prime(snapshot)
+        return snapshot
+
+    def _prime(self, snapshot: ServingSnapshot) -> None:
+        for ref, (digest, chunks) in snapshot.chunks.items():
+            self.packer.prime(ref, digest, chunks)
+
+    def _save_to_disk(self, snapshot: ServingSnapshot, document: Dict[str, Any]) -> None:
+        payload = {
+            "run_id": snapshot.run_id,
+            "document": document,
+            "chunks": {
+                ref: {
+                    "digest": digest,
+                    "items": [{"chunk_id": chunk.chunk_id, "text": chunk.text, "tokens": chunk.tokens} for chunk in chunks],
+                }
+                for ref, (digest, chunks) in snapshot.chunks.items()
+            },
+        }
+        try:
+            atomic_write_bytes(self._snapshot_path(snapshot.ticker), gzip.compress(_serializer.encode(payload)), fsync=False)
+        except OSError:
+            logger.warning("Cannot persist serving snapshot for %s", snapshot.ticker)
+
+    def _load_from_disk(self, ticker: str, entry: Dict[str, Any]) -> Optional[ServingSnapshot]:
+        path = self._snapshot_path(ticker)
+        if not path.exists():
+            return None
+        try:
+            payload = decode(gzip.decompress(path.read_bytes()))
+        except (OSError, ValueError, EOFError):
+            logger.warning("Ignoring unreadable serving snapshot %s", path)
+            return None
+        if payload.get("run_id") != entry.get("run_id"):
+            return None
+        # The run's artifacts never change, but its index entry can (e.g. after
+        # carry-forward or retention), so the body embeds the current entry.
+        document = {**payload["document"], "entry": entry}
+        body = _serializer.encode(document)
+        chunks = payload.get("chunks")
+        snapshot = ServingSnapshot(
+            ticker=ticker,
+            run_id=payload["run_id"],
+            etag=_etag(body),
+            entry=entry,
+            body=body,
+            body_gzip=gzip.compress(body, compresslevel=6),
+            chunks={
+                ref: (value["digest"], [_chunk(item["chunk_id"], item["text"], item["tokens"]) for item in value["items"]])
+                for ref, value in (chunks.items() if isinstance(chunks, dict) else ())
+            },
+        )
+        self._prime(snapshot)
+        return snapshot
+
+
+def _etag(body: bytes) -> str:
+    # Derived from the body, which embeds the index entry, so a changed entry
+    # for the same run never matches an ETag a client already holds.
+    return f'"{hashlib.sha256(body).hexdigest()}"'
+
+
+def _chunk(chunk_id: str, text: str, tokens: int) -> Chunk:
+    terms = tokenize(text)
+    return Chunk(chunk_id=chunk_id, text=text, tokens=tokens, term_counts=Counter(terms), length=len(terms))
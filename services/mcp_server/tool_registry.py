@@ -29,6 +29,7 @@ class ToolRegistry:
                         "ticker": {"type": "string"},
                         "forms": {"type": "array", "items": {"type": "string"}},
                         "limit": {"type": "integer"},
+                        "days_back": {"type": "integer"},
                     },
                     "required": ["ticker", "forms"],
                 },
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 from functools import lru_cache
+from typing import Dict, Optional
 
+from pydantic import AliasChoices, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -11,7 +13,40 @@ class Settings(BaseSettings):
     runs_dir: str = "runs"
     model_registry_path: str = "services/mcp_server/models.yaml"
     default_model_id: str = "public:gpt-x"
+    model_registry_reload_interval_s: float = 5.0
     log_level: str = "INFO"
+    warm_up_on_startup: bool = True
+    model_batch_max_size: int = 8
+    model_batch_max_wait_ms: float = 10.0
+
+    storage_backend: str = "local"
+    write_behind: bool = False
+    fsync_policy: str = "batch"
+    serialization_format: str = "json"
+    serialization_compression: str = "none"
+    packet_snapshot_every: int = 10
+    record_io: bool = False
+    runs_bucket: Optional[str] = Field(
+        default=None, validation_alias=AliasChoices("STOCK_RUNS_BUCKET", "RUNS_BUCKET")
+    )
+    s3_prefix: str = "runs"
+    s3_endpoint_url: Optional[str] = None
+    s3_max_concurrency: int = 8
+    s3_multipart_threshold: int = 8 * 1024 * 1024
+
+    queue_backend: str = "sqlite"
+    queue_path: Optional[str] = None
+    queue_name: str = "watchlist"
+    queue_lease_seconds: float = 300.0
+    queue_max_attempts: int = 3
+
+    provider_slo_s: float = 2.0
+    provider_slos: Dict[str, float] = Field(default_factory=dict)
+    provider_timeout_s: float = 10.0
+    provider_hedge: bool = True
+    provider_max_concurrency: int = 4
+    provider_breaker_failures: int = 5
+    provider_breaker_reset_s: float = 30.0
 
 
 @lru_cache(maxsize=1)
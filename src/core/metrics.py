@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import bisect
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.core.storage.atomic import atomic_write_bytes
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[str, ...]
+SHARD_STRIPES = 16
+
+
+class _Shards:
+    # A fixed set of stripes, each with its own lock. Threads are spread over
+    # them round-robin, so concurrent writers rarely contend, and the number of
+    # shards a scrape sums stays bounded however many threads come and go.
+    def __init__(self, stripes: int = SHARD_STRIPES) -> None:
+        self._local = threading.local()
+        self._next = itertools.count()
+        self._shards: List[Dict[LabelKey, Any]] = [{} for _ in range(stripes)]
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    @contextmanager
+    def local(self) -> Iterator[Dict[LabelKey, Any]]:
+        stripe = getattr(self._local, "stripe", None)
+        if stripe is None:
+            stripe = next(self._next) % len(self._shards)
+            self._local.stripe = stripe
+        with self._locks[stripe]:
+            yield self._shards[stripe]
+
+    def snapshot(self) -> List[Dict[LabelKey, Any]]:
+        copies = []
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                copies.append({key: list(value) if isinstance(value, list) else value for key, value in shard.items()})
+        return copies
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._shards = _Shards()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelKey:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _format_labels(self, key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        rendered = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+        return "{" + rendered + "}"
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._shards.local() as shard:
+            shard[key] = shard.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        key = self._key(labels)
+        return sum(shard.get(key, 0.0) for shard in self._shards.snapshot())
+
+    def _totals(self) -> Dict[LabelKey, float]:
+        totals: Dict[LabelKey, float] = {}
+        for shard in self._shards.snapshot():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+    def _samples(self) -> List[str]:
+        suffix = "" if self.name.endswith("_total") else "_total"
+        return [
+            f"{self.name}{suffix}{self._format_labels(key)} {_number(value)}"
+            for key, value in sorted(self._totals().items())
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels: Any) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{self._format_labels(key)} {_number(value)}" for key, value in sorted(self._totals().items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._shards.local() as shard:
+            state = shard.get(key)
+            if state is None:
+                # [per-bucket counts..., +Inf count, sum]
+                state = [0] * (len(self.buckets) + 1) + [0.0]
+                shard[key] = state
+            state[bucket] += 1
+            state[-1] += value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: Any) -> int:
+        key = self._key(labels)
+        return sum(sum(shard[key][:-1]) for shard in self._shards.snapshot() if key in shard)
+
+    def _samples(self) -> List[str]:
+        merged: Dict[LabelKey, List[float]] = {}
+        for shard in self._shards.snapshot():
+            for key, state in shard.items():
+                target = merged.setdefault(key, [0] * len(state))
+                for index, value in enumerate(state):
+                    target[index] += value
+        lines = []
+        for key, state in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._format_labels(key, ('le', _number(bound)))} {cumulative}")
+            cumulative += state[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{self._format_labels(key, ('le', '+Inf'))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {_number(state[-1])}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered with a different type or labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        atomic_write_bytes(Path(path), self.render().encode("utf-8"), fsync=False)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY = MetricsRegistry()
+
+PIPELINE_STAGE_SECONDS = REGISTRY.histogram(
+    "pipeline_stage_duration_seconds", "Wall time of each pipeline stage.", ["stage"]
+)
+PIPELINE_RUNS = REGISTRY.counter("pipeline_runs_total", "Completed pipeline runs by status.", ["status"])
+WATCHLIST_TICKERS = REGISTRY.counter(
+    "watchlist_tickers_total", "Watchlist tickers processed, by run status or carried_forward.", ["outcome"]
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "MCP server request latency.", ["method", "route", "status"]
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "MCP server requests currently being served.", ["route"])
+RUN_INDEX_SECONDS = REGISTRY.histogram("run_index_operation_seconds", "RunIndex operation latency.", ["operation"])
+STORAGE_BYTES_WRITTEN = REGISTRY.counter("storage_bytes_written_total", "Artifact bytes written.", ["backend"])
+MODEL_TOKENS = REGISTRY.counter("model_tokens_total", "Model router token usage.", ["model_id", "kind"])
+PROVIDER_REQUESTS = REGISTRY.counter("provider_requests_total", "Data provider requests by source.", ["source"])
+PROVIDER_DEGRADED = REGISTRY.counter(
+    "provider_degraded_total", "Provider calls answered from cache or empty data.", ["source", "reason"]
+)
+PROVIDER_HEDGES = REGISTRY.counter("provider_hedged_requests_total", "Duplicate provider requests sent.", ["source"])
+CACHE_REQUESTS = REGISTRY.counter("cache_requests_total", "Cache lookups by cache and result.", ["cache", "result"])
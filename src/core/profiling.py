@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+import functools
+import itertools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_PROC_IO = Path("/proc/self/io")
+
+# tracemalloc and /proc/self/io are process-wide, so concurrent profiled runs
+# would reset and read each other's counters; only one profiler runs at a time.
+_ACTIVE = threading.Lock()
+
+
+# The profiled stage active in the calling context: (profiler, stage token, stage name).
+_CURRENT_STAGE: ContextVar[Optional[Tuple["RunProfiler", int, str]]] = ContextVar("profiled_stage", default=None)
+
+
+class ProfilerBusyError(RuntimeError):
+    pass
+
+
+def attributed(fn: Callable[..., T]) -> Callable[..., T]:
+    # Wraps work about to be handed to another thread (e.g. a provider guard's
+    # pool). While a profiled stage is active in the caller, the worker thread
+    # is sampled under that stage and its CPU time is charged to it; otherwise
+    # fn is returned unchanged.
+    current = _CURRENT_STAGE.get()
+    if current is None:
+        return fn
+    profiler, token, name = current
+
+    @functools.wraps(fn)
+    def run(*args: Any, **kwargs: Any) -> T:
+        with profiler._worker(token, name):
+            return fn(*args, **kwargs)
+
+    return run
+
+
+def io_bytes() -> Tuple[int, int]:
+    # Process-wide bytes read/written through syscalls; (0, 0) where /proc is unavailable.
+    try:
+        fields = dict(line.split(": ", 1) for line in _PROC_IO.read_text().splitlines())
+    except (OSError, ValueError):
+        return (0, 0)
+    return (int(fields.get("rchar", 0)), int(fields.get("wchar", 0)))
+
+
+def _frame_label(frame: Any, root: str) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(root):
+        filename = filename[len(root):]
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+class StackSampler:
+    def __init__(self, thread_id: int, interval_s: float = 0.005) -> None:
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.stage = "pipeline"
+        self._root = os.getcwd() + os.sep
+        self.samples: Counter = Counter()
+        self._workers: Dict[int, str] = {}
+        self._workers_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="run-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def attach(self, thread_id: int, stage: str) -> None:
+        with self._workers_lock:
+            self._workers[thread_id] = stage
+
+    def detach(self, thread_id: int) -> None:
+        with self._workers_lock:
+            self._workers.pop(thread_id, None)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            frames = sys._current_frames()
+            with self._workers_lock:
+                threads = [(self.thread_id, self.stage), *self._workers.items()]
+            for thread_id, stage in threads:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack: List[str] = []
+                while frame is not None:
+                    stack.append(_frame_label(frame, self._root))
+                    frame = frame.f_back
+                stack.append(stage)
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.samples.items()))
+
+
+class RunProfiler:
+    def __init__(self, interval_s: float = 0.005) -> None:
+        self.interval_s = interval_s
+        self.stages: List[Dict[str, Any]] = []
+        self._sampler = StackSampler(threading.get_ident(), interval_s)
+        self._owns_tracemalloc = False
+        self._started_at = 0.0
+        self._cpu_started_at = 0.0
+        self.summary: Dict[str, Any] = {}
+        self._tokens = itertools.count()
+        # CPU seconds spent on worker threads, per open stage and in total.
+        self._worker_cpu: Dict[int, float] = {}
+        self._worker_cpu_total = 0.0
+        self._worker_lock = threading.Lock()
+
+    def start(self) -> None:
+        if not _ACTIVE.acquire(blocking=False):
+            raise ProfilerBusyError("Another profiled run is in progress")
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+        self._started_at = time.perf_counter()
+        self._cpu_started_at = time.thread_time()
+        self._sampler.start()
+
+    def stop(self) -> None:
+        try:
+            self._sampler.stop()
+            self.summary = {
+                "wall_s": time.perf_counter() - self._started_at,
+                "cpu_s": time.thread_time() - self._cpu_started_at + self._worker_cpu_total,
+                "peak_alloc_bytes": tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else 0,
+                "samples": sum(self._sampler.samples.values()),
+                "interval_s": self.interval_s,
+            }
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+                self._owns_tracemalloc = False
+        finally:
+            _ACTIVE.release()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        previous = self._sampler.stage
+        self._sampler.stage = name
+        token = next(self._tokens)
+        with self._worker_lock:
+            self._worker_cpu[token] = 0.0
+        context = _CURRENT_STAGE.set((self, token, name))
+        tracemalloc.reset_peak()
+        current_before = tracemalloc.get_traced_memory()[0]
+        read_before, written_before = io_bytes()
+        wall_before = time.perf_counter()
+        cpu_before = time.thread_time()
+        try:
+            yield
+        finally:
+            cpu = time.thread_time() - cpu_before
+            wall = time.perf_counter() - wall_before
+            _CURRENT_STAGE.reset(context)
+            with self._worker_lock:
+                worker_cpu = self._worker_cpu.pop(token)
+            read_after, written_after = io_bytes()
+            current_after, peak = tracemalloc.get_traced_memory()
+            self._sampler.stage = previous
+            self.stages.append(
+                {
+                    "stage": name,
+                    "wall_s": wall,
+                    "cpu_s": cpu + worker_cpu,
+                    "worker_cpu_s": worker_cpu,
+                    "alloc_peak_bytes": max(0, peak - current_before),
+                    "alloc_net_bytes": current_after - current_before,
+                    "io_read_bytes": read_after - read_before,
+                    "io_written_bytes": written_after - written_before,
+                }
+            )
+
+    @contextmanager
+    def _worker(self, token: int, name: str) -> Iterator[None]:
+        # Work that outlives its stage (e.g. an abandoned hedge) is still
+        # sampled, but its CPU time only counts toward the run total.
+        thread_id = threading.get_ident()
+        self._sampler.attach(thread_id, name)
+        cpu_before = time.thread_time()
+        try:
+            yield
+        finally:
+            cpu = time.thread_time() - cpu_before
+            self._sampler.detach(thread_id)
+            with self._worker_lock:
+                self._worker_cpu_total += cpu
+                if token in self._worker_cpu:
+                    self._worker_cpu[token] += cpu
+
+    def report(self) -> Dict[str, Any]:
+        return {"summary": self.summary, "stages": self.stages}
+
+    def collapsed(self) -> str:
+        return self._sampler.collapsed()
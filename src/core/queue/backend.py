@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import logging
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Lease:
+    task_id: int
+    key: str
+    payload: Dict[str, Any]
+    token: str
+    owner: str
+    expires_at: float
+    attempts: int
+
+
+class WorkQueue(ABC):
+    @abstractmethod
+    def enqueue(self, items: List[Dict[str, Any]], key_fields: tuple = ("ticker", "as_of_date")) -> int:
+        ...
+
+    @abstractmethod
+    def claim(self, owner: str, lease_seconds: float) -> Optional[Lease]:
+        ...
+
+    @abstractmethod
+    def renew(self, lease: Lease, lease_seconds: float) -> bool:
+        ...
+
+    @abstractmethod
+    def complete(self, lease: Lease, result: Optional[Dict[str, Any]] = None) -> bool:
+        ...
+
+    @abstractmethod
+    def fail(self, lease: Lease, error: str) -> bool:
+        ...
+
+    @abstractmethod
+    def requeue_expired(self) -> int:
+        ...
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        ...
+
+    def close(self) -> None:
+        return None
+
+
+class LeaseKeeper:
+    # Renews a lease in the background while the worker processes it. If a
+    # renewal is rejected the lease was lost (expired and re-claimed elsewhere).
+    def __init__(self, queue: WorkQueue, lease: Lease, lease_seconds: float, interval_seconds: Optional[float] = None) -> None:
+        self.queue = queue
+        self.lease = lease
+        self.lease_seconds = lease_seconds
+        self.interval_seconds = interval_seconds or max(0.05, lease_seconds / 3)
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{lease.task_id}", daemon=True)
+
+    def __enter__(self) -> "LeaseKeeper":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                renewed = self.queue.renew(self.lease, self.lease_seconds)
+            except Exception:
+                logger.exception("Lease renewal for %s failed", self.lease.key)
+                continue
+            if not renewed:
+                logger.warning("Lease for %s was lost", self.lease.key)
+                self.lost.set()
+                return
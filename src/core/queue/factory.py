@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from src.core.config import Settings
+from src.core.queue.backend import WorkQueue
+
+
+def create_queue(settings: Settings) -> WorkQueue:
+    backend = settings.queue_backend.lower()
+    if backend == "sqlite":
+        from src.core.queue.sqlite_queue import SQLiteWorkQueue
+
+        path = settings.queue_path or str(Path(settings.runs_dir) / "work_queue.sqlite3")
+        return SQLiteWorkQueue(path, queue=settings.queue_name, max_attempts=settings.queue_max_attempts)
+    raise ValueError(f"Unknown queue backend: {settings.queue_backend}")
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+import uuid
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from src.core.queue.backend import Lease, WorkQueue
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_token TEXT,
+    lease_owner TEXT,
+    lease_expires REAL,
+    enqueued_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    last_error TEXT,
+    result TEXT,
+    UNIQUE (queue, key)
+);
+CREATE INDEX IF NOT EXISTS tasks_claim ON tasks (queue, status, lease_expires, id);
+"""
+
+
+class SQLiteWorkQueue(WorkQueue):
+    # Each call opens its own connection, so one queue object can be shared by
+    # threads and any number of processes can point at the same file. Claims
+    # run under BEGIN IMMEDIATE, which serialises writers on the database lock.
+    def __init__(self, path: str, queue: str = "watchlist", max_attempts: int = 3) -> None:
+        self.path = Path(path)
+        self.queue = queue
+        self.max_attempts = max_attempts
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        with closing(sqlite3.connect(self.path, timeout=30.0, isolation_level=None)) as connection:
+            connection.row_factory = sqlite3.Row
+            yield connection
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def enqueue(self, items: List[Dict[str, Any]], key_fields: tuple = ("ticker", "as_of_date")) -> int:
+        now = time.time()
+        rows = [
+            (self.queue, "/".join(str(item.get(field, "")) for field in key_fields), json.dumps(item), now, now)
+            for item in items
+        ]
+        with self._transaction() as connection:
+            before = connection.total_changes
+            # Re-enqueueing the same ticker/date is a no-op, so the enqueue step can be retried safely.
+            connection.executemany(
+                "INSERT OR IGNORE INTO tasks (queue, key, payload, enqueued_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            return connection.total_changes - before
+
+    def claim(self, owner: str, lease_seconds: float) -> Optional[Lease]:
+        now = time.time()
+        with self._transaction() as connection:
+            self._expire(connection, now)
+            row = connection.execute(
+                "SELECT * FROM tasks WHERE queue = ? AND status = 'pending' ORDER BY id LIMIT 1",
+                (self.queue,),
+            ).fetchone()
+            if row is None:
+                return None
+            token = uuid.uuid4().hex
+            expires_at = now + lease_seconds
+            connection.execute(
+                "UPDATE tasks SET status = 'leased', attempts = attempts + 1, lease_token = ?, lease_owner = ?, "
+                "lease_expires = ?, updated_at = ? WHERE id = ?",
+                (token, owner, expires_at, now, row["id"]),
+            )
+        return Lease(
+            task_id=row["id"],
+            key=row["key"],
+            payload=json.loads(row["payload"]),
+            token=token,
+            owner=owner,
+            expires_at=expires_at,
+            attempts=row["attempts"] + 1,
+        )
+
+    def renew(self, lease: Lease, lease_seconds: float) -> bool:
+        now = time.time()
+        expires_at = now + lease_seconds
+        with self._transaction() as connection:
+            updated = connection.execute(
+                "UPDATE tasks SET lease_expires = ?, updated_at = ? "
+                "WHERE id = ? AND lease_token = ? AND status = 'leased' AND lease_expires > ?",
+                (expires_at, now, lease.task_id, lease.token, now),
+            ).rowcount
+        if updated:
+            lease.expires_at = expires_at
+        return bool(updated)
+
+    def complete(self, lease: Lease, result: Optional[Dict[str, Any]] = None) -> bool:
+        return self._finish(lease, "done", result=json.dumps(result or {}))
+
+    def fail(self, lease: Lease, error: str) -> bool:
+        status = "failed" if lease.attempts >= self.max_attempts else "pending"
+        return self._finish(lease, status, error=error)
+
+    def _finish(self, lease: Lease, status: str, result: Optional[str] = None, error: Optional[str] = None) -> bool:
+        now = time.time()
+        with self._transaction() as connection:
+            updated = connection.execute(
+                "UPDATE tasks SET status = ?, lease_token = NULL, lease_owner = NULL, lease_expires = NULL, "
+                "updated_at = ?, result = COALESCE(?, result), last_error = COALESCE(?, last_error) "
+                "WHERE id = ? AND lease_token = ? AND status = 'leased'",
+                (status, now, result, error, lease.task_id, lease.token),
+            ).rowcount
+        return bool(updated)
+
+    def requeue_expired(self) -> int:
+        with self._transaction() as connection:
+            return self._expire(connection, time.time())
+
+    def _expire(self, connection: sqlite3.Connection, now: float) -> int:
+        # A worker that died mid-task leaves an expired lease; hand it to the
+        # next claimant unless it has already used up its attempts.
+        failed = connection.execute(
+            "UPDATE tasks SET status = 'failed', lease_token = NULL, lease_owner = NULL, updated_at = ?, "
+            "last_error = 'lease expired' WHERE queue = ? AND status = 'leased' AND lease_expires <= ? AND attempts >= ?",
+            (now, self.queue, now, self.max_attempts),
+        ).rowcount
+        requeued = connection.execute(
+            "UPDATE tasks SET status = 'pending', lease_token = NULL, lease_owner = NULL, updated_at = ? "
+            "WHERE queue = ? AND status = 'leased' AND lease_expires <= ?",
+            (now, self.queue, now),
+        ).rowcount
+        return failed + requeued
+
+    def stats(self) -> Dict[str, int]:
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT status, COUNT(*) AS count FROM tasks WHERE queue = ? GROUP BY status", (self.queue,)
+            ).fetchall()
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        counts.update({row["status"]: row["count"] for row in rows})
+        return counts
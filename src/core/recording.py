@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from collections import defaultdict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from src.core.schemas import models
+
+TAPE_FORMAT = "io_tape/v1"
+MODEL_TAG = "__model__"
+
+
+class ReplayMissError(LookupError):
+    pass
+
+
+class IOTape:
+    # Records the arguments and result of each wrapped call, or in replay mode
+    # answers calls from an earlier recording without running them. Identical
+    # calls are matched by arguments and replayed in their recorded order.
+    def __init__(self, mode: str = "record", entries: Optional[List[Dict[str, Any]]] = None) -> None:
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown tape mode: {mode}")
+        self.mode = mode
+        self.entries: List[Dict[str, Any]] = list(entries or [])
+        self._pending: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        for entry in self.entries:
+            self._pending[entry["key"]].append(entry)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def replay(cls, document: Dict[str, Any]) -> IOTape:
+        if document.get("format") != TAPE_FORMAT:
+            raise ValueError("Not an I/O recording")
+        return cls("replay", document["entries"])
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def call(self, name: str, fn: Optional[Callable[..., Any]], *args: Any, **kwargs: Any) -> Any:
+        key = _call_key(name, args, kwargs)
+        if self.replaying:
+            with self._lock:
+                pending = self._pending.get(key)
+                if not pending:
+                    raise ReplayMissError(f"No recorded {name} call with these arguments")
+                return decode_value(pending.popleft()["result"])
+        result = fn(*args, **kwargs)
+        entry = {"name": name, "key": key, "args": encode_value(list(args)), "kwargs": encode_value(kwargs)}
+        entry["result"] = encode_value(result)
+        with self._lock:
+            self.entries.append(entry)
+        return result
+
+    def wrap(self, name: str, fn: Optional[Callable[..., Any]]) -> Callable[..., Any]:
+        def call(*args: Any, **kwargs: Any) -> Any:
+            return self.call(name, fn, *args, **kwargs)
+
+        call.__name__ = name
+        return call
+
+    def document(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"format": TAPE_FORMAT, "entries": list(self.entries)}
+
+
+def encode_value(value: Any) -> Any:
+    # Models keep their class name (and aliases) so replay returns the same types.
+    if isinstance(value, BaseModel):
+        return {MODEL_TAG: type(value).__name__, "data": value.model_dump(mode="json", by_alias=True)}
+    if isinstance(value, dict):
+        return {str(key): encode_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode_value(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if MODEL_TAG in value:
+            return getattr(models, value[MODEL_TAG]).model_validate(value["data"])
+        return {key: decode_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [decode_value(item) for item in value]
+    return value
+
+
+def _call_key(name: str, args: Any, kwargs: Dict[str, Any]) -> str:
+    body = json.dumps([name, encode_value(list(args)), encode_value(kwargs)], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(body.encode("utf-8")).hexdigest()
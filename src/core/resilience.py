@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Optional, TypeVar
+
+from src.core.profiling import attributed
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class BulkheadFullError(RuntimeError):
+    pass
+
+
+@dataclass
+class GuardPolicy:
+    slo_s: float = 2.0
+    timeout_s: float = 10.0
+    failure_threshold: int = 5
+    reset_after_s: float = 30.0
+    hedge: bool = True
+    min_samples: int = 20
+    max_concurrency: int = 4
+
+
+class CircuitBreaker:
+    # Opens after failure_threshold consecutive bad calls, where a call that
+    # raised, timed out or exceeded the latency SLO counts as bad. After
+    # reset_after_s one trial call is let through (half-open); it closes the
+    # breaker on success and re-opens it otherwise.
+    def __init__(self, failure_threshold: int = 5, reset_after_s: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_after_s = reset_after_s
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_after_s:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def release(self) -> None:
+        # Gives back a half-open trial that never reached the source.
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            self._trial_in_flight = False
+            if ok:
+                self._failures = 0
+                self.state = "closed"
+                return
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class LatencyWindow:
+    def __init__(self, size: int = 200) -> None:
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class Guard:
+    # Each guard runs calls on its own bounded pool (a bulkhead). Calls that a
+    # hung source leaves running keep only that source's slots busy; once all
+    # of them are taken, its calls fail fast instead of queueing.
+    def __init__(
+        self,
+        policy: GuardPolicy,
+        executor: Optional[Executor] = None,
+        on_hedge: Optional[Callable[[], None]] = None,
+        name: str = "guard",
+    ) -> None:
+        self.policy = policy
+        self.breaker = CircuitBreaker(policy.failure_threshold, policy.reset_after_s)
+        self.latency = LatencyWindow()
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=policy.max_concurrency, thread_name_prefix=name)
+        self._on_hedge = on_hedge
+        self._in_flight = 0
+        self._slots_lock = threading.Lock()
+        self._timing_out = False
+
+    def hedge_after(self) -> float:
+        # Until there is enough history, hedge at the SLO.
+        p95 = self.latency.quantile(0.95, self.policy.min_samples)
+        return min(p95, self.policy.slo_s) if p95 is not None else self.policy.slo_s
+
+    def call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if not self.breaker.allow():
+            raise CircuitOpenError("circuit open")
+        start = time.monotonic()
+        try:
+            result = self._hedged(fn, args, kwargs)
+        except BulkheadFullError:
+            # Local saturation says nothing about the source's health.
+            self.breaker.release()
+            raise
+        except BaseException:
+            self.breaker.record(False)
+            raise
+        elapsed = time.monotonic() - start
+        self.latency.observe(elapsed)
+        self.breaker.record(elapsed <= self.policy.slo_s)
+        return result
+
+    def close(self) -> None:
+        if self._owns_executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _hedged(self, fn: Callable[..., T], args: Any, kwargs: Any) -> T:
+        # Only for idempotent reads: a second identical request goes out once
+        # the first is slower than p95, and whichever answers first wins. Calls
+        # still running after timeout_s are abandoned and hold their slot until
+        # they return. While the source is timing out a hedge would only take
+        # another slot, so none is sent.
+        deadline = time.monotonic() + self.policy.timeout_s
+        primary = self._submit(fn, args, kwargs)
+        if primary is None:
+            raise BulkheadFullError(f"all {self.policy.max_concurrency} slots busy")
+        pending = {primary}
+        if self.policy.hedge and not self._timing_out:
+            done, _ = wait(pending, timeout=min(self.hedge_after(), self.policy.timeout_s))
+            hedge = None if done else self._submit(fn, args, kwargs)
+            if hedge is not None:
+                if self._on_hedge:
+                    self._on_hedge()
+                pending.add(hedge)
+        error: Optional[BaseException] = None
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    _cancel(pending)
+                    self._timing_out = False
+                    return future.result()
+        _cancel(pending)
+        if error is not None and not pending:
+            raise error
+        self._timing_out = True
+        raise TimeoutError(f"no response within {self.policy.timeout_s}s")
+
+    def _submit(self, fn: Callable[..., T], args: Any, kwargs: Any) -> "Optional[Future[T]]":
+        with self._slots_lock:
+            if self._in_flight >= self.policy.max_concurrency:
+                return None
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(attributed(fn), *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _future: Any = None) -> None:
+        with self._slots_lock:
+            self._in_flight -= 1
+
+
+def _cancel(futures: "set[Future[Any]]") -> None:
+    for future in futures:
+        future.cancel()
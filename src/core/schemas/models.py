@@ -1,10 +1,15 @@
 from __future__ import annotations
 
 from datetime import date, datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple, Type, TypeVar
 
 from pydantic import BaseModel, Field
 
+# NewsArticle has a field named ``date`` which would otherwise shadow the type.
+_Date = date
+
+M = TypeVar("M", bound=BaseModel)
+
 
 class RunPaths(BaseModel):
     base_path: str
@@ -80,7 +85,7 @@ class OwnershipSnapshot(BaseModel):
 
 class NewsArticle(BaseModel):
     title: str
-    date: Optional[date] = None
+    date: Optional[_Date] = None
     source: Optional[str] = None
     url: Optional[str] = None
     snippet: Optional[str] = None
@@ -160,3 +165,55 @@ class AnalysisPacket(BaseModel):
     persona_review: Optional[PersonaReview] = None
     investment_plan: Optional[InvestmentPlan] = None
     citations_map: Dict[str, str] = Field(default_factory=dict)
+
+
+_Template = Tuple[Dict[str, Any], List[Tuple[str, Callable[[], Any]]], FrozenSet[str]]
+_TEMPLATES: Dict[type, _Template] = {}
+
+
+def _template(model: Type[BaseModel]) -> _Template:
+    template = _TEMPLATES.get(model)
+    if template is None:
+        fields = model.model_fields
+        template = (
+            # Every field is present so merged rows keep declaration order, which dumps follow.
+            {
+                name: None if field.is_required() or field.default_factory is not None else field.default
+                for name, field in fields.items()
+            },
+            [(name, field.default_factory) for name, field in fields.items() if field.default_factory is not None],
+            frozenset(name for name, field in fields.items() if field.is_required()),
+        )
+        _TEMPLATES[model] = template
+    return template
+
+
+def trusted(model: Type[M], **values: Any) -> M:
+    return trusted_list(model, [values])[0]
+
+
+def trusted_list(model: Type[M], rows: Iterable[Dict[str, Any]]) -> List[M]:
+    # Builds models without validation, for data the pipeline produced itself
+    # or already validated. Values are keyed by field name (not alias), nested
+    # models are passed as instances and dates as date objects. model_construct
+    # does the same but runs in Python and is slower than pydantic-core
+    # validation, so the instance state is set directly. Requests are still
+    # validated at the API boundary.
+    defaults, factories, required = _template(model)
+    new = model.__new__
+    setattr_ = object.__setattr__
+    instances = []
+    for row in rows:
+        if not required <= row.keys():
+            raise TypeError(f"{model.__name__}: missing fields {sorted(required - row.keys())}")
+        state = {**defaults, **row}
+        for name, factory in factories:
+            if name not in row:
+                state[name] = factory()
+        instance = new(model)
+        setattr_(instance, "__dict__", state)
+        setattr_(instance, "__pydantic_fields_set__", set(row))
+        setattr_(instance, "__pydantic_extra__", None)
+        setattr_(instance, "__pydantic_private__", None)
+        instances.append(instance)
+    return instances
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import json
+import tarfile
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+if TYPE_CHECKING:
+    from src.core.storage.backend import StorageBackend
+
+MEMBER_SEPARATOR = "#"
+ARCHIVE_DIR = "archive"
+# First member of every archive part: the index entries of the runs inside.
+MANIFEST_MEMBER = "index_entries.json"
+ARTIFACT_FIELDS = ("report_s3_path", "analysis_packet_s3_path", "citations_map_s3_path")
+
+
+def read_artifact(path: str, storage: Optional[StorageBackend] = None) -> bytes:
+    # Index paths of archived runs look like "<archive>.tar.gz#<member>";
+    # archives are local, everything else is read through the backend.
+    archive, separator, member = path.partition(MEMBER_SEPARATOR)
+    if not separator or not archive.endswith(".tar.gz"):
+        return storage.read_bytes(path) if storage is not None else Path(path).read_bytes()
+    with tarfile.open(archive, "r:gz") as tar:
+        handle = tar.extractfile(member)
+        if handle is None:
+            raise FileNotFoundError(path)
+        return handle.read()
+
+
+def resolve_artifact_ref(ref: str, storage: StorageBackend) -> str:
+    # Turns a client-supplied ref, relative to the runs tree, into a path the
+    # backend can read. Anything that could name a file outside the tree
+    # (absolute paths, URIs, ".." segments, symlinks leading out) is refused.
+    archive, separator, member = ref.partition(MEMBER_SEPARATOR)
+    for part in (archive, member) if separator else (archive,):
+        path = PurePosixPath(part)
+        if not part or "://" in part or "\\" in part or path.is_absolute() or ".." in path.parts:
+            raise ValueError(f"Artifact ref must be a relative path inside the runs tree: {ref}")
+    if separator and (not archive.endswith(".tar.gz") or PurePosixPath(archive).parts[0] != ARCHIVE_DIR):
+        raise ValueError(f"Archive refs must name a part under {ARCHIVE_DIR}/: {ref}")
+    resolved = storage.path(archive)
+    if storage.local:
+        root = Path(storage.path("")).resolve()
+        if not Path(resolved).resolve().is_relative_to(root):
+            raise ValueError(f"Artifact ref resolves outside the runs tree: {ref}")
+    return f"{resolved}{MEMBER_SEPARATOR}{member}" if separator else resolved
+
+
+def read_archive_manifest(archive: Path) -> Dict[str, Dict[str, Any]]:
+    with tarfile.open(archive, "r:gz") as tar:
+        member = tar.next()
+        if member is None or member.name != MANIFEST_MEMBER:
+            raise ValueError(f"{archive} has no {MANIFEST_MEMBER}")
+        return json.loads(tar.extractfile(member).read())
+
+
+def follow_archived_source(entry: Dict[str, Any], source: Dict[str, Any]) -> Dict[str, Any]:
+    # A carried-forward entry serves its source run's artifacts; once that run
+    # is archived they are read from the source's archive part.
+    return {**entry, **{name: source[name] for name in ARTIFACT_FIELDS if entry.get(name) and source.get(name)}}
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+FSYNC_POLICIES = ("always", "batch", "never")
+
+
+def validate_fsync_policy(policy: str) -> str:
+    normalized = policy.lower()
+    if normalized not in FSYNC_POLICIES:
+        raise ValueError(f"Unknown fsync policy: {policy}")
+    return normalized
+
+
+def temp_path_for(path: Path) -> Path:
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def write_temp(path: Path, body: bytes, fsync: bool) -> Path:
+    tmp_path = temp_path_for(path)
+    with open(tmp_path, "wb") as handle:
+        handle.write(body)
+        if fsync:
+            handle.flush()
+            os.fsync(handle.fileno())
+    return tmp_path
+
+
+def fsync_file(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def fsync_dirs(paths: Iterable[Path]) -> None:
+    for directory in {path.parent for path in paths}:
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+def atomic_write_bytes(path: Path, body: bytes, fsync: bool = True, fsync_dir: Optional[bool] = None) -> None:
+    # The temp file is fsynced before the rename, so a crash never leaves a
+    # renamed but empty file; callers that batch may defer the directory fsync.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = write_temp(path, body, fsync)
+    try:
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    if fsync if fsync_dir is None else fsync_dir:
+        fsync_dirs([path])
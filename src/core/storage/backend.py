@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.core.storage.serialization import Serializer
+
+PLAIN_JSON = Serializer("compact")
+
+
+class StorageBackend(ABC):
+    # False for object stores, where the run index lives in the backend too.
+    local = True
+
+    @abstractmethod
+    def ensure_dir(self, path: str) -> Any:
+        ...
+
+    @abstractmethod
+    def write_json(self, path: str, payload: Dict[str, Any]) -> str:
+        ...
+
+    def write_plain_json(self, path: str, payload: Dict[str, Any]) -> str:
+        # Artifacts whose paths are handed to clients stay plain JSON whatever
+        # serializer the backend uses for its other artifacts.
+        return self.write_bytes(path, PLAIN_JSON.encode(payload))
+
+    @abstractmethod
+    def write_text(self, path: str, content: str) -> str:
+        ...
+
+    @abstractmethod
+    def write_bytes(self, path: str, body: bytes) -> str:
+        ...
+
+    def write_batch(self, items: Dict[str, bytes]) -> Dict[str, str]:
+        return {path: self.write_bytes(path, body) for path, body in items.items()}
+
+    @abstractmethod
+    def read_bytes(self, path: str) -> bytes:
+        # Accepts a path relative to the backend or one returned by path().
+        ...
+
+    @abstractmethod
+    def read_json(self, path: str) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def exists(self, path: str) -> bool:
+        ...
+
+    @abstractmethod
+    def path(self, path: str) -> str:
+        ...
+
+    @abstractmethod
+    def list_runs(self) -> list[str]:
+        ...
+
+    # Versioned reads and conditional writes back a shared run index kept in
+    # the backend; only object stores implement them.
+    def read_versioned(self, path: str) -> Tuple[bytes, str]:
+        raise NotImplementedError(f"{type(self).__name__} does not support versioned reads")
+
+    def write_if_match(self, path: str, body: bytes, version: Optional[str]) -> bool:
+        raise NotImplementedError(f"{type(self).__name__} does not support conditional writes")
+
+    def version(self, path: str) -> Optional[str]:
+        raise NotImplementedError(f"{type(self).__name__} does not support versioned reads")
+
+    def flush(self) -> None:
+        return None
+
+    def flush_then(self, callback: Callable[[], None]) -> None:
+        # Runs callback once every write so far is persisted, e.g. to publish
+        # an index entry only when the artifacts it points at exist.
+        self.flush()
+        callback()
+
+    def wait(self) -> None:
+        # Blocks until every write so far, and its flush_then callback, is done.
+        self.flush()
+
+    def close(self) -> None:
+        self.flush()
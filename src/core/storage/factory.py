@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+from src.core.config import Settings, get_settings
+from src.core.storage.backend import StorageBackend
+from src.core.storage.local_storage import LocalStorage
+from src.core.storage.run_index import RunIndex
+from src.core.storage.serialization import Serializer
+
+
+_shared: Optional[Tuple[Settings, StorageBackend]] = None
+_shared_lock = threading.Lock()
+
+
+def get_storage() -> StorageBackend:
+    # One backend per process, so every run reuses the S3 client's connection
+    # pool and upload threads. It is rebuilt only when the settings are
+    # reloaded (get_settings.cache_clear()).
+    global _shared
+    settings = get_settings()
+    with _shared_lock:
+        if _shared is not None and _shared[0] is settings:
+            return _shared[1]
+        previous, _shared = _shared, (settings, create_storage(settings))
+        storage = _shared[1]
+    if previous is not None:
+        previous[1].close()
+    return storage
+
+
+def close_storage() -> None:
+    global _shared
+    with _shared_lock:
+        previous, _shared = _shared, None
+    if previous is not None:
+        previous[1].close()
+
+
+def create_storage(settings: Settings) -> StorageBackend:
+    serializer = Serializer(settings.serialization_format, settings.serialization_compression)
+    storage = _create_backend(settings, serializer)
+    if settings.write_behind:
+        from src.core.storage.write_behind import WriteBehindStorage
+
+        if serializer.format == "json":
+            serializer = Serializer("compact", serializer.compression)
+        return WriteBehindStorage(storage, serializer=serializer)
+    return storage
+
+
+def create_run_index(settings: Settings, storage: Optional[StorageBackend] = None) -> RunIndex:
+    # Artifact paths in the index are read back through the storage backend;
+    # with S3 the index document itself is kept in the bucket.
+    return RunIndex(
+        str(Path(settings.runs_dir) / "run_index.json"),
+        fsync_policy=settings.fsync_policy,
+        storage=storage or create_storage(settings),
+    )
+
+
+def _create_backend(settings: Settings, serializer: Serializer) -> StorageBackend:
+    backend = settings.storage_backend.lower()
+    if backend == "local":
+        return LocalStorage(settings.runs_dir, fsync_policy=settings.fsync_policy, serializer=serializer)
+    if backend == "s3":
+        from src.core.storage.s3_storage import S3Storage
+
+        return S3Storage(
+            bucket=settings.runs_bucket or "",
+            prefix=settings.s3_prefix,
+            endpoint_url=settings.s3_endpoint_url,
+            max_concurrency=settings.s3_max_concurrency,
+            multipart_threshold=settings.s3_multipart_threshold,
+            serializer=serializer,
+        )
+    raise ValueError(f"Unknown storage backend: {settings.storage_backend}")
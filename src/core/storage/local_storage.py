@@ -1,15 +1,34 @@
 from __future__ import annotations
 
-import json
 import os
+import threading
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Set
 
+from src.core.metrics import STORAGE_BYTES_WRITTEN
+from src.core.storage.atomic import (
+    atomic_write_bytes,
+    fsync_dirs,
+    validate_fsync_policy,
+    write_temp,
+)
+from src.core.storage.backend import StorageBackend
+from src.core.storage.serialization import Serializer, decode
 
-class LocalStorage:
-    def __init__(self, base_dir: str = "runs") -> None:
+
+class LocalStorage(StorageBackend):
+    def __init__(
+        self,
+        base_dir: str = "runs",
+        fsync_policy: str = "batch",
+        serializer: Optional[Serializer] = None,
+    ) -> None:
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.fsync_policy = validate_fsync_policy(fsync_policy)
+        self.serializer = serializer or Serializer()
+        self._dirty: Set[Path] = set()
+        self._lock = threading.Lock()
 
     def ensure_dir(self, path: str) -> Path:
         full_path = self.base_dir / path
@@ -17,20 +36,52 @@ class LocalStorage:
         return full_path
 
     def write_json(self, path: str, payload: Dict[str, Any]) -> str:
-        full_path = self.base_dir / path
-        full_path.parent.mkdir(parents=True, exist_ok=True)
-        full_path.write_text(json.dumps(payload, indent=2, default=str), encoding="utf-8")
-        return str(full_path)
+        return self.write_bytes(path, self.serializer.encode(payload))
 
     def write_text(self, path: str, content: str) -> str:
+        return self.write_bytes(path, content.encode("utf-8"))
+
+    def write_bytes(self, path: str, body: bytes) -> str:
         full_path = self.base_dir / path
-        full_path.parent.mkdir(parents=True, exist_ok=True)
-        full_path.write_text(content, encoding="utf-8")
+        atomic_write_bytes(
+            full_path,
+            body,
+            fsync=self.fsync_policy != "never",
+            fsync_dir=self.fsync_policy == "always",
+        )
+        STORAGE_BYTES_WRITTEN.inc(len(body), backend="local")
+        if self.fsync_policy == "batch":
+            # File contents are synced before the rename; under "batch" the
+            # renames are made durable once per run by flush(), one fsync per
+            # directory instead of one per file.
+            with self._lock:
+                self._dirty.add(full_path)
         return str(full_path)
 
+    def write_batch(self, items: Dict[str, bytes]) -> Dict[str, str]:
+        fsync = self.fsync_policy != "never"
+        staged = []
+        try:
+            for path, body in items.items():
+                full_path = self.base_dir / path
+                full_path.parent.mkdir(parents=True, exist_ok=True)
+                staged.append((write_temp(full_path, body, fsync), full_path))
+        except BaseException:
+            for tmp_path, _ in staged:
+                tmp_path.unlink(missing_ok=True)
+            raise
+        for tmp_path, full_path in staged:
+            os.replace(tmp_path, full_path)
+        if fsync:
+            fsync_dirs(full_path for _, full_path in staged)
+        STORAGE_BYTES_WRITTEN.inc(sum(len(body) for body in items.values()), backend="local")
+        return {path: str(self.base_dir / path) for path in items}
+
+    def read_bytes(self, path: str) -> bytes:
+        return self._full_path(path).read_bytes()
+
     def read_json(self, path: str) -> Dict[str, Any]:
-        full_path = self.base_dir / path
-        return json.loads(full_path.read_text(encoding="utf-8"))
+        return decode(self.read_bytes(path))
 
     def exists(self, path: str) -> bool:
         return (self.base_dir / path).exists()
@@ -38,5 +89,19 @@ class LocalStorage:
     def path(self, path: str) -> str:
         return str(self.base_dir / path)
 
+    def _full_path(self, path: str) -> Path:
+        # Paths stored in the run index already start with base_dir.
+        candidate = Path(path)
+        if candidate.is_absolute() or candidate.parts[: len(self.base_dir.parts)] == self.base_dir.parts:
+            return candidate
+        return self.base_dir / path
+
     def list_runs(self) -> list[str]:
         return [p.name for p in self.base_dir.iterdir() if p.is_dir()]
+
+    def flush(self) -> None:
+        with self._lock:
+            dirty = self._dirty
+            self._dirty = set()
+        if dirty:
+            fsync_dirs(dirty)
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.core.storage.artifacts import read_artifact
+from src.core.storage.serialization import decode
+
+if TYPE_CHECKING:
+    from src.core.storage.backend import StorageBackend
+    from src.core.storage.run_index import RunIndex
+
+logger = logging.getLogger(__name__)
+
+DELTA_FORMAT = "analysis_packet_delta/v1"
+FULL_NAME = "analysis_packet.json"
+DELTA_NAME = "analysis_packet.delta.json"
+MAX_CHAIN = 256
+
+
+# Ops are JSON documents addressed by a path of dict keys:
+#   {"op": "set", "path": [...], "value": ...}
+#   {"op": "remove", "path": [...]}
+#   {"op": "list", "path": [...], "keys": [...], "values": {key: item}}
+# "list" rebuilds a list from content keys, reusing the base's items and
+# carrying only new ones, so a day's fresh articles cost only those articles.
+def diff(old: Any, new: Any, path: Sequence[str] = ()) -> List[Dict[str, Any]]:
+    if old == new:
+        return []
+    if isinstance(old, dict) and isinstance(new, dict):
+        ops: List[Dict[str, Any]] = []
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "set", "path": [*path, key], "value": value})
+            elif old[key] != value:
+                ops.extend(diff(old[key], value, (*path, key)))
+        ops.extend({"op": "remove", "path": [*path, key]} for key in old if key not in new)
+        return ops
+    if isinstance(old, list) and isinstance(new, list) and old and new:
+        base_keys = {_item_key(item) for item in old}
+        keys = [_item_key(item) for item in new]
+        values = {key: item for key, item in zip(keys, new) if key not in base_keys}
+        if len(values) < len(set(keys)):
+            return [{"op": "list", "path": list(path), "keys": keys, "values": values}]
+    return [{"op": "set", "path": list(path), "value": new}]
+
+
+def apply(base: Any, ops: List[Dict[str, Any]]) -> Any:
+    # Applies in place where possible; callers pass a freshly decoded base.
+    for op in ops:
+        path = op["path"]
+        if not path:
+            base = _replacement(base, op)
+            continue
+        parent = base
+        for key in path[:-1]:
+            parent = parent[key]
+        if op["op"] == "remove":
+            parent.pop(path[-1], None)
+        else:
+            parent[path[-1]] = _replacement(parent.get(path[-1]), op)
+    return base
+
+
+def _replacement(current: Any, op: Dict[str, Any]) -> Any:
+    if op["op"] == "set":
+        return op["value"]
+    if op["op"] == "list":
+        by_key = {_item_key(item): item for item in current or []}
+        values = op["values"]
+        return [values[key] if key in values else by_key[key] for key in op["keys"]]
+    raise ValueError(f"Unknown delta op: {op['op']}")
+
+
+def _item_key(item: Any) -> str:
+    body = json.dumps(item, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(body.encode("utf-8")).hexdigest()[:16]
+
+
+def changed_sections(ops: List[Dict[str, Any]]) -> List[str]:
+    return sorted({op["path"][0] for op in ops if op["path"]})
+
+
+def load_packet(
+    path: str,
+    resolve: Optional[Callable[[str], Optional[str]]] = None,
+    storage: Optional[StorageBackend] = None,
+) -> Dict[str, Any]:
+    # resolve maps a base run_id to its current index path, which still finds
+    # bases that retention has since moved into an archive.
+    chain = []
+    document = decode(read_artifact(path, storage))
+    while document.get("format") == DELTA_FORMAT:
+        chain.append(document)
+        if len(chain) > MAX_CHAIN:
+            raise ValueError(f"Delta chain too long at {path}")
+        base_path = (resolve(document["base_run_id"]) if resolve else None) or document["base_path"]
+        document = decode(read_artifact(base_path, storage))
+    for delta in reversed(chain):
+        document = apply(document, delta["ops"])
+    return document
+
+
+def index_resolver(run_index: RunIndex) -> Callable[[str], Optional[str]]:
+    def resolve(run_id: str) -> Optional[str]:
+        entry = run_index.find_by_run_id(run_id)
+        return entry.get("analysis_packet_s3_path") if entry else None
+
+    return resolve
+
+
+def write_packet(
+    storage: StorageBackend,
+    parsed_path: str,
+    packet: Dict[str, Any],
+    previous: Optional[Dict[str, Any]],
+    snapshot_every: int,
+    resolve: Optional[Callable[[str], Optional[str]]] = None,
+    full: bool = False,
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    # Writes a delta against the previous run, or a full snapshot when asked
+    # to, when there is nothing to diff against, or every snapshot_every runs
+    # so that chains stay short.
+    depth = ((previous or {}).get("packet_delta") or {}).get("depth", 0) + 1
+    base_path = (previous or {}).get("analysis_packet_s3_path")
+    if not full and base_path and snapshot_every > 1 and depth < snapshot_every:
+        try:
+            base = load_packet(base_path, resolve, storage)
+        except (OSError, ValueError, KeyError):
+            logger.warning("Cannot load base packet %s; writing a full snapshot", base_path)
+        else:
+            delta = {"base_run_id": previous["run_id"], "depth": depth}
+            storage.write_json(
+                f"{parsed_path}/{DELTA_NAME}",
+                {"format": DELTA_FORMAT, **delta, "base_path": base_path, "ops": diff(base, packet)},
+            )
+            return f"{parsed_path}/{DELTA_NAME}", delta
+    storage.write_plain_json(f"{parsed_path}/{FULL_NAME}", packet)
+    return f"{parsed_path}/{FULL_NAME}", None
+
+
+def diff_runs(run_index: RunIndex, run_id: str, against: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    entry = run_index.find_by_run_id(run_id)
+    if entry is None:
+        return None
+    base = run_index.find_by_run_id(against) if against else run_index.previous_run(run_id)
+    if against and base is None:
+        return None
+    if base is None:
+        return {"run_id": run_id, "base_run_id": None, "changed_sections": [], "ops": []}
+    resolve = index_resolver(run_index)
+    storage = run_index.storage
+    stored = entry.get("packet_delta") or {}
+    if stored.get("base_run_id") == base["run_id"]:
+        # The stored delta already is this diff.
+        ops = decode(read_artifact(entry["analysis_packet_s3_path"], storage))["ops"]
+    else:
+        ops = diff(
+            load_packet(base["analysis_packet_s3_path"], resolve, storage),
+            load_packet(entry["analysis_packet_s3_path"], resolve, storage),
+        )
+    return {"run_id": run_id, "base_run_id": base["run_id"], "changed_sections": changed_sections(ops), "ops": ops}
@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import tarfile
+import threading
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.config import get_settings
+from src.core.storage.artifacts import (
+    ARCHIVE_DIR,
+    ARTIFACT_FIELDS,
+    MANIFEST_MEMBER,
+    MEMBER_SEPARATOR,
+    follow_archived_source,
+)
+from src.core.storage.atomic import fsync_dirs, fsync_file, temp_path_for
+from src.core.storage.factory import create_run_index
+from src.core.storage.run_index import RunIndex
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RetentionPolicy:
+    keep_approved: bool = True
+    keep_last_blocked: int = 5
+    min_age_days: int = 30
+
+
+@dataclass
+class RetentionReport:
+    archived_runs: int = 0
+    archives: List[str] = field(default_factory=list)
+    removed_dirs: int = 0
+    remaining: int = 0
+
+
+@dataclass
+class _Candidate:
+    ticker: str
+    key: str
+    entry: Dict[str, Any]
+    as_of_date: str
+    run_id: str
+
+
+class RetentionEngine:
+    def __init__(self, runs_dir: str, run_index: RunIndex, policy: Optional[RetentionPolicy] = None, fsync: bool = True) -> None:
+        self.runs_dir = Path(runs_dir)
+        self.run_index = run_index
+        self.policy = policy or RetentionPolicy()
+        self.fsync = fsync
+
+    def plan(self, today: Optional[date] = None) -> List[_Candidate]:
+        today = today or date.today()
+        cutoff = str(today - timedelta(days=self.policy.min_age_days))
+        data = self.run_index.entries()
+        candidates = []
+        for ticker, entries in data.items():
+            # Carried-forward entries age out like any other run; only the run
+            # behind the newest one, the analysis the ticker serves, is pinned.
+            carried = [entry for entry in entries.values() if entry.get("carried_forward")]
+            newest = max(carried, key=lambda entry: entry.get("created_at", ""), default={})
+            pinned = newest.get("carried_forward_from")
+            blocked = []
+            for key, entry in entries.items():
+                if entry.get("status") == "approved" and self.policy.keep_approved:
+                    continue
+                blocked.append((key, entry))
+            blocked.sort(key=lambda item: (item[1].get("created_at", ""), item[0]), reverse=True)
+            for key, entry in blocked[self.policy.keep_last_blocked :]:
+                as_of_date, _, run_id = key.partition("#")
+                run_id = entry.get("run_id") or run_id
+                if entry.get("archived") or run_id == pinned or as_of_date >= cutoff:
+                    continue
+                candidates.append(_Candidate(ticker, key, entry, as_of_date, run_id))
+        return sorted(candidates, key=lambda candidate: (candidate.ticker, candidate.as_of_date, candidate.key))
+
+    def run(self, today: Optional[date] = None, max_runs: Optional[int] = None, dry_run: bool = False) -> RetentionReport:
+        report = RetentionReport()
+        if not dry_run:
+            report.removed_dirs += self._remove_leftovers()
+        candidates = self.plan(today)
+        if max_runs is not None:
+            report.remaining = max(0, len(candidates) - max_runs)
+            candidates = candidates[:max_runs]
+        groups: Dict[Tuple[str, str], List[_Candidate]] = {}
+        for candidate in candidates:
+            groups.setdefault((candidate.ticker, candidate.as_of_date[:7]), []).append(candidate)
+        for (ticker, month), members in sorted(groups.items()):
+            archive_path = self._next_part(ticker, month)
+            report.archives.append(str(archive_path))
+            report.archived_runs += len(members)
+            if dry_run:
+                continue
+            self._archive_group(archive_path, members)
+            report.removed_dirs += self._remove_run_dirs(members)
+        return report
+
+    def run_forever(self, interval_s: float, stop: threading.Event, max_runs: Optional[int] = None) -> None:
+        # Small batches on a timer keep each pass short enough to run next to the pipeline.
+        while not stop.is_set():
+            try:
+                report = self.run(max_runs=max_runs)
+                if report.archived_runs:
+                    logger.info("Archived %d runs into %d archives", report.archived_runs, len(report.archives))
+            except Exception:
+                logger.exception("Retention pass failed")
+            stop.wait(interval_s)
+
+    def _run_dirs(self, candidate: _Candidate) -> List[Path]:
+        return [
+            self.runs_dir / candidate.ticker / candidate.as_of_date / candidate.run_id,
+            self.runs_dir / "training" / candidate.ticker / candidate.as_of_date / candidate.run_id,
+        ]
+
+    def _next_part(self, ticker: str, month: str) -> Path:
+        # Each pass writes a new part instead of rewriting the month's archive,
+        # so a pass costs only the runs it archives.
+        directory = self.runs_dir / ARCHIVE_DIR / ticker
+        pattern = re.compile(rf"{re.escape(month)}\.part(\d+)\.tar\.gz")
+        parts = [int(match.group(1)) for match in map(pattern.fullmatch, _names(directory)) if match]
+        return directory / f"{month}.part{max(parts, default=0) + 1}.tar.gz"
+
+    def _archive_group(self, archive_path: Path, members: List[_Candidate]) -> None:
+        # 1) write the part atomically, 2) point the index at it in one rewrite,
+        # 3) delete the directories. A crash between steps leaves either
+        # untouched runs (archived again into a later part next pass) or
+        # archived entries whose leftover directories the next pass removes.
+        # The part starts with the archived index entries so RunIndex.rebuild()
+        # can restore them.
+        archive_path.parent.mkdir(parents=True, exist_ok=True)
+        entries = {candidate.key: self._archived_entry(candidate, archive_path) for candidate in members}
+        # Entries carried forward from these runs, archived with them or still
+        # live, now read the artifacts from this part.
+        sources = {entry["run_id"]: entry for entry in entries.values() if not entry.get("carried_forward")}
+        followers = {}
+        for key, entry in {**self.run_index.entries().get(members[0].ticker, {}), **entries}.items():
+            source = sources.get(entry.get("carried_forward_from"))
+            if source is not None:
+                followers[key] = follow_archived_source(entry, source)
+        entries.update({key: value for key, value in followers.items() if key in entries})
+        manifest = json.dumps({members[0].ticker: entries}, indent=2).encode("utf-8")
+        tmp_path = temp_path_for(archive_path)
+        try:
+            with tarfile.open(tmp_path, "w:gz") as archive:
+                info = tarfile.TarInfo(MANIFEST_MEMBER)
+                info.size = len(manifest)
+                archive.addfile(info, io.BytesIO(manifest))
+                for candidate in members:
+                    for path in self._run_dirs(candidate):
+                        if path.exists():
+                            archive.add(path, arcname=self._member_name(path))
+            if self.fsync:
+                fsync_file(tmp_path)
+            os.replace(tmp_path, archive_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        if self.fsync:
+            fsync_dirs([archive_path])
+        self.run_index.update_entries({members[0].ticker: {**followers, **entries}})
+
+    def _archived_entry(self, candidate: _Candidate, archive_path: Path) -> Dict[str, Any]:
+        entry = {**candidate.entry, "archived": True, "archive_path": str(archive_path)}
+        own_dirs = [path.resolve() for path in self._run_dirs(candidate)]
+        for field_name in ARTIFACT_FIELDS:
+            value = entry.get(field_name)
+            if not value:
+                continue
+            # Only artifacts inside this run's own directories are in the part;
+            # a carried-forward entry keeps pointing at its source run's.
+            resolved = Path(value).resolve()
+            if not any(resolved.is_relative_to(path) for path in own_dirs):
+                continue
+            member = resolved.relative_to(self.runs_dir.resolve())
+            entry[field_name] = f"{archive_path}{MEMBER_SEPARATOR}{member.as_posix()}"
+        return entry
+
+    def _member_name(self, path: Path) -> str:
+        return path.relative_to(self.runs_dir).as_posix()
+
+    def _remove_run_dirs(self, members: List[_Candidate]) -> int:
+        removed = 0
+        for candidate in members:
+            for path in self._run_dirs(candidate):
+                if path.exists():
+                    shutil.rmtree(path)
+                    removed += 1
+                    _prune_empty_parents(path.parent, self.runs_dir)
+        return removed
+
+    def _remove_leftovers(self) -> int:
+        leftovers = []
+        for ticker, entries in self.run_index.entries().items():
+            for key, entry in entries.items():
+                if entry.get("archived"):
+                    as_of_date, _, run_id = key.partition("#")
+                    leftovers.append(_Candidate(ticker, key, entry, as_of_date, entry.get("run_id") or run_id))
+        return self._remove_run_dirs(leftovers)
+
+
+def _names(directory: Path) -> List[str]:
+    return [path.name for path in directory.iterdir()] if directory.is_dir() else []
+
+
+def _prune_empty_parents(path: Path, stop: Path) -> None:
+    while path != stop and path.is_dir() and not any(path.iterdir()):
+        path.rmdir()
+        path = path.parent
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Archive old blocked runs into per ticker-month tarballs")
+    parser.add_argument("--runs-dir", default=None, help="Defaults to STOCK_RUNS_DIR")
+    parser.add_argument("--keep-last-blocked", type=int, default=5)
+    parser.add_argument("--min-age-days", type=int, default=30)
+    parser.add_argument("--archive-approved", action="store_true", help="Also archive approved runs past the limits")
+    parser.add_argument("--max-runs", type=int, default=None, help="Archive at most this many runs per pass")
+    parser.add_argument("--interval", type=float, default=0.0, help="Repeat every N seconds (0 runs one pass)")
+    parser.add_argument("--dry-run", action="store_true")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    settings = get_settings()
+    if settings.storage_backend.lower() != "local":
+        raise SystemExit("Retention archives local run directories; use bucket lifecycle rules for S3")
+    if args.runs_dir:
+        settings = settings.model_copy(update={"runs_dir": args.runs_dir})
+    engine = RetentionEngine(
+        settings.runs_dir,
+        create_run_index(settings),
+        RetentionPolicy(
+            keep_approved=not args.archive_approved,
+            keep_last_blocked=args.keep_last_blocked,
+            min_age_days=args.min_age_days,
+        ),
+        fsync=settings.fsync_policy != "never",
+    )
+    if args.interval > 0:
+        engine.run_forever(args.interval, threading.Event(), max_runs=args.max_runs)
+        return
+    report = engine.run(max_runs=args.max_runs, dry_run=args.dry_run)
+    action = "would archive" if args.dry_run else "archived"
+    print(
+        f"{action} {report.archived_runs} runs into {len(report.archives)} archives "
+        f"({report.removed_dirs} directories removed, {report.remaining} runs left for later passes)"
+    )
+
+
+if __name__ == "__main__":
+    main()
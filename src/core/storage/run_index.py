@@ -1,40 +1,348 @@
 from __future__ import annotations
 
 import json
+import logging
+import tarfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+from src.core.metrics import RUN_INDEX_SECONDS
+from src.core.storage.artifacts import ARCHIVE_DIR, follow_archived_source, read_archive_manifest
+from src.core.storage.atomic import atomic_write_bytes, validate_fsync_policy
+from src.core.storage.packet_delta import DELTA_FORMAT, DELTA_NAME, FULL_NAME, load_packet
+from src.core.storage.serialization import decode
+
+if TYPE_CHECKING:
+    from src.core.storage.backend import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "run_index.json"
+# Copy of a run's index entry, kept in its run directory (or in place of one,
+# for carried-forward runs) so rebuild() restores it exactly.
+ENTRY_NAME = "index_entry.json"
+UPDATE_ATTEMPTS = 10
 
 
 class RunIndex:
-    def __init__(self, path: str = "runs/run_index.json") -> None:
+    def __init__(
+        self,
+        path: str = "runs/run_index.json",
+        fsync_policy: str = "always",
+        runs_dir: Optional[str] = None,
+        storage: Optional[StorageBackend] = None,
+        version_ttl_s: float = 1.0,
+    ) -> None:
         self.path = Path(path)
+        self.runs_dir = Path(runs_dir) if runs_dir else self.path.parent
+        self.fsync_policy = validate_fsync_policy(fsync_policy)
+        # Artifact reads go through storage. On an object store the index
+        # document lives there too, so every task and host shares one index;
+        # the local path then only holds the lock file.
+        self.storage = storage
+        self.remote = storage is not None and not storage.local
+        self.version_ttl_s = version_ttl_s
+        self._version: Tuple[float, Any] = (float("-inf"), None)
+        self._lock = threading.Lock()
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        if not self.path.exists():
-            self.path.write_text(json.dumps({}, indent=2), encoding="utf-8")
+        if not self.remote and not self.path.exists():
+            self._write({})
 
     def _load(self) -> Dict[str, Any]:
-        return json.loads(self.path.read_text(encoding="utf-8"))
+        if self.remote:
+            return self._load_versioned()[0]
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (json.JSONDecodeError, UnicodeDecodeError, FileNotFoundError):
+            logger.warning("Run index %s is unreadable; rebuilding from run directories", self.path)
+            return self.rebuild()
+
+    def _load_versioned(self) -> Tuple[Dict[str, Any], Optional[str]]:
+        try:
+            body, version = self.storage.read_versioned(INDEX_NAME)
+        except FileNotFoundError:
+            return {}, None
+        data = json.loads(body)
+        if not isinstance(data, dict):
+            raise ValueError(f"Run index {INDEX_NAME} in storage is not a JSON object")
+        return data, version
 
     def _write(self, data: Dict[str, Any]) -> None:
-        self.path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        # The index is a single small file that every query depends on, so it is
+        # fsynced for both "always" and "batch"; only "never" skips it.
+        atomic_write_bytes(
+            self.path,
+            json.dumps(data, indent=2).encode("utf-8"),
+            fsync=self.fsync_policy != "never",
+        )
+
+    @contextmanager
+    def _process_lock(self) -> Iterator[None]:
+        # Queue workers in separate processes share one index file; serialise
+        # their read-modify-write cycles so no put is lost.
+        if fcntl is None:
+            yield
+            return
+        with open(self.path.with_name(self.path.name + ".lock"), "a") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _update(self, operation: str, change: Callable[[Dict[str, Any]], None]) -> None:
+        with RUN_INDEX_SECONDS.time(operation=operation), self._lock, self._process_lock():
+            if not self.remote:
+                data = self._load()
+                change(data)
+                self._write(data)
+                return
+            # Other hosts write the same object, so the lock file cannot cover
+            # them: write only if nobody replaced the index since it was read.
+            for _ in range(UPDATE_ATTEMPTS):
+                data, version = self._load_versioned()
+                change(data)
+                if self.storage.write_if_match(INDEX_NAME, json.dumps(data, indent=2).encode("utf-8"), version):
+                    self._version = (float("-inf"), None)
+                    return
+            raise RuntimeError(f"Run index update lost {UPDATE_ATTEMPTS} races in a row")
+
+    def version(self) -> Any:
+        # Changes whenever the index is rewritten. Object stores are asked at
+        # most once per version_ttl_s.
+        if self.remote:
+            checked_at, version = self._version
+            if time.monotonic() - checked_at >= self.version_ttl_s:
+                version = self.storage.version(INDEX_NAME)
+                self._version = (time.monotonic(), version)
+            return version
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
 
     def put(self, ticker: str, as_of_date: str, run_id: str, payload: Dict[str, Any]) -> None:
-        data = self._load()
-        ticker_entry = data.setdefault(ticker, {})
-        ticker_entry[f"{as_of_date}#{run_id}"] = payload
-        self._write(data)
+        def change(data: Dict[str, Any]) -> None:
+            # Stamped under the index lock, so indexed_at orders entries by
+            # publication; the training export uses it as its high-water mark.
+            entry = {**payload, "indexed_at": datetime.now(timezone.utc).isoformat(timespec="microseconds")}
+            data.setdefault(ticker, {})[f"{as_of_date}#{run_id}"] = entry
+            run_dir = self.runs_dir / ticker / as_of_date / run_id
+            if not self.remote and run_dir.is_dir():
+                # rebuild() restores the entry, stamp included, from this copy.
+                atomic_write_bytes(
+                    run_dir / ENTRY_NAME, json.dumps(entry, indent=2).encode("utf-8"), fsync=self.fsync_policy != "never"
+                )
+
+        self._update("put", change)
+
+    def put_detached(self, ticker: str, as_of_date: str, run_id: str, payload: Dict[str, Any]) -> None:
+        # For entries whose artifacts belong to another run: the copy stored
+        # where the run's directory would be lets rebuild() restore them.
+        path = f"{ticker}/{as_of_date}/{run_id}/{ENTRY_NAME}"
+        body = json.dumps(payload, indent=2).encode("utf-8")
+        if self.storage is None:
+            atomic_write_bytes(self.runs_dir / path, body, fsync=self.fsync_policy != "never")
+            self.put(ticker, as_of_date, run_id, payload)
+            return
+        self.storage.write_bytes(path, body)
+        self.storage.flush_then(lambda: self.put(ticker, as_of_date, run_id, payload))
+
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        with RUN_INDEX_SECONDS.time(operation="entries"):
+            return self._load()
+
+    def update_entries(self, updates: Dict[str, Dict[str, Optional[Dict[str, Any]]]]) -> None:
+        # Applies every change (None removes an entry) in one atomic rewrite.
+        def change(data: Dict[str, Any]) -> None:
+            for ticker, changes in updates.items():
+                ticker_entry = data.setdefault(ticker, {})
+                for key, payload in changes.items():
+                    if payload is None:
+                        ticker_entry.pop(key, None)
+                    else:
+                        ticker_entry[key] = payload
+                if not ticker_entry:
+                    data.pop(ticker)
+
+        self._update("update_entries", change)
 
     def latest_approved(self, ticker: str) -> Optional[Dict[str, Any]]:
-        data = self._load().get(ticker, {})
-        approved = [value for value in data.values() if value.get("status") == "approved"]
-        if not approved:
+        with RUN_INDEX_SECONDS.time(operation="latest_approved"):
+            data = self._load().get(ticker, {})
+        return _latest_approved(data)
+
+    def latest_approved_many(self, tickers: Iterable[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        with RUN_INDEX_SECONDS.time(operation="latest_approved_many"):
+            data = self._load()
+        return {ticker: _latest_approved(data.get(ticker, {})) for ticker in tickers}
+
+    def latest_run(self, ticker: str) -> Optional[Dict[str, Any]]:
+        with RUN_INDEX_SECONDS.time(operation="latest_run"):
+            data = self._load().get(ticker, {})
+        runs = [value for value in data.values() if not value.get("replayed")]
+        if not runs:
             return None
-        return sorted(approved, key=lambda entry: entry.get("created_at", ""))[-1]
+        return sorted(runs, key=lambda entry: entry.get("created_at", ""))[-1]
+
+    def previous_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with RUN_INDEX_SECONDS.time(operation="previous_run"):
+            data = self._load()
+        for entries in data.values():
+            ordered = sorted(entries.values(), key=lambda entry: entry.get("created_at", ""))
+            for position, entry in enumerate(ordered):
+                if entry.get("run_id") == run_id:
+                    return ordered[position - 1] if position else None
+        return None
 
     def find_by_run_id(self, run_id: str) -> Optional[Dict[str, Any]]:
-        data = self._load()
+        with RUN_INDEX_SECONDS.time(operation="find_by_run_id"):
+            data = self._load()
         for ticker in data.values():
             for entry in ticker.values():
                 if entry.get("run_id") == run_id:
                     return entry
         return None
+
+    def recover(self) -> bool:
+        if self.remote:
+            # Object-store writes are atomic; there are no run directories to rebuild from.
+            return False
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (json.JSONDecodeError, UnicodeDecodeError, FileNotFoundError):
+            data = None
+        if isinstance(data, dict):
+            return False
+        logger.warning("Run index %s is corrupt; rebuilding from run directories", self.path)
+        self.rebuild()
+        return True
+
+    def rebuild(self) -> Dict[str, Any]:
+        with RUN_INDEX_SECONDS.time(operation="rebuild"):
+            return self._rebuild()
+
+    def _rebuild(self) -> Dict[str, Any]:
+        # Run directories, then detached entries, then archive manifests: an
+        # archived run whose directory a crashed retention pass left behind is
+        # restored as archived, and its leftovers are removed by the next pass.
+        data: Dict[str, Any] = {}
+        packet_paths = [
+            *self.runs_dir.glob(f"*/*/*/parsed/{FULL_NAME}"),
+            *self.runs_dir.glob(f"*/*/*/parsed/{DELTA_NAME}"),
+        ]
+        archived = self._archived_entries()
+        # Delta bases are looked up by run_id among the scanned run dirs and the
+        # archives, since a base may have been archived after its delta was written.
+        bases = {
+            entry["run_id"]: entry["analysis_packet_s3_path"]
+            for entries in archived.values()
+            for entry in entries.values()
+            if entry.get("run_id") and entry.get("analysis_packet_s3_path")
+        }
+        bases.update({path.parents[1].name: str(path) for path in packet_paths})
+        for packet_path in sorted(packet_paths):
+            entry = _entry_from_run_dir(packet_path.parents[1], packet_path, bases.get)
+            if entry is None:
+                continue
+            ticker, as_of_date, run_id = packet_path.parts[-5:-2]
+            data.setdefault(ticker, {})[f"{as_of_date}#{run_id}"] = entry
+        for entry_path in sorted(self.runs_dir.glob(f"*/*/*/{ENTRY_NAME}")):
+            try:
+                entry = json.loads(entry_path.read_text(encoding="utf-8"))
+            except (ValueError, OSError):
+                logger.warning("Skipping unreadable index entry: %s", entry_path)
+                continue
+            ticker, as_of_date, run_id = entry_path.parts[-4:-1]
+            data.setdefault(ticker, {})[f"{as_of_date}#{run_id}"] = entry
+        for ticker, entries in archived.items():
+            data.setdefault(ticker, {}).update(entries)
+        # Copies written before their source run was archived still point at
+        # its removed directory.
+        for entries in data.values():
+            sources = {entry.get("run_id"): entry for entry in entries.values() if entry.get("archived")}
+            for key, entry in entries.items():
+                source = sources.get(entry.get("carried_forward_from"))
+                if source is not None and not source.get("carried_forward"):
+                    entries[key] = follow_archived_source(entry, source)
+        self._write(data)
+        return data
+
+    def _archived_entries(self) -> Dict[str, Dict[str, Any]]:
+        # Parts sort by name within a month, so a run archived twice (after a
+        # crash before the index update) resolves to its latest part.
+        archived: Dict[str, Dict[str, Any]] = {}
+        parts = sorted(
+            self.runs_dir.glob(f"{ARCHIVE_DIR}/*/*.tar.gz"),
+            key=lambda path: (path.parent.name, _part_order(path.name)),
+        )
+        for archive in parts:
+            try:
+                manifest = read_archive_manifest(archive)
+            except (ValueError, OSError, tarfile.TarError):
+                logger.warning("Skipping archive without readable index entries: %s", archive)
+                continue
+            for ticker, entries in manifest.items():
+                archived.setdefault(ticker, {}).update(entries)
+        return archived
+
+
+def _latest_approved(entries: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    # Replayed runs re-score recorded inputs and are never the served analysis.
+    approved = [value for value in entries.values() if value.get("status") == "approved" and not value.get("replayed")]
+    if not approved:
+        return None
+    return sorted(approved, key=lambda entry: entry.get("created_at", ""))[-1]
+
+
+def _entry_from_run_dir(
+    run_dir: Path, packet_path: Path, resolve: Callable[[str], Optional[str]]
+) -> Optional[Dict[str, Any]]:
+    try:
+        document = decode(packet_path.read_bytes())
+        packet = load_packet(str(packet_path), resolve) if document.get("format") == DELTA_FORMAT else document
+    except (ValueError, OSError, KeyError):
+        logger.warning("Skipping run with unreadable analysis packet: %s", packet_path)
+        return None
+    run_context = packet.get("run_context") or {}
+    approved = bool((packet.get("persona_review") or {}).get("approved"))
+    report_path = run_dir / "report" / "final_report.md"
+    citations_path = run_dir / "report" / "citations_map.json"
+    entry = {
+        "run_id": run_context.get("run_id", run_dir.name),
+        "status": "approved" if approved else "blocked",
+        "approved": approved,
+        "model_id": run_context.get("model_id"),
+        "created_at": _isoformat(run_context.get("created_at")),
+        "report_s3_path": str(report_path) if report_path.exists() else None,
+        "analysis_packet_s3_path": str(packet_path),
+        "citations_map_s3_path": str(citations_path) if citations_path.exists() else None,
+    }
+    if document.get("format") == DELTA_FORMAT:
+        entry["packet_delta"] = {"base_run_id": document["base_run_id"], "depth": document["depth"]}
+    return entry
+
+
+def _part_order(name: str) -> Tuple[str, int]:
+    month, _, rest = name.partition(".part")
+    number = rest.split(".", 1)[0]
+    return (month, int(number) if number.isdigit() else 0)
+
+
+def _isoformat(value: Any) -> str:
+    if not value:
+        return ""
+    try:
+        return datetime.fromisoformat(str(value)).isoformat()
+    except ValueError:
+        return str(value)
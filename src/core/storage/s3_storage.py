@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import mimetypes
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.metrics import STORAGE_BYTES_WRITTEN
+from src.core.storage.backend import StorageBackend
+from src.core.storage.serialization import Serializer, decode
+
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+def _default_client(endpoint_url: Optional[str], max_pool_connections: int) -> Any:
+    try:
+        import boto3
+        from botocore.config import Config
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise RuntimeError("S3 storage requires boto3; install with `pip install -e .[s3]`") from exc
+    config = Config(max_pool_connections=max_pool_connections, retries={"max_attempts": 5, "mode": "adaptive"})
+    return boto3.client("s3", endpoint_url=endpoint_url, config=config)
+
+
+class S3Storage(StorageBackend):
+    local = False
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "runs",
+        client: Any = None,
+        endpoint_url: Optional[str] = None,
+        max_concurrency: int = 8,
+        batch_size: int = 16,
+        batch_bytes: int = 4 * 1024 * 1024,
+        multipart_threshold: int = 8 * 1024 * 1024,
+        multipart_chunk_size: int = 8 * 1024 * 1024,
+        serializer: Optional[Serializer] = None,
+    ) -> None:
+        if not bucket:
+            raise ValueError("bucket is required for S3 storage")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = client or _default_client(endpoint_url, max_pool_connections=max_concurrency)
+        self.batch_size = batch_size
+        self.batch_bytes = batch_bytes
+        self.multipart_threshold = multipart_threshold
+        self.multipart_chunk_size = max(multipart_chunk_size, MIN_PART_SIZE)
+        self.serializer = serializer or Serializer()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="s3-storage")
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Tuple[bytes, str]] = {}
+        self._pending_bytes = 0
+
+    def _key(self, path: str) -> str:
+        uri_prefix = f"s3://{self.bucket}/"
+        if path.startswith(uri_prefix):
+            return path[len(uri_prefix):]
+        path = path.lstrip("/")
+        return f"{self.prefix}/{path}" if self.prefix else path
+
+    def ensure_dir(self, path: str) -> str:
+        return self.path(path)
+
+    def write_json(self, path: str, payload: Dict[str, Any]) -> str:
+        body = self.serializer.encode(payload)
+        content_type = "application/json" if self.serializer.format != "msgpack" else "application/msgpack"
+        return self.write_bytes(path, body, content_type=content_type)
+
+    def write_text(self, path: str, content: str) -> str:
+        return self.write_bytes(path, content.encode("utf-8"), content_type="text/plain; charset=utf-8")
+
+    def write_bytes(self, path: str, body: bytes, content_type: Optional[str] = None) -> str:
+        key = self._key(path)
+        content_type = content_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+        STORAGE_BYTES_WRITTEN.inc(len(body), backend="s3")
+        if len(body) >= self.multipart_threshold:
+            # A queued small write to the same key is older than this one and
+            # must not be flushed over it.
+            with self._lock:
+                previous = self._pending.pop(key, None)
+                if previous is not None:
+                    self._pending_bytes -= len(previous[0])
+            self._multipart_upload(key, body, content_type)
+            return self.path(path)
+        with self._lock:
+            previous = self._pending.get(key)
+            if previous is not None:
+                self._pending_bytes -= len(previous[0])
+            self._pending[key] = (body, content_type)
+            self._pending_bytes += len(body)
+            should_flush = len(self._pending) >= self.batch_size or self._pending_bytes >= self.batch_bytes
+        if should_flush:
+            self.flush()
+        return self.path(path)
+
+    def read_bytes(self, path: str) -> bytes:
+        key = self._key(path)
+        with self._lock:
+            pending = self._pending.get(key)
+        if pending is not None:
+            return pending[0]
+        return self._get(path, key)["Body"].read()
+
+    def read_versioned(self, path: str) -> Tuple[bytes, str]:
+        self.flush()
+        response = self._get(path, self._key(path))
+        return response["Body"].read(), response["ETag"]
+
+    def write_if_match(self, path: str, body: bytes, version: Optional[str]) -> bool:
+        # With no version the object must not exist yet. False means another
+        # writer got there first and the caller should re-read and retry.
+        condition = {"IfMatch": version} if version else {"IfNoneMatch": "*"}
+        STORAGE_BYTES_WRITTEN.inc(len(body), backend="s3")
+        try:
+            self.client.put_object(
+                Bucket=self.bucket, Key=self._key(path), Body=body, ContentType="application/json", **condition
+            )
+        except Exception as exc:
+            if _error_code(exc) in {"412", "PreconditionFailed", "409", "ConditionalRequestConflict"}:
+                return False
+            raise
+        return True
+
+    def version(self, path: str) -> Optional[str]:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(path))["ETag"]
+        except Exception as exc:
+            if _is_not_found(exc):
+                return None
+            raise
+
+    def _get(self, path: str, key: str) -> Dict[str, Any]:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key)
+        except Exception as exc:
+            if _is_not_found(exc):
+                raise FileNotFoundError(path) from exc
+            raise
+
+    def read_json(self, path: str) -> Dict[str, Any]:
+        return decode(self.read_bytes(path))
+
+    def exists(self, path: str) -> bool:
+        key = self._key(path)
+        with self._lock:
+            if key in self._pending:
+                return True
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except Exception as exc:
+            if _is_not_found(exc):
+                return False
+            raise
+        return True
+
+    def path(self, path: str) -> str:
+        return f"s3://{self.bucket}/{self._key(path)}"
+
+    def list_runs(self) -> list[str]:
+        self.flush()
+        prefix = f"{self.prefix}/" if self.prefix else ""
+        names: List[str] = []
+        kwargs: Dict[str, Any] = {"Bucket": self.bucket, "Prefix": prefix, "Delimiter": "/"}
+        while True:
+            response = self.client.list_objects_v2(**kwargs)
+            for common in response.get("CommonPrefixes", []):
+                names.append(common["Prefix"][len(prefix):].rstrip("/"))
+            if not response.get("IsTruncated"):
+                return names
+            kwargs["ContinuationToken"] = response["NextContinuationToken"]
+
+    def flush(self) -> None:
+        # Entries stay in _pending, and so visible to read_bytes/exists, until
+        # their put succeeds. Failed puts stay queued for the next flush.
+        with self._lock:
+            batch = list(self._pending.items())
+        if not batch:
+            return
+        futures = [
+            (
+                key,
+                entry,
+                self._executor.submit(
+                    self.client.put_object, Bucket=self.bucket, Key=key, Body=entry[0], ContentType=entry[1]
+                ),
+            )
+            for key, entry in batch
+        ]
+        errors: List[BaseException] = []
+        for key, entry, future in futures:
+            error = future.exception()
+            if error is not None:
+                errors.append(error)
+                continue
+            with self._lock:
+                # Only drop the entry if it was not rewritten while the put ran.
+                if self._pending.get(key) is entry:
+                    del self._pending[key]
+                    self._pending_bytes -= len(entry[0])
+        if errors:
+            raise RuntimeError(
+                f"{len(errors)} of {len(futures)} S3 writes failed; they stay queued for the next flush"
+            ) from errors[0]
+
+    def close(self) -> None:
+        self.flush()
+        self._executor.shutdown(wait=True)
+
+    def _multipart_upload(self, key: str, body: bytes, content_type: str) -> None:
+        upload = self.client.create_multipart_upload(Bucket=self.bucket, Key=key, ContentType=content_type)
+        upload_id = upload["UploadId"]
+        chunk = self.multipart_chunk_size
+        offsets = range(0, len(body), chunk)
+        try:
+            futures = [
+                self._executor.submit(
+                    self.client.upload_part,
+                    Bucket=self.bucket,
+                    Key=key,
+                    UploadId=upload_id,
+                    PartNumber=number,
+                    Body=body[offset:offset + chunk],
+                )
+                for number, offset in enumerate(offsets, start=1)
+            ]
+            parts = [
+                {"ETag": future.result()["ETag"], "PartNumber": number}
+                for number, future in enumerate(futures, start=1)
+            ]
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+            )
+        except Exception:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+
+
+def _error_code(exc: Exception) -> str:
+    response = getattr(exc, "response", None) or {}
+    return str(response.get("Error", {}).get("Code", ""))
+
+
+def _is_not_found(exc: Exception) -> bool:
+    return _error_code(exc) in {"404", "NoSuchKey", "NotFound"}
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+FORMATS = ("json", "compact", "msgpack")
+COMPRESSIONS = ("none", "zstd")
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class Serializer:
+    def __init__(self, format: str = "json", compression: str = "none", level: int = 3) -> None:
+        format = format.lower()
+        compression = compression.lower()
+        if format not in FORMATS:
+            raise ValueError(f"Unknown serialization format: {format}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression: {compression}")
+        if format == "msgpack" and msgpack is None:
+            raise RuntimeError("msgpack serialization requires the msgpack package")
+        if compression == "zstd" and zstandard is None:
+            raise RuntimeError("zstd compression requires the zstandard package")
+        self.format = format
+        self.compression = compression
+        self.level = level
+
+    def encode(self, payload: Any) -> bytes:
+        if self.format == "msgpack":
+            body = msgpack.packb(payload, default=str, use_bin_type=True)
+        elif self.format == "compact":
+            body = _dumps_compact(payload)
+        else:
+            body = json.dumps(payload, indent=2, default=str).encode("utf-8")
+        if self.compression == "zstd":
+            body = zstandard.ZstdCompressor(level=self.level).compress(body)
+        return body
+
+
+def decode(body: bytes) -> Any:
+    if body[:4] == ZSTD_MAGIC:
+        if zstandard is None:
+            raise RuntimeError("Reading zstd artifacts requires the zstandard package")
+        body = zstandard.ZstdDecompressor().decompressobj().decompress(body)
+    if not body:
+        raise ValueError("Cannot decode an empty artifact")
+    # JSON documents always start with an ASCII byte; MessagePack maps and
+    # arrays always start with a byte >= 0x80.
+    if body[0] >= 0x80:
+        if msgpack is None:
+            raise RuntimeError("Reading msgpack artifacts requires the msgpack package")
+        return msgpack.unpackb(body, raw=False, strict_map_key=False)
+    if orjson is not None:
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(body.decode("utf-8"))
+
+
+def _dumps_compact(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.core.config import get_settings
+from src.core.storage.atomic import atomic_write_bytes, fsync_dirs, write_temp
+from src.core.storage.factory import create_run_index
+from src.core.storage.run_index import RunIndex
+from src.core.storage.serialization import Serializer, decode
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+REQUIRED_ARTIFACT = "metadata.json"
+
+
+class TrainingDatasetExporter:
+    # Exports are driven by run-index entries published after the previous
+    # export (the manifest's exported_through mark), so a pass reads one index
+    # document and only the new runs' training directories.
+    def __init__(
+        self,
+        runs_dir: str,
+        output_dir: Optional[str] = None,
+        max_shard_bytes: int = 64 * 1024 * 1024,
+        run_index: Optional[RunIndex] = None,
+    ) -> None:
+        self.runs_dir = Path(runs_dir)
+        self.training_dir = self.runs_dir / "training"
+        self.output_dir = Path(output_dir) if output_dir else self.runs_dir / "datasets" / "training"
+        self.max_shard_bytes = max_shard_bytes
+        self.run_index = run_index or RunIndex(str(self.runs_dir / "run_index.json"))
+        self._serializer = Serializer("compact")
+
+    def load_manifest(self) -> Dict[str, Any]:
+        return load_manifest(self.output_dir)
+
+    def export(self) -> Dict[str, Any]:
+        manifest = self.load_manifest()
+        exported_through = manifest.get("exported_through")
+        # Manifests from before the high-water mark listed every exported run.
+        legacy = {run_id for shard in manifest["shards"] for run_id in shard.pop("run_ids", [])}
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        high_water = exported_through
+        writer = _ShardWriter(self.output_dir, len(manifest["shards"]), self.max_shard_bytes)
+        for indexed_at, ticker, as_of_date, run_id in self._new_runs(exported_through):
+            high_water = indexed_at
+            run_dir = self.training_dir / ticker / as_of_date / run_id
+            if run_id in legacy or not (run_dir / REQUIRED_ARTIFACT).exists():
+                continue
+            writer.add(self._serializer.encode(self._build_record(run_dir)) + b"\n")
+        new_shards = writer.close()
+        if not new_shards and high_water == exported_through and not legacy:
+            return manifest
+
+        manifest["shards"].extend(new_shards)
+        manifest["records"] = sum(shard["records"] for shard in manifest["shards"])
+        manifest["exported_through"] = high_water
+        manifest["updated_at"] = datetime.now(timezone.utc).isoformat()
+        atomic_write_bytes(self.output_dir / MANIFEST_NAME, json.dumps(manifest, indent=2).encode("utf-8"))
+        return manifest
+
+    def _new_runs(self, exported_through: Optional[str]) -> List[Tuple[str, str, str, str]]:
+        # Entries without indexed_at were published before entries were
+        # stamped, and rebuild() restores stamps from each run's entry copy, so
+        # they were covered by the first export. Replays and carried-forward
+        # runs have no training data.
+        runs = []
+        for ticker, entries in self.run_index.entries().items():
+            for key, entry in entries.items():
+                indexed_at = entry.get("indexed_at", "")
+                if entry.get("replayed") or (exported_through is not None and indexed_at <= exported_through):
+                    continue
+                as_of_date, _, run_id = key.partition("#")
+                runs.append((indexed_at, ticker, as_of_date, run_id))
+        return sorted(runs)
+
+    def _build_record(self, run_dir: Path) -> Dict[str, Any]:
+        record: Dict[str, Any] = {
+            "ticker": run_dir.parent.parent.name,
+            "as_of_date": run_dir.parent.name,
+            "run_id": run_dir.name,
+        }
+        for artifact in sorted(run_dir.iterdir()):
+            if artifact.suffix == ".txt":
+                record[artifact.stem] = artifact.read_text(encoding="utf-8")
+            elif artifact.suffix == ".json":
+                record[artifact.stem] = decode(artifact.read_bytes())
+        return record
+
+
+class _ShardWriter:
+    def __init__(self, output_dir: Path, start_index: int, max_shard_bytes: int) -> None:
+        self.output_dir = output_dir
+        self.index = start_index
+        self.max_shard_bytes = max_shard_bytes
+        self.shards: List[Dict[str, Any]] = []
+        self._lines: List[bytes] = []
+        self._bytes = 0
+
+    def add(self, line: bytes) -> None:
+        if self._lines and self._bytes + len(line) > self.max_shard_bytes:
+            self._seal()
+        self._lines.append(line)
+        self._bytes += len(line)
+
+    def close(self) -> List[Dict[str, Any]]:
+        if self._lines:
+            self._seal()
+        if self.shards:
+            fsync_dirs([self.output_dir / self.shards[-1]["path"]])
+        return self.shards
+
+    def _seal(self) -> None:
+        name = f"part-{self.index:05d}.jsonl"
+        path = self.output_dir / name
+        tmp_path = write_temp(path, b"".join(self._lines), fsync=True)
+        os.replace(tmp_path, path)
+        self.shards.append({"path": name, "records": len(self._lines), "bytes": self._bytes})
+        self.index += 1
+        self._lines = []
+        self._bytes = 0
+
+
+def load_manifest(output_dir: str | Path) -> Dict[str, Any]:
+    path = Path(output_dir) / MANIFEST_NAME
+    if not path.exists():
+        return {"version": MANIFEST_VERSION, "format": "jsonl", "records": 0, "shards": []}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def iter_training_records(output_dir: str | Path, fields: Optional[Sequence[str]] = None) -> Iterator[Dict[str, Any]]:
+    output_dir = Path(output_dir)
+    for shard in load_manifest(output_dir)["shards"]:
+        with open(output_dir / shard["path"], "rb") as handle:
+            for line in handle:
+                record = decode(line)
+                if fields is not None:
+                    record = {field: record.get(field) for field in fields}
+                yield record
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compact per-run training artifacts into sharded JSONL")
+    parser.add_argument("--runs-dir", default=None, help="Defaults to STOCK_RUNS_DIR")
+    parser.add_argument("--output-dir", default=None)
+    parser.add_argument("--max-shard-mb", type=int, default=64)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    settings = get_settings()
+    if settings.storage_backend.lower() != "local":
+        raise SystemExit("The training export reads local run directories; it does not support S3 storage")
+    if args.runs_dir:
+        settings = settings.model_copy(update={"runs_dir": args.runs_dir})
+    exporter = TrainingDatasetExporter(
+        settings.runs_dir,
+        args.output_dir,
+        max_shard_bytes=args.max_shard_mb * 1024 * 1024,
+        run_index=create_run_index(settings),
+    )
+    before = exporter.load_manifest()["records"]
+    manifest = exporter.export()
+    print(f"exported {manifest['records'] - before} runs ({manifest['records']} total, {len(manifest['shards'])} shards)")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,11 @@ from __future__ import annotations
 
 from typing import Any, Dict
 
-from src.core.storage.local_storage import LocalStorage
+from src.core.storage.backend import StorageBackend
 
 
 class TrainingArtifactWriter:
-    def __init__(self, storage: LocalStorage) -> None:
+    def __init__(self, storage: StorageBackend) -> None:
         self.storage = storage
 
     def write(self, base_path: str, payloads: Dict[str, Any]) -> Dict[str, str]:
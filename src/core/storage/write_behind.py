@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from src.core.storage.backend import PLAIN_JSON, StorageBackend
+from src.core.storage.serialization import Serializer, decode
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="write-behind")
+        return _executor
+
+
+class _PlainJson:
+    __slots__ = ("payload",)
+
+    def __init__(self, payload: Dict[str, Any]) -> None:
+        self.payload = payload
+
+
+_Payload = Union[str, bytes, Dict[str, Any], _PlainJson]
+
+
+# Queues writes in memory and persists them as one batch on a background thread.
+# Payloads are serialized when the batch is persisted, so callers must not mutate
+# a dict after handing it to write_json. Nothing waits on a run's batch, so
+# anything that points at its files (the run index entry) is published through
+# flush_then() once the batch is on disk.
+class WriteBehindStorage(StorageBackend):
+    def __init__(self, inner: StorageBackend, serializer: Optional[Serializer] = None) -> None:
+        self.inner = inner
+        self.serializer = serializer or Serializer("compact")
+        self._lock = threading.Lock()
+        self._queued: Dict[str, _Payload] = {}
+        self._inflight: Dict[str, _Payload] = {}
+        self._futures: List[Future] = []
+
+    @property
+    def local(self) -> bool:
+        return self.inner.local
+
+    def ensure_dir(self, path: str) -> Any:
+        return self.inner.ensure_dir(path)
+
+    def write_json(self, path: str, payload: Dict[str, Any]) -> str:
+        return self._enqueue(path, payload)
+
+    def write_plain_json(self, path: str, payload: Dict[str, Any]) -> str:
+        return self._enqueue(path, _PlainJson(payload))
+
+    def write_text(self, path: str, content: str) -> str:
+        return self._enqueue(path, content)
+
+    def write_bytes(self, path: str, body: bytes) -> str:
+        return self._enqueue(path, body)
+
+    def read_bytes(self, path: str) -> bytes:
+        pending = self._pending(path)
+        if pending is None:
+            return self.inner.read_bytes(path)
+        return self._encode(pending)
+
+    def read_versioned(self, path: str) -> Tuple[bytes, str]:
+        return self.inner.read_versioned(path)
+
+    def write_if_match(self, path: str, body: bytes, version: Optional[str]) -> bool:
+        return self.inner.write_if_match(path, body, version)
+
+    def version(self, path: str) -> Optional[str]:
+        return self.inner.version(path)
+
+    def read_json(self, path: str) -> Dict[str, Any]:
+        pending = self._pending(path)
+        if pending is None:
+            return self.inner.read_json(path)
+        if isinstance(pending, dict):
+            return pending
+        if isinstance(pending, _PlainJson):
+            return pending.payload
+        if isinstance(pending, str):
+            return decode(pending.encode("utf-8"))
+        return decode(pending)
+
+    def exists(self, path: str) -> bool:
+        return self._pending(path) is not None or self.inner.exists(path)
+
+    def path(self, path: str) -> str:
+        return self.inner.path(path)
+
+    def list_runs(self) -> list[str]:
+        self.wait()
+        return self.inner.list_runs()
+
+    def flush(self) -> None:
+        self._submit(None)
+
+    def flush_then(self, callback: Callable[[], None]) -> None:
+        self._submit(callback)
+
+    def _submit(self, callback: Optional[Callable[[], None]]) -> None:
+        with self._lock:
+            if not self._queued and callback is None:
+                return
+            batch = self._queued
+            self._queued = {}
+            self._inflight.update(batch)
+            self._futures = [future for future in self._futures if not future.done() or future.exception()]
+            self._futures.append(_get_executor().submit(self._persist, batch, callback))
+
+    def wait(self) -> None:
+        self.flush()
+        with self._lock:
+            futures = self._futures
+            self._futures = []
+        for future in futures:
+            future.result()
+
+    def close(self) -> None:
+        self.wait()
+        self.inner.close()
+
+    def _enqueue(self, path: str, payload: _Payload) -> str:
+        with self._lock:
+            self._queued[path] = payload
+        return self.path(path)
+
+    def _encode(self, payload: _Payload) -> bytes:
+        if isinstance(payload, bytes):
+            return payload
+        if isinstance(payload, str):
+            return payload.encode("utf-8")
+        if isinstance(payload, _PlainJson):
+            return PLAIN_JSON.encode(payload.payload)
+        return self.serializer.encode(payload)
+
+    def _pending(self, path: str) -> Optional[_Payload]:
+        with self._lock:
+            if path in self._queued:
+                return self._queued[path]
+            return self._inflight.get(path)
+
+    def _persist(
+        self, batch: Dict[str, _Payload], callback: Optional[Callable[[], None]]
+    ) -> None:
+        # Batches run one at a time in submission order, so a callback also
+        # sees every earlier batch persisted. A failed batch skips its callback.
+        try:
+            if batch:
+                encoded = {path: self._encode(payload) for path, payload in batch.items()}
+                self.inner.write_batch(encoded)
+                self.inner.flush()
+        except Exception:
+            logger.exception("Write-behind batch of %d artifacts failed: %s", len(batch), sorted(batch)[:5])
+            raise
+        finally:
+            with self._lock:
+                for path, payload in batch.items():
+                    if self._inflight.get(path) is payload:
+                        del self._inflight[path]
+        if callback is not None:
+            try:
+                callback()
+            except Exception:
+                logger.exception("Write-behind callback failed after persisting %d artifacts", len(batch))
+                raise
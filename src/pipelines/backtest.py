@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.core.schemas.models import (
+    AnalysisPacket,
+    ChecklistResult,
+    DerivedMetrics,
+    Financials,
+    FilingRef,
+    GuidanceClaims,
+    MarketSnapshot,
+    NewsBundle,
+    OwnershipSnapshot,
+    PersonaReview,
+    RunContext,
+    RunPaths,
+    SocialBundle,
+    trusted,
+)
+from src.core.storage.backend import StorageBackend
+from src.core.storage.factory import get_storage
+from src.pipelines.change_detection import FILING_FORMS
+from src.tools import placeholder_tools
+
+NEWS_LOOKBACK_DAYS = 30
+# Reaches back to the annual report that was current at the window's start.
+FILING_LOOKBACK_DAYS = 400
+SOCIAL_LOOKBACK_DAYS = 14
+PERSONAS = ["hf_pm", "sell_side", "trader", "credit"]
+
+
+@dataclass
+class TickerSources:
+    # Everything fetched once for the whole backtest window of one ticker.
+    ticker: str
+    loaded_on: date
+    filings: List[FilingRef]
+    news: NewsBundle
+    social: SocialBundle
+    market: MarketSnapshot
+    ownership: OwnershipSnapshot
+    guidance: GuidanceClaims
+    financials: Dict[Tuple[str, ...], Tuple[Financials, DerivedMetrics]] = field(default_factory=dict)
+
+
+@dataclass
+class PointInTime:
+    as_of_date: date
+    filings: List[FilingRef]
+    financials: Financials
+    derived_metrics: DerivedMetrics
+    news: NewsBundle
+    social: SocialBundle
+    market: MarketSnapshot
+    ownership: OwnershipSnapshot
+    guidance: GuidanceClaims
+    data_gaps: List[str]
+    key: str
+
+
+def backtest_dates(start: date, end: date, step_days: int = 1, weekdays_only: bool = True) -> List[date]:
+    dates = []
+    current = start
+    while current <= end:
+        if not weekdays_only or current.weekday() < 5:
+            dates.append(current)
+        current += timedelta(days=step_days)
+    return dates
+
+
+def load_sources(ticker: str, start: date, end: date, today: Optional[date] = None) -> TickerSources:
+    today = today or date.today()
+    lookback = (today - start).days
+    investor_materials = placeholder_tools.fetch_investor_materials(ticker, ["earnings_release", "deck", "guidance"])
+    return TickerSources(
+        ticker=ticker,
+        loaded_on=today,
+        filings=placeholder_tools.fetch_sec_filings(
+            ticker, FILING_FORMS, limit=None, days_back=lookback + FILING_LOOKBACK_DAYS
+        ),
+        news=placeholder_tools.fetch_news(ticker, days_back=lookback + NEWS_LOOKBACK_DAYS, recency_weighted=False),
+        social=placeholder_tools.fetch_social_sentiment(
+            ticker, platforms=["reddit", "stocktwits", "x"], days_back=lookback + SOCIAL_LOOKBACK_DAYS
+        ),
+        market=placeholder_tools.fetch_market_data(ticker, window="max"),
+        ownership=placeholder_tools.fetch_ownership_and_holders(ticker),
+        guidance=placeholder_tools.extract_guidance_and_claims(investor_materials["docs"]),
+    )
+
+
+def point_in_time(sources: TickerSources, as_of_date: date) -> PointInTime:
+    # Anything without a timestamp cannot be placed before as_of_date, so it is
+    # left out rather than risk look-ahead; the omission shows up as a data gap.
+    # Later filings are simply not known yet, so they are not a gap.
+    gaps = []
+    filings = sorted(
+        (filing for filing in sources.filings if _on_or_before(_filing_date(filing), as_of_date)),
+        key=_filing_date,
+    )
+    if any(_filing_date(filing) is None for filing in sources.filings):
+        gaps.append("filings: undated filings excluded")
+    news_from = as_of_date - timedelta(days=NEWS_LOOKBACK_DAYS)
+    articles = [article for article in sources.news.articles if article.date and news_from < article.date <= as_of_date]
+    social_from = as_of_date - timedelta(days=SOCIAL_LOOKBACK_DAYS)
+    posts = [post for post in sources.social.notable_posts if _posted_between(post, social_from, as_of_date)]
+    social = trusted(SocialBundle, notable_posts=posts)
+    current = as_of_date >= sources.loaded_on
+    if not current:
+        # Snapshot-only sources describe today, not as_of_date.
+        gaps.extend(["market_snapshot: no point-in-time history", "ownership_snapshot: no point-in-time history"])
+    market = sources.market if current else MarketSnapshot()
+    ownership = sources.ownership if current else OwnershipSnapshot()
+    guidance = sources.guidance if current else GuidanceClaims()
+    financials, derived_metrics = _financials(sources, filings)
+    key = _digest(
+        [
+            ",".join(filing.sha256 or "" for filing in filings),
+            ",".join(article.sha256 or article.url or article.title for article in articles),
+            ",".join(json.dumps(post, sort_keys=True, default=str) for post in posts),
+            str(current),
+        ]
+    )
+    return PointInTime(
+        as_of_date=as_of_date,
+        filings=filings,
+        financials=financials,
+        derived_metrics=derived_metrics,
+        news=trusted(NewsBundle, articles=articles),
+        social=social,
+        market=market,
+        ownership=ownership,
+        guidance=guidance,
+        data_gaps=gaps,
+        key=key,
+    )
+
+
+def _financials(sources: TickerSources, filings: List[FilingRef]) -> Tuple[Financials, DerivedMetrics]:
+    # Parsed once per distinct set of available filings and shared by every date that sees the same set.
+    key = tuple(filing.sha256 or "" for filing in filings)
+    cached = sources.financials.get(key)
+    if cached is None:
+        latest = filings[-1].local_path if filings and filings[-1].local_path else "placeholder"
+        financials = placeholder_tools.parse_filing_financials(latest)
+        cached = (financials, placeholder_tools.compute_derived_metrics(financials))
+        sources.financials[key] = cached
+    return cached
+
+
+def _packet(ticker: str, view: PointInTime, model_id: str) -> AnalysisPacket:
+    run_id = f"backtest-{ticker}-{view.as_of_date}"
+    base_path = f"backtests/{ticker}/{view.as_of_date}"
+    return trusted(
+        AnalysisPacket,
+        run_context=trusted(
+            RunContext,
+            run_id=run_id,
+            ticker=ticker,
+            as_of_date=view.as_of_date,
+            created_at=datetime.combine(view.as_of_date, datetime.min.time()),
+            mode="backtest",
+            model_id=model_id,
+            status="initialized",
+            paths=trusted(
+                RunPaths,
+                base_path=base_path,
+                raw_path=f"{base_path}/raw",
+                parsed_path=f"{base_path}/parsed",
+                report_path=f"{base_path}/report",
+                trace_path=f"{base_path}/trace",
+            ),
+        ),
+        filings=view.filings,
+        financials=view.financials,
+        derived_metrics=view.derived_metrics,
+        guidance=view.guidance,
+        market_snapshot=view.market,
+        ownership_snapshot=view.ownership,
+        news=view.news,
+        social=view.social,
+    )
+
+
+def _score(ticker: str, view: PointInTime, model_id: str, thresholds: Dict[str, Any]) -> Tuple[ChecklistResult, PersonaReview]:
+    packet = _packet(ticker, view, model_id)
+    packet.boosters_downtrends = placeholder_tools.build_boosters_downtrends(
+        view.financials, view.guidance, view.news, view.social
+    )
+    dump = packet.model_dump()
+    checklist = placeholder_tools.run_critical_checklist(dump, checklist_version="v1")
+    review = placeholder_tools.multi_persona_review(dump, checklist, personas=PERSONAS, thresholds=thresholds)
+    return checklist, review
+
+
+# Scoring has no batch API, so batches only bound how many point-in-time views
+# are held at once.
+def _batches(items: List[date], size: int) -> Iterator[List[date]]:
+    for index in range(0, len(items), size):
+        yield items[index : index + size]
+
+
+def backtest_ticker(
+    ticker: str,
+    dates: List[date],
+    model_id: str,
+    thresholds: Optional[Dict[str, Any]] = None,
+    batch_size: int = 64,
+    today: Optional[date] = None,
+) -> Iterator[Dict[str, Any]]:
+    if not dates:
+        return
+    thresholds = thresholds or {}
+    sources = load_sources(ticker, dates[0], dates[-1], today=today)
+    scored: Dict[str, Tuple[date, ChecklistResult, PersonaReview]] = {}
+    for batch in _batches(dates, batch_size):
+        views = [point_in_time(sources, as_of_date) for as_of_date in batch]
+        # Scoring is deterministic in its inputs, so dates whose point-in-time
+        # view did not change reuse the earlier result.
+        for view in views:
+            if view.key not in scored:
+                scored[view.key] = (view.as_of_date, *_score(ticker, view, model_id, thresholds))
+        for view in views:
+            scored_on, checklist, review = scored[view.key]
+            yield {
+                "ticker": ticker,
+                "as_of_date": str(view.as_of_date),
+                "approved": review.approved,
+                "overall_score": checklist.overall_score,
+                "data_gaps": [*view.data_gaps, *checklist.data_gaps],
+                "persona_scores": {score.persona: score.score for score in review.persona_scores},
+                "filings": len(view.filings),
+                "news_articles": len(view.news.articles),
+                "social_posts": len(view.social.notable_posts),
+                "scored_on": str(scored_on),
+            }
+
+
+def run_backtest(
+    tickers: List[str],
+    start: date,
+    end: date,
+    model_id: str,
+    thresholds: Optional[Dict[str, Any]] = None,
+    step_days: int = 1,
+    weekdays_only: bool = True,
+    batch_size: int = 64,
+    storage: Optional[StorageBackend] = None,
+    today: Optional[date] = None,
+) -> Dict[str, Any]:
+    if end < start:
+        raise ValueError("end must not be before start")
+    storage = storage or get_storage()
+    dates = backtest_dates(start, end, step_days, weekdays_only)
+    if not dates:
+        raise ValueError(f"No backtest dates between {start} and {end}; weekends are skipped unless included")
+    backtest_id = uuid.uuid4().hex
+    base_path = f"backtests/{backtest_id}"
+    lines: List[str] = []
+    summary: Dict[str, Any] = {}
+    for ticker in tickers:
+        approved = scored = 0
+        for record in backtest_ticker(ticker, dates, model_id, thresholds, batch_size, today):
+            lines.append(json.dumps(record))
+            approved += record["approved"]
+            scored += record["scored_on"] == record["as_of_date"]
+        summary[ticker] = {"dates": len(dates), "approved": approved, "scored": scored}
+    results_path = storage.write_text(f"{base_path}/results.jsonl", "\n".join(lines) + ("\n" if lines else ""))
+    summary_path = storage.write_json(
+        f"{base_path}/summary.json",
+        {
+            "backtest_id": backtest_id,
+            "start": str(start),
+            "end": str(end),
+            "step_days": step_days,
+            "model_id": model_id,
+            "thresholds": thresholds or {},
+            "tickers": summary,
+        },
+    )
+    storage.flush()
+    return {"backtest_id": backtest_id, "results_path": results_path, "summary_path": summary_path, "tickers": summary}
+
+
+def _filing_date(filing: FilingRef) -> Optional[date]:
+    return filing.filed_at or filing.period_end
+
+
+def _on_or_before(value: Optional[date], as_of_date: date) -> bool:
+    return value is not None and value <= as_of_date
+
+
+def _posted_between(post: Dict[str, Any], start: date, end: date) -> bool:
+    posted_at = post.get("posted_at")
+    if not posted_at:
+        return False
+    try:
+        posted = datetime.fromisoformat(str(posted_at)).date()
+    except ValueError:
+        return False
+    return start < posted <= end
+
+
+def _digest(parts: List[str]) -> str:
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Backtest the pipeline's scoring stages over a date range")
+    parser.add_argument("--tickers", nargs="+", required=True)
+    parser.add_argument("--start", required=True)
+    parser.add_argument("--end", default=str(date.today()))
+    parser.add_argument("--step-days", type=int, default=1)
+    parser.add_argument("--include-weekends", action="store_true")
+    parser.add_argument("--model-id", default="public:gpt-x")
+    parser.add_argument("--thresholds", default="{}", help="JSON object passed to multi_persona_review")
+    parser.add_argument("--batch-size", type=int, default=64, help="Dates whose point-in-time views are built at once")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    result = run_backtest(
+        tickers=[ticker.strip().upper() for ticker in args.tickers],
+        start=date.fromisoformat(args.start),
+        end=date.fromisoformat(args.end),
+        model_id=args.model_id,
+        thresholds=json.loads(args.thresholds),
+        step_days=args.step_days,
+        weekdays_only=not args.include_weekends,
+        batch_size=args.batch_size,
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.storage.backend import StorageBackend
+from src.core.storage.packet_delta import load_packet
+from src.core.storage.run_index import RunIndex
+from src.pipelines.prefetch import MARKET_WINDOW, ProviderCache
+from src.pipelines.providers import GuardedProviders, get_provider_guards
+from src.tools import placeholder_tools
+
+logger = logging.getLogger(__name__)
+
+FILING_FORMS = ["10-Q", "10-K", "8-K"]
+
+
+@dataclass
+class TickerDecision:
+    ticker: str
+    changed: bool
+    reasons: List[str] = field(default_factory=list)
+    previous: Optional[Dict[str, Any]] = None
+    fingerprint: Dict[str, Any] = field(default_factory=dict)
+
+
+def fingerprint_from_packet(packet: Dict[str, Any]) -> Dict[str, Any]:
+    filings = sorted(filing.get("sha256") or "" for filing in packet.get("filings") or [])
+    articles = (packet.get("news") or {}).get("articles") or []
+    high_water = max((str(article.get("date") or "") for article in articles), default="")
+    latest = sorted(_article_key(article) for article in articles if str(article.get("date") or "") == high_water)
+    return {
+        "filings": _digest(filings),
+        "news_high_water": high_water,
+        "news_latest": _digest(latest) if articles else "",
+        "price": (packet.get("market_snapshot") or {}).get("price"),
+    }
+
+
+def fetch_fingerprint(
+    ticker: str,
+    provider_cache: Optional[ProviderCache] = None,
+    providers: Optional[GuardedProviders] = None,
+) -> Dict[str, Any]:
+    providers = providers or GuardedProviders(get_provider_guards(), provider_cache, placeholder_tools)
+    return _fingerprint(_fetch_sources(ticker, providers))
+
+
+def _fetch_sources(ticker: str, providers: GuardedProviders) -> Dict[str, Tuple[Tuple[Any, ...], Dict[str, Any], Any]]:
+    # Only the sources that decide whether a re-run is worthwhile; the full
+    # pipeline fetches everything else, with these same arguments. Calls go
+    # through the same provider breakers as the pipeline, so a hung source
+    # cannot stall the pre-pass.
+    calls = {
+        "fetch_sec_filings": ((ticker, FILING_FORMS), {"limit": 3}),
+        "fetch_news": ((ticker,), {"days_back": 30, "recency_weighted": True}),
+        "fetch_market_data": ((ticker,), {"window": MARKET_WINDOW}),
+    }
+    return {name: (args, kwargs, getattr(providers, name)(*args, **kwargs)) for name, (args, kwargs) in calls.items()}
+
+
+def _fingerprint(fetched: Dict[str, Tuple[Tuple[Any, ...], Dict[str, Any], Any]]) -> Dict[str, Any]:
+    return fingerprint_from_packet(
+        {
+            "filings": [filing.model_dump() for filing in fetched["fetch_sec_filings"][2]],
+            "news": fetched["fetch_news"][2].model_dump(),
+            "market_snapshot": fetched["fetch_market_data"][2].model_dump(),
+        }
+    )
+
+
+def detect_changes(current: Dict[str, Any], previous: Dict[str, Any], price_move_threshold: float) -> List[str]:
+    reasons = []
+    if current.get("filings") != previous.get("filings"):
+        reasons.append("new_filing")
+    if (current.get("news_high_water"), current.get("news_latest")) != (
+        previous.get("news_high_water"),
+        previous.get("news_latest"),
+    ):
+        reasons.append("new_news")
+    price, previous_price = current.get("price"), previous.get("price")
+    if (price is None) != (previous_price is None):
+        reasons.append("price_move")
+    elif price is not None and previous_price and abs(price / previous_price - 1) > price_move_threshold:
+        reasons.append("price_move")
+    return reasons
+
+
+def stored_fingerprint(entry: Dict[str, Any], storage: Optional[StorageBackend] = None) -> Optional[Dict[str, Any]]:
+    if entry.get("source_fingerprint"):
+        return entry["source_fingerprint"]
+    # Runs indexed before fingerprints were recorded: derive it from the packet.
+    packet_path = entry.get("analysis_packet_s3_path")
+    if not packet_path:
+        return None
+    try:
+        return fingerprint_from_packet(load_packet(packet_path, storage=storage))
+    except (OSError, ValueError, KeyError):
+        logger.warning("Cannot read analysis packet %s for change detection", packet_path)
+        return None
+
+
+def plan_watchlist(
+    tickers: List[str],
+    run_index: RunIndex,
+    price_move_threshold: float = 0.05,
+    provider_cache: Optional[ProviderCache] = None,
+) -> List[TickerDecision]:
+    decisions = []
+    guards = get_provider_guards()
+    for ticker in tickers:
+        providers = GuardedProviders(guards, provider_cache, placeholder_tools)
+        fetched = _fetch_sources(ticker, providers)
+        current = _fingerprint(fetched)
+        previous = run_index.latest_approved(ticker)
+        if previous is None:
+            decisions.append(TickerDecision(ticker, True, ["no_approved_run"], None, current))
+            _seed(provider_cache, providers, ticker, fetched)
+            continue
+        if providers.data_gaps:
+            # A degraded source makes the fingerprint unreliable, and a re-run
+            # would see the same outage: keep serving the last analysis.
+            decisions.append(TickerDecision(ticker, False, ["provider_unavailable"], previous, current))
+            continue
+        previous_fingerprint = stored_fingerprint(previous, run_index.storage)
+        if previous_fingerprint is None:
+            decisions.append(TickerDecision(ticker, True, ["no_fingerprint"], previous, current))
+            _seed(provider_cache, providers, ticker, fetched)
+            continue
+        reasons = detect_changes(current, previous_fingerprint, price_move_threshold)
+        decisions.append(TickerDecision(ticker, bool(reasons), reasons, previous, current))
+        if reasons:
+            _seed(provider_cache, providers, ticker, fetched)
+    return decisions
+
+
+def _seed(
+    provider_cache: Optional[ProviderCache],
+    providers: GuardedProviders,
+    ticker: str,
+    fetched: Dict[str, Tuple[Tuple[Any, ...], Dict[str, Any], Any]],
+) -> None:
+    # A changed ticker's run reuses what the pre-pass fetched rather than
+    # asking each provider again. Degraded responses are not kept, so the run
+    # retries the provider and records its own data gaps.
+    if provider_cache is None or providers.data_gaps:
+        return
+    for name, (args, kwargs, value) in fetched.items():
+        provider_cache.seed(name, value, *args, **kwargs)
+
+
+def carry_forward(run_index: RunIndex, decision: TickerDecision, as_of_date: date) -> Dict[str, Any]:
+    previous = decision.previous or {}
+    run_id = uuid.uuid4().hex
+    entry = {
+        **previous,
+        "run_id": run_id,
+        "created_at": datetime.utcnow().isoformat(),
+        "carried_forward": True,
+        "carried_forward_from": previous.get("carried_forward_from") or previous.get("run_id"),
+        # Keep the analysed run's fingerprint so small drifts accumulate towards the threshold.
+        "source_fingerprint": stored_fingerprint(previous, run_index.storage) or decision.fingerprint,
+    }
+    run_index.put_detached(decision.ticker, str(as_of_date), run_id, entry)
+    return entry
+
+
+def _article_key(article: Dict[str, Any]) -> str:
+    return article.get("sha256") or article.get("url") or article.get("title") or ""
+
+
+def _digest(values: List[str]) -> str:
+    return hashlib.sha256("\n".join(values).encode("utf-8")).hexdigest()
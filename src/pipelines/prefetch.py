@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Tuple
+
+from src.core.metrics import CACHE_REQUESTS, PROVIDER_REQUESTS
+from src.core.schemas.models import FilingRef, MarketSnapshot, NewsBundle, OwnershipSnapshot
+from src.tools import placeholder_tools
+
+logger = logging.getLogger(__name__)
+
+MARKET_WINDOW = "1y"
+
+
+class ProviderCache:
+    # Per-ticker results of bulk provider calls. The fetch_* methods mirror the
+    # single-ticker tools so run_pipeline can use either; a miss falls back to
+    # the single-ticker request. The watchlist pre-pass also seeds what it
+    # fetched for a changed ticker, which that ticker's run then takes once.
+    def __init__(self, batch_size: int = 100) -> None:
+        self.batch_size = batch_size
+        self._market: Dict[Tuple[str, str], MarketSnapshot] = {}
+        self._ownership: Dict[str, OwnershipSnapshot] = {}
+        self._seeded: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, tickers: List[str], window: str = MARKET_WINDOW) -> None:
+        for batch in _chunks(list(dict.fromkeys(tickers)), self.batch_size):
+            market = _bulk("market_data", placeholder_tools.fetch_market_data_bulk, batch, window=window)
+            ownership = _bulk("ownership", placeholder_tools.fetch_ownership_and_holders_bulk, batch)
+            with self._lock:
+                self._market.update({(ticker, window): snapshot for ticker, snapshot in market.items()})
+                self._ownership.update(ownership)
+
+    def seed(self, name: str, value: Any, ticker: str, *args: Any, **kwargs: Any) -> None:
+        # Served only to a call with the same arguments.
+        with self._lock:
+            self._seeded[_key(name, ticker, args, kwargs)] = value
+
+    def fetch_sec_filings(self, ticker: str, *args: Any, **kwargs: Any) -> List[FilingRef]:
+        return self._take_or_fetch("fetch_sec_filings", "sec_filings", ticker, args, kwargs)
+
+    def fetch_news(self, ticker: str, *args: Any, **kwargs: Any) -> NewsBundle:
+        return self._take_or_fetch("fetch_news", "news", ticker, args, kwargs)
+
+    def fetch_market_data(self, ticker: str, window: str) -> MarketSnapshot:
+        with self._lock:
+            snapshot = self._seeded.pop(_key("fetch_market_data", ticker, (), {"window": window}), None)
+            if snapshot is None:
+                snapshot = self._market.get((ticker, window))
+        CACHE_REQUESTS.inc(cache="provider_market_data", result="miss" if snapshot is None else "hit")
+        if snapshot is None:
+            PROVIDER_REQUESTS.inc(source="market_data")
+            snapshot = placeholder_tools.fetch_market_data(ticker, window=window)
+        return snapshot
+
+    def fetch_ownership_and_holders(self, ticker: str) -> OwnershipSnapshot:
+        with self._lock:
+            snapshot = self._ownership.get(ticker)
+        CACHE_REQUESTS.inc(cache="provider_ownership", result="miss" if snapshot is None else "hit")
+        if snapshot is None:
+            PROVIDER_REQUESTS.inc(source="ownership")
+            snapshot = placeholder_tools.fetch_ownership_and_holders(ticker)
+        return snapshot
+
+    def _take_or_fetch(self, name: str, source: str, ticker: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Any:
+        with self._lock:
+            value = self._seeded.pop(_key(name, ticker, args, kwargs), None)
+        CACHE_REQUESTS.inc(cache=f"provider_{source}", result="miss" if value is None else "hit")
+        if value is None:
+            PROVIDER_REQUESTS.inc(source=source)
+            value = getattr(placeholder_tools, name)(ticker, *args, **kwargs)
+        return value
+
+
+def _key(name: str, ticker: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Tuple[str, ...]:
+    return (name, ticker, repr(args), repr(sorted(kwargs.items())))
+
+
+def _bulk(source: str, fetch: Callable[..., Dict[str, Any]], tickers: List[str], **kwargs: Any) -> Dict[str, Any]:
+    PROVIDER_REQUESTS.inc(source=f"{source}_bulk")
+    try:
+        return fetch(tickers, **kwargs)
+    except Exception:
+        # Anything not cached falls back to a per-ticker request in the pipeline.
+        logger.exception("Bulk %s prefetch failed for %d tickers", source, len(tickers))
+        return {}
+
+
+def _chunks(items: List[str], size: int) -> List[List[str]]:
+    return [items[index : index + size] for index in range(0, len(items), max(1, size))]
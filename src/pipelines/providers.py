@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import replace
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.core.config import get_settings
+from src.core.metrics import PROVIDER_DEGRADED, PROVIDER_HEDGES
+from src.core.recording import IOTape
+from src.core.resilience import BulkheadFullError, CircuitOpenError, Guard, GuardPolicy
+from src.core.schemas.models import MarketSnapshot, NewsBundle, OwnershipSnapshot, SocialBundle
+
+logger = logging.getLogger(__name__)
+
+# fetch_* tool -> (provider name used for policies and metrics, empty result)
+SOURCES: Dict[str, Tuple[str, Callable[[], Any]]] = {
+    "fetch_sec_filings": ("sec_filings", list),
+    "fetch_investor_materials": ("investor_materials", lambda: {"docs": []}),
+    "fetch_market_data": ("market_data", MarketSnapshot),
+    "fetch_ownership_and_holders": ("ownership", OwnershipSnapshot),
+    "fetch_news": ("news", NewsBundle),
+    "fetch_social_sentiment": ("social", SocialBundle),
+}
+
+
+class ProviderGuards:
+    # Process-wide breaker, latency state and worker pool per provider, plus
+    # the last good response per request so a tripped provider can fall back
+    # to it.
+    def __init__(
+        self,
+        default: Optional[GuardPolicy] = None,
+        policies: Optional[Dict[str, GuardPolicy]] = None,
+        cache_size: int = 4096,
+    ) -> None:
+        self.default = default or GuardPolicy()
+        self.policies = policies or {}
+        self.cache_size = cache_size
+        self._guards: Dict[str, Guard] = {}
+        self._last_good: OrderedDict[Tuple[Any, ...], Tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def guard(self, source: str) -> Guard:
+        with self._lock:
+            guard = self._guards.get(source)
+            if guard is None:
+                guard = Guard(
+                    self.policies.get(source, self.default),
+                    on_hedge=lambda: PROVIDER_HEDGES.inc(source=source),
+                    name=f"provider-{source}",
+                )
+                self._guards[source] = guard
+            return guard
+
+    def remember(self, key: Tuple[Any, ...], value: Any) -> None:
+        with self._lock:
+            self._last_good[key] = (time.time(), value)
+            self._last_good.move_to_end(key)
+            while len(self._last_good) > self.cache_size:
+                self._last_good.popitem(last=False)
+
+    def last_good(self, key: Tuple[Any, ...]) -> Optional[Tuple[float, Any]]:
+        with self._lock:
+            return self._last_good.get(key)
+
+    def close(self) -> None:
+        with self._lock:
+            guards = list(self._guards.values())
+        for guard in guards:
+            guard.close()
+
+
+@lru_cache(maxsize=1)
+def get_provider_guards() -> ProviderGuards:
+    settings = get_settings()
+    default = GuardPolicy(
+        slo_s=settings.provider_slo_s,
+        timeout_s=settings.provider_timeout_s,
+        failure_threshold=settings.provider_breaker_failures,
+        reset_after_s=settings.provider_breaker_reset_s,
+        hedge=settings.provider_hedge,
+        max_concurrency=settings.provider_max_concurrency,
+    )
+    policies = {
+        source: replace(default, slo_s=slo_s, timeout_s=max(default.timeout_s, slo_s))
+        for source, slo_s in settings.provider_slos.items()
+    }
+    return ProviderGuards(default, policies)
+
+
+class GuardedProviders:
+    # Per-run view over the fetch_* tools. Each call goes through its
+    # provider's breaker and hedging; when a provider fails or is tripped the
+    # run gets the last good response (or an empty one) and the gap is kept in
+    # data_gaps for the checklist. The first source that has a tool serves it,
+    # so a ProviderCache can stand in for market and ownership data.
+    def __init__(self, guards: ProviderGuards, *sources: Any) -> None:
+        self.guards = guards
+        self.sources = [source for source in sources if source is not None]
+        self.data_gaps: List[str] = []
+        for name in SOURCES:
+            setattr(self, name, self._guarded(name))
+
+    def _guarded(self, name: str) -> Callable[..., Any]:
+        source, empty = SOURCES[name]
+        tool = next(getattr(provider, name) for provider in self.sources if hasattr(provider, name))
+
+        def call(*args: Any, **kwargs: Any) -> Any:
+            key = (name, repr(args), repr(sorted(kwargs.items())))
+            try:
+                value = self.guards.guard(source).call(tool, *args, **kwargs)
+            except Exception as exc:
+                return self._degrade(source, key, empty, exc)
+            self.guards.remember(key, value)
+            return value
+
+        call.__name__ = name
+        return call
+
+    def _degrade(self, source: str, key: Tuple[Any, ...], empty: Callable[[], Any], exc: Exception) -> Any:
+        if isinstance(exc, CircuitOpenError):
+            reason = "circuit_open"
+        elif isinstance(exc, BulkheadFullError):
+            reason = "saturated"
+        elif isinstance(exc, TimeoutError):
+            reason = "timeout"
+        else:
+            reason = "error"
+            logger.warning("Provider %s failed: %r", source, exc)
+        cached = self.guards.last_good(key)
+        PROVIDER_DEGRADED.inc(source=source, reason=reason)
+        if cached is None:
+            self.data_gaps.append(f"{source}: provider unavailable ({reason}); no data")
+            return empty()
+        fetched_at, value = cached
+        fetched = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(fetched_at))
+        self.data_gaps.append(f"{source}: provider unavailable ({reason}); using cached data from {fetched}")
+        return value
+
+
+class RecordedProviders:
+    # Puts every fetch_* call, and the data gaps they left, on an IOTape. In
+    # replay mode there are no live providers and the tape answers instead.
+    def __init__(self, tape: IOTape, providers: Optional[GuardedProviders] = None) -> None:
+        self.tape = tape
+        self.providers = providers
+        for name in SOURCES:
+            setattr(self, name, tape.wrap(name, getattr(providers, name, None)))
+
+    @property
+    def data_gaps(self) -> List[str]:
+        return self.tape.call("data_gaps", lambda: list(self.providers.data_gaps))
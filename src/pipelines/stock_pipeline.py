@@ -1,17 +1,45 @@
 from __future__ import annotations
 
 import argparse
+import json
+import uuid
 from dataclasses import asdict
 from datetime import date
-from typing import Any, Dict, Optional
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
 
 from src.core.config import get_settings
-from src.core.schemas.models import AnalysisPacket
-from src.core.storage.local_storage import LocalStorage
+from src.core.metrics import PIPELINE_RUNS, PIPELINE_STAGE_SECONDS
+from src.core.profiling import RunProfiler
+from src.core.recording import IOTape
+from src.core.schemas.models import AnalysisPacket, PersonaReview, RunContext, RunPaths, trusted
+from src.core.storage.artifacts import read_artifact
+from src.core.storage.backend import StorageBackend
+from src.core.storage.factory import create_run_index, get_storage
+from src.core.storage.packet_delta import index_resolver, write_packet
 from src.core.storage.run_index import RunIndex
+from src.core.storage.serialization import decode
 from src.core.storage.training_writer import TrainingArtifactWriter
+from src.pipelines.change_detection import FILING_FORMS, fingerprint_from_packet
+from src.pipelines.prefetch import MARKET_WINDOW, ProviderCache
+from src.pipelines.providers import GuardedProviders, RecordedProviders, get_provider_guards
 from src.tools import placeholder_tools
 
+T = TypeVar("T")
+
+
+def _stage(tool: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    with PIPELINE_STAGE_SECONDS.time(stage=tool.__name__):
+        return tool(*args, **kwargs)
+
+
+def _profiled(profiler: RunProfiler) -> Callable[..., Any]:
+    def stage(tool: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        with profiler.stage(tool.__name__):
+            return _stage(tool, *args, **kwargs)
+
+    return stage
+
 
 def run_pipeline(
     ticker: str,
@@ -21,25 +49,82 @@ def run_pipeline(
     refresh: bool = False,
     thresholds: Optional[Dict[str, Any]] = None,
     max_iters: int = 1,
+    profile: bool = False,
+    provider_cache: Optional[ProviderCache] = None,
+    replay_from: Optional[str] = None,
 ) -> Dict[str, Any]:
     settings = get_settings()
-    storage = LocalStorage(settings.runs_dir)
-    run_index = RunIndex(f"{settings.runs_dir}/run_index.json")
-
-    run_context = placeholder_tools.init_run_context(ticker, as_of_date, mode, model_id, storage)
-    filings = placeholder_tools.fetch_sec_filings(ticker, ["10-Q", "10-K", "8-K"], limit=3)
-    financials = placeholder_tools.parse_filing_financials("placeholder")
-    derived_metrics = placeholder_tools.compute_derived_metrics(financials)
-    investor_materials = placeholder_tools.fetch_investor_materials(
-        ticker, ["earnings_release", "deck", "guidance"]
-    )
-    guidance = placeholder_tools.extract_guidance_and_claims(investor_materials["docs"])
-    market_snapshot = placeholder_tools.fetch_market_data(ticker, window="1y")
-    ownership_snapshot = placeholder_tools.fetch_ownership_and_holders(ticker)
-    news = placeholder_tools.fetch_news(ticker, days_back=30, recency_weighted=True)
-    social = placeholder_tools.fetch_social_sentiment(ticker, platforms=["reddit", "stocktwits", "x"], days_back=14)
+    storage = get_storage()
+    run_index = create_run_index(settings, storage)
+    tape = None
+    if replay_from:
+        tape = IOTape.replay(decode(read_artifact(replay_from, storage)))
+    elif settings.record_io:
+        tape = IOTape()
+    if not profile:
+        return _run(
+            storage, run_index, _stage, provider_cache, tape, ticker, as_of_date, mode, model_id, thresholds, max_iters
+        )[0]
+
+    profiler = RunProfiler()
+    profiler.start()
+    try:
+        result, trace_path = _run(
+            storage,
+            run_index,
+            _profiled(profiler),
+            provider_cache,
+            tape,
+            ticker,
+            as_of_date,
+            mode,
+            model_id,
+            thresholds,
+            max_iters,
+        )
+    finally:
+        profiler.stop()
+    storage.write_text(f"{trace_path}/profile.collapsed", profiler.collapsed())
+    result["profile_path"] = storage.write_plain_json(f"{trace_path}/profile.json", profiler.report())
+    storage.flush()
+    return result
+
+
+def _run(
+    storage: StorageBackend,
+    run_index: RunIndex,
+    stage: Callable[..., Any],
+    provider_cache: Optional[ProviderCache],
+    tape: Optional[IOTape],
+    ticker: str,
+    as_of_date: date,
+    mode: str,
+    model_id: str,
+    thresholds: Optional[Dict[str, Any]],
+    max_iters: int,
+) -> Tuple[Dict[str, Any], str]:
+    run_context, run_id, paths = _init_run(stage, storage, tape, ticker, as_of_date, mode, model_id)
+    # Watchlist runs hand in a ProviderCache filled by bulk requests; it has the
+    # same fetch_* signatures. Provider failures degrade to cached or empty data
+    # and end up in the checklist's data_gaps instead of failing the run. A
+    # replayed run reads every provider response from the recording instead.
+    providers: Any = None
+    if tape is None or not tape.replaying:
+        providers = GuardedProviders(get_provider_guards(), provider_cache, placeholder_tools)
+    if tape is not None:
+        providers = RecordedProviders(tape, providers)
+    filings = stage(providers.fetch_sec_filings, ticker, FILING_FORMS, limit=3)
+    financials = stage(placeholder_tools.parse_filing_financials, "placeholder")
+    derived_metrics = stage(placeholder_tools.compute_derived_metrics, financials)
+    investor_materials = stage(providers.fetch_investor_materials, ticker, ["earnings_release", "deck", "guidance"])
+    guidance = stage(placeholder_tools.extract_guidance_and_claims, investor_materials["docs"])
+    market_snapshot = stage(providers.fetch_market_data, ticker, window=MARKET_WINDOW)
+    ownership_snapshot = stage(providers.fetch_ownership_and_holders, ticker)
+    news = stage(providers.fetch_news, ticker, days_back=30, recency_weighted=True)
+    social = stage(providers.fetch_social_sentiment, ticker, platforms=["reddit", "stocktwits", "x"], days_back=14)
 
-    analysis_packet = AnalysisPacket(
+    analysis_packet = trusted(
+        AnalysisPacket,
         run_context=run_context,
         filings=filings,
         financials=financials,
@@ -51,12 +136,15 @@ def run_pipeline(
         social=social,
     )
 
-    boosters_downtrends = placeholder_tools.build_boosters_downtrends(
-        financials, guidance, news, social
-    )
-    checklist = placeholder_tools.run_critical_checklist(analysis_packet.model_dump(), checklist_version="v1")
-    persona_review = placeholder_tools.multi_persona_review(
-        analysis_packet.model_dump(), checklist, personas=["hf_pm", "sell_side", "trader", "credit"], thresholds=thresholds
+    boosters_downtrends = stage(placeholder_tools.build_boosters_downtrends, financials, guidance, news, social)
+    checklist = stage(placeholder_tools.run_critical_checklist, analysis_packet.model_dump(), checklist_version="v1")
+    checklist.data_gaps.extend(providers.data_gaps)
+    persona_review = stage(
+        placeholder_tools.multi_persona_review,
+        analysis_packet.model_dump(),
+        checklist,
+        personas=["hf_pm", "sell_side", "trader", "credit"],
+        thresholds=thresholds,
     )
 
     analysis_packet.boosters_downtrends = boosters_downtrends
@@ -66,45 +154,93 @@ def run_pipeline(
     iteration = 0
     while iteration < max_iters and (checklist.data_gaps or not persona_review.approved):
         iteration += 1
-        checklist = placeholder_tools.run_critical_checklist(analysis_packet.model_dump(), checklist_version="v1")
-        persona_review = placeholder_tools.multi_persona_review(
-            analysis_packet.model_dump(), checklist, personas=["hf_pm", "sell_side", "trader", "credit"], thresholds=thresholds
+        checklist = stage(placeholder_tools.run_critical_checklist, analysis_packet.model_dump(), checklist_version="v1")
+        checklist.data_gaps.extend(providers.data_gaps)
+        persona_review = stage(
+            placeholder_tools.multi_persona_review,
+            analysis_packet.model_dump(),
+            checklist,
+            personas=["hf_pm", "sell_side", "trader", "credit"],
+            thresholds=thresholds,
         )
         analysis_packet.checklist = checklist
         analysis_packet.persona_review = persona_review
         if persona_review.approved:
             break
 
-    investment_plan = placeholder_tools.generate_investment_plan(
-        analysis_packet.model_dump(), persona_review, risk_profile="speculative"
+    investment_plan = stage(
+        placeholder_tools.generate_investment_plan, analysis_packet.model_dump(), persona_review, risk_profile="speculative"
     )
     analysis_packet.investment_plan = investment_plan
 
-    parsed_path = f"{run_context.paths.parsed_path}/analysis_packet.json"
-    storage.write_json(parsed_path, analysis_packet.model_dump())
+    # Approved runs are served straight from their packet, so they are always
+    # full snapshots; other runs are stored as deltas against the previous run.
+    packet_path, packet_delta = write_packet(
+        storage,
+        paths.parsed_path,
+        analysis_packet.model_dump(mode="json"),
+        run_index.latest_run(ticker),
+        get_settings().packet_snapshot_every,
+        resolve=index_resolver(run_index),
+        full=persona_review.approved,
+    )
 
-    report_bundle = placeholder_tools.render_report(storage, run_context.paths.base_path, analysis_packet.model_dump())
+    report_bundle = stage(placeholder_tools.render_report, storage, paths.base_path, analysis_packet.model_dump())
 
     status = "approved" if persona_review.approved else "blocked"
-    run_index.put(
-        ticker,
-        str(as_of_date),
-        run_context.run_id,
-        {
-            "run_id": run_context.run_id,
-            "status": status,
-            "approved": persona_review.approved,
-            "model_id": model_id,
-            "created_at": run_context.created_at.isoformat(),
-            "report_s3_path": report_bundle.report_paths[0],
-            "analysis_packet_s3_path": storage.path(parsed_path),
-            "citations_map_s3_path": report_bundle.citations_map_path,
-        },
-    )
+    entry = {
+        "run_id": run_id,
+        "status": status,
+        "approved": persona_review.approved,
+        "model_id": model_id,
+        "created_at": run_context.created_at.isoformat(),
+        "report_s3_path": report_bundle.report_paths[0],
+        "analysis_packet_s3_path": storage.path(packet_path),
+        "citations_map_s3_path": report_bundle.citations_map_path,
+        "source_fingerprint": fingerprint_from_packet(
+            analysis_packet.model_dump(include={"filings", "news", "market_snapshot"})
+        ),
+    }
+    if packet_delta:
+        entry["packet_delta"] = packet_delta
+    if tape is not None and tape.replaying:
+        entry["replayed"] = True
+        entry["replay_of"] = run_context.run_id
 
-    training_writer = TrainingArtifactWriter(storage)
-    training_writer.write(
-        f"training/{ticker}/{as_of_date}/{run_context.run_id}",
+    # Replays re-score recorded inputs; exporting them would duplicate the
+    # recorded run's training record.
+    if tape is None or not tape.replaying:
+        _write_training(storage, ticker, as_of_date, run_id, model_id, thresholds, analysis_packet, persona_review)
+    result = {
+        "run_id": run_id,
+        "status": status,
+        "report_path": report_bundle.report_paths[0],
+        "analysis_packet_path": entry["analysis_packet_s3_path"],
+        "citations_map_path": report_bundle.citations_map_path,
+    }
+    if tape is not None and not tape.replaying:
+        result["recording_path"] = storage.write_plain_json(
+            f"{paths.trace_path}/io_recording.json", tape.document()
+        )
+    # The entry is published only once the artifacts it points at are
+    # persisted; with write-behind that happens on the writer thread.
+    storage.flush_then(lambda: run_index.put(ticker, str(as_of_date), run_id, entry))
+    PIPELINE_RUNS.inc(status=status)
+    return result, paths.trace_path
+
+
+def _write_training(
+    storage: StorageBackend,
+    ticker: str,
+    as_of_date: date,
+    run_id: str,
+    model_id: str,
+    thresholds: Optional[Dict[str, Any]],
+    analysis_packet: AnalysisPacket,
+    persona_review: PersonaReview,
+) -> None:
+    TrainingArtifactWriter(storage).write(
+        f"training/{ticker}/{as_of_date}/{run_id}",
         {
             "analysis_packet": analysis_packet.model_dump(),
             "draft_report": "",
@@ -119,13 +255,32 @@ def run_pipeline(
         },
     )
 
-    return {
-        "run_id": run_context.run_id,
-        "status": status,
-        "report_path": report_bundle.report_paths[0],
-        "analysis_packet_path": storage.path(parsed_path),
-        "citations_map_path": report_bundle.citations_map_path,
-    }
+
+def _init_run(
+    stage: Callable[..., Any],
+    storage: StorageBackend,
+    tape: Optional[IOTape],
+    ticker: str,
+    as_of_date: date,
+    mode: str,
+    model_id: str,
+) -> Tuple[RunContext, str, RunPaths]:
+    if tape is None:
+        run_context = stage(placeholder_tools.init_run_context, ticker, as_of_date, mode, model_id, storage)
+        return run_context, run_context.run_id, run_context.paths
+    # The run context is on the tape so a replay reproduces the recorded packet
+    # byte for byte, run_id and created_at included. The replay itself gets its
+    # own id and writes under replays/ in the recorded run's directory.
+    init = tape.wrap("init_run_context", partial(_init_run_context, storage))
+    run_context = stage(init, ticker, as_of_date, mode, model_id)
+    if not tape.replaying:
+        return run_context, run_context.run_id, run_context.paths
+    run_id = uuid.uuid4().hex
+    return run_context, run_id, placeholder_tools.run_paths(f"{run_context.paths.base_path}/replays/{run_id}", storage)
+
+
+def _init_run_context(storage: StorageBackend, ticker: str, as_of_date: date, mode: str, model_id: str) -> RunContext:
+    return placeholder_tools.init_run_context(ticker, as_of_date, mode, model_id, storage)
 
 
 def parse_args() -> argparse.Namespace:
@@ -136,6 +291,9 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--model-id", default="public:gpt-x")
     parser.add_argument("--refresh", action="store_true")
     parser.add_argument("--max-iters", type=int, default=1)
+    parser.add_argument("--profile", action="store_true", help="Write per-stage profile and collapsed stacks to trace/")
+    parser.add_argument("--thresholds", default="{}", help="JSON object passed to multi_persona_review")
+    parser.add_argument("--replay", default=None, help="Serve provider calls from this trace/io_recording.json")
     return parser.parse_args()
 
 
@@ -147,7 +305,10 @@ def main() -> None:
         mode=args.mode,
         model_id=args.model_id,
         refresh=args.refresh,
+        thresholds=json.loads(args.thresholds),
         max_iters=args.max_iters,
+        profile=args.profile,
+        replay_from=args.replay,
     )
     print(result)
 
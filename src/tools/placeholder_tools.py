@@ -3,7 +3,7 @@ from __future__ import annotations
 import hashlib
 import uuid
 from datetime import date, datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 from src.core.schemas.models import (
     BoostersDowntrends,
@@ -21,18 +21,18 @@ from src.core.schemas.models import (
     RunContext,
     RunPaths,
     SocialBundle,
+    trusted,
 )
-from src.core.storage.local_storage import LocalStorage
+from src.core.storage.backend import StorageBackend
 
 
 def _sha256(content: str) -> str:
     return hashlib.sha256(content.encode("utf-8")).hexdigest()
 
 
-def init_run_context(ticker: str, as_of_date: date, mode: str, model_id: str, storage: LocalStorage) -> RunContext:
-    run_id = uuid.uuid4().hex
-    base_path = f"{ticker}/{as_of_date}/{run_id}"
-    paths = RunPaths(
+def run_paths(base_path: str, storage: StorageBackend) -> RunPaths:
+    paths = trusted(
+        RunPaths,
         base_path=base_path,
         raw_path=f"{base_path}/raw",
         parsed_path=f"{base_path}/parsed",
@@ -43,7 +43,14 @@ def init_run_context(ticker: str, as_of_date: date, mode: str, model_id: str, st
     storage.ensure_dir(paths.parsed_path)
     storage.ensure_dir(paths.report_path)
     storage.ensure_dir(paths.trace_path)
-    return RunContext(
+    return paths
+
+
+def init_run_context(ticker: str, as_of_date: date, mode: str, model_id: str, storage: StorageBackend) -> RunContext:
+    run_id = uuid.uuid4().hex
+    paths = run_paths(f"{ticker}/{as_of_date}/{run_id}", storage)
+    return trusted(
+        RunContext,
         run_id=run_id,
         ticker=ticker,
         as_of_date=as_of_date,
@@ -55,11 +62,14 @@ def init_run_context(ticker: str, as_of_date: date, mode: str, model_id: str, st
     )
 
 
-def fetch_sec_filings(ticker: str, forms: List[str], limit: int = 3) -> List[FilingRef]:
+def fetch_sec_filings(
+    ticker: str, forms: List[str], limit: Optional[int] = 3, days_back: Optional[int] = None
+) -> List[FilingRef]:
     filings = []
     for form in forms[:limit]:
         filings.append(
-            FilingRef(
+            trusted(
+                FilingRef,
                 form=form,
                 period_end=None,
                 filed_at=None,
@@ -72,13 +82,15 @@ def fetch_sec_filings(ticker: str, forms: List[str], limit: int = 3) -> List[Fil
 
 
 def parse_filing_financials(_filing_local_path: str) -> Financials:
-    empty_statement = FinancialStatement(
+    empty_statement = trusted(
+        FinancialStatement,
         line_items={},
         currency=None,
         period_start=None,
         period_end=None,
     )
-    return Financials(
+    return trusted(
+        Financials,
         income_statement=empty_statement,
         balance_sheet=empty_statement,
         cash_flow=empty_statement,
@@ -88,7 +100,8 @@ def parse_filing_financials(_filing_local_path: str) -> Financials:
 
 
 def compute_derived_metrics(_financials: Financials) -> DerivedMetrics:
-    return DerivedMetrics(
+    return trusted(
+        DerivedMetrics,
         fcf=None,
         cfo=None,
         capex=None,
@@ -113,7 +126,8 @@ def fetch_investor_materials(ticker: str, types: List[str]) -> Dict[str, Any]:
 
 
 def extract_guidance_and_claims(_docs: List[Dict[str, Any]]) -> GuidanceClaims:
-    return GuidanceClaims(
+    return trusted(
+        GuidanceClaims,
         guidance=["Guidance extraction placeholder."],
         management_claims=[],
         contracted_commitments=[],
@@ -122,31 +136,41 @@ def extract_guidance_and_claims(_docs: List[Dict[str, Any]]) -> GuidanceClaims:
 
 
 def fetch_market_data(_ticker: str, window: str) -> MarketSnapshot:
-    return MarketSnapshot(price=None, market_cap=None, high_52w=None, low_52w=None, returns={})
+    return trusted(MarketSnapshot, price=None, market_cap=None, high_52w=None, low_52w=None, returns={})
 
 
 def fetch_ownership_and_holders(_ticker: str) -> OwnershipSnapshot:
-    return OwnershipSnapshot(top_holders=[], institutional_ownership=None)
+    return trusted(OwnershipSnapshot, top_holders=[], institutional_ownership=None)
+
+
+def fetch_market_data_bulk(tickers: List[str], window: str) -> Dict[str, MarketSnapshot]:
+    return {ticker: fetch_market_data(ticker, window=window) for ticker in tickers}
+
+
+def fetch_ownership_and_holders_bulk(tickers: List[str]) -> Dict[str, OwnershipSnapshot]:
+    return {ticker: fetch_ownership_and_holders(ticker) for ticker in tickers}
 
 
 def fetch_news(_ticker: str, days_back: int, recency_weighted: bool) -> NewsBundle:
-    return NewsBundle(articles=[])
+    return trusted(NewsBundle, articles=[])
 
 
 def fetch_social_sentiment(_ticker: str, platforms: List[str], days_back: int) -> SocialBundle:
-    return SocialBundle(themes=[], bull_cases=[], bear_cases=[], notable_posts=[])
+    return trusted(SocialBundle, themes=[], bull_cases=[], bear_cases=[], notable_posts=[])
 
 
 def build_boosters_downtrends(*_args: Any, **_kwargs: Any) -> BoostersDowntrends:
-    return BoostersDowntrends(boosters=[], downtrends=[])
+    return trusted(BoostersDowntrends, boosters=[], downtrends=[])
 
 
 def run_critical_checklist(*_args: Any, **_kwargs: Any) -> ChecklistResult:
-    return ChecklistResult(results=[], data_gaps=["Checklist not implemented"], overall_score=0.0)
+    return trusted(ChecklistResult, results=[], data_gaps=["Checklist not implemented"], overall_score=0.0)
 
 
 def multi_persona_review(*_args: Any, **_kwargs: Any) -> PersonaReview:
-    return PersonaReview(persona_scores=[], approved=False, required_next_data=["Persona review not implemented"])
+    return trusted(
+        PersonaReview, persona_scores=[], approved=False, required_next_data=["Persona review not implemented"]
+    )
 
 
 def generate_investment_plan(*_args: Any, **_kwargs: Any) -> Dict[str, Any]:
@@ -162,11 +186,11 @@ def generate_investment_plan(*_args: Any, **_kwargs: Any) -> Dict[str, Any]:
     }
 
 
-def render_report(storage: LocalStorage, base_path: str, analysis_packet: Dict[str, Any]) -> ReportBundle:
+def render_report(storage: StorageBackend, base_path: str, analysis_packet: Dict[str, Any]) -> ReportBundle:
     report_path = storage.write_text(
         f"{base_path}/report/final_report.md",
         "# Stock Analysis Report\n\nReport rendering placeholder.",
     )
-    citations_path = storage.write_json(f"{base_path}/report/citations_map.json", {})
+    citations_path = storage.write_plain_json(f"{base_path}/report/citations_map.json", {})
     trace_path = storage.write_json(f"{base_path}/trace/trace.json", {"note": "trace placeholder"})
-    return ReportBundle(report_paths=[report_path], citations_map_path=citations_path, trace_path=trace_path)
+    return trusted(ReportBundle, report_paths=[report_path], citations_map_path=citations_path, trace_path=trace_path)
@@ -0,0 +1,69 @@
+import json
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from src.core.schemas.models import FilingRef, NewsArticle, NewsBundle
+from src.core.storage.local_storage import LocalStorage
+from src.pipelines import backtest
+from src.tools import placeholder_tools
+
+
+def test_backtest_slices_sources_point_in_time(tmp_path, monkeypatch):
+    calls = {"news": 0, "parse": 0}
+
+    def fetch_news(_ticker, days_back, recency_weighted):
+        calls["news"] += 1
+        return NewsBundle(
+            articles=[
+                NewsArticle(title="old", date=date(2024, 1, 2), sha256="a"),
+                NewsArticle(title="new", date=date(2024, 1, 4), sha256="b"),
+            ]
+        )
+
+    def fetch_sec_filings(ticker, forms, limit=3, days_back=None):
+        calls["filings"] = (limit, days_back)
+        return [
+            FilingRef(form="10-K", filed_at=date(2024, 1, 4), local_path="10-K.htm", sha256="k"),
+            FilingRef(form="10-Q", filed_at=date(2024, 1, 3), local_path="10-Q.htm", sha256="q"),
+            FilingRef(form="8-K", sha256="undated"),
+        ]
+
+    def parse_filing_financials(path):
+        calls["parse"] += 1
+        calls.setdefault("parsed", []).append(path)
+        return original_parse(path)
+
+    original_parse = placeholder_tools.parse_filing_financials
+    monkeypatch.setattr(placeholder_tools, "fetch_news", fetch_news)
+    monkeypatch.setattr(placeholder_tools, "fetch_sec_filings", fetch_sec_filings)
+    monkeypatch.setattr(placeholder_tools, "parse_filing_financials", parse_filing_financials)
+
+    result = backtest.run_backtest(
+        ["ACME"],
+        date(2024, 1, 1),
+        date(2024, 1, 5),
+        model_id="public:gpt-x",
+        storage=LocalStorage(str(tmp_path)),
+        today=date(2024, 6, 1),
+    )
+
+    records = [json.loads(line) for line in Path(result["results_path"]).read_text().splitlines()]
+    by_date = {record["as_of_date"]: record for record in records}
+    assert [by_date[day]["news_articles"] for day in sorted(by_date)] == [0, 1, 1, 2, 2]
+    assert [by_date[day]["filings"] for day in sorted(by_date)] == [0, 0, 1, 2, 2]
+    assert by_date["2024-01-05"]["scored_on"] == "2024-01-04"
+    assert "market_snapshot: no point-in-time history" in by_date["2024-01-05"]["data_gaps"]
+    assert all(record["data_gaps"].count("filings: undated filings excluded") == 1 for record in records)
+    assert calls.pop("parsed") == ["placeholder", "10-Q.htm", "10-K.htm"]
+    assert calls == {"news": 1, "parse": 3, "filings": (None, 152 + backtest.FILING_LOOKBACK_DAYS)}
+    assert result["tickers"]["ACME"] == {"dates": 5, "approved": 0, "scored": 4}
+
+
+def test_backtest_rejects_a_range_without_dates(tmp_path):
+    with pytest.raises(ValueError, match="No backtest dates"):
+        backtest.run_backtest(
+            ["ACME"], date(2024, 1, 6), date(2024, 1, 7), model_id="public:gpt-x", storage=LocalStorage(str(tmp_path))
+        )
+    assert list(backtest.backtest_ticker("ACME", [], model_id="public:gpt-x")) == []
@@ -0,0 +1,31 @@
+from benchmarks.suite import compare, summarize
+
+
+def test_compare_flags_regressions_against_baseline():
+    baseline = {"results": {"a": {"median_ms": 10.0}, "b": {"median_ms": 10.0}, "c": {"median_ms": 10.0}}}
+    current = {
+        "results": {
+            "a": summarize([12.0, 12.0, 12.0]),
+            "b": summarize([10.5]),
+            "c": summarize([5.0]),
+            "d": summarize([1.0]),
+        }
+    }
+
+    statuses = {row["benchmark"]: row["status"] for row in compare(current, baseline, threshold=0.15)}
+
+    assert statuses == {"a": "regression", "b": "unchanged", "c": "improvement", "d": "new"}
+
+
+def test_loadtest_summary_reports_percentiles_and_errors():
+    from benchmarks.loadtest import parse_mix, summarize as summarize_load
+
+    assert parse_mix("query=3,status") == {"query": 3.0, "status": 1.0}
+    samples = [("query", float(latency), latency != 100) for latency in range(1, 101)]
+
+    report = summarize_load(samples, elapsed_s=10.0)
+
+    assert report["throughput_rps"] == 10.0
+    assert report["error_rate"] == 0.01
+    assert report["by_type"]["query"]["p50_ms"] == 51.0
+    assert report["by_type"]["query"]["p99_ms"] == 100.0
@@ -0,0 +1,113 @@
+import argparse
+import threading
+import time
+from datetime import date
+
+from scripts.daily_watchlist_runner import process_ticker
+from src.core.config import get_settings
+from src.core.storage.run_index import RunIndex
+from src.pipelines.change_detection import carry_forward, detect_changes, fetch_fingerprint, plan_watchlist
+from src.pipelines.providers import get_provider_guards
+from src.tools import placeholder_tools
+
+
+def _approved(index, ticker, run_id, fingerprint):
+    index.put(
+        ticker,
+        "2024-01-01",
+        run_id,
+        {
+            "run_id": run_id,
+            "status": "approved",
+            "approved": True,
+            "created_at": "2024-01-01T00:00:00",
+            "report_s3_path": "report.md",
+            "analysis_packet_s3_path": "analysis_packet.json",
+            "source_fingerprint": fingerprint,
+        },
+    )
+
+
+def test_detect_changes_uses_price_threshold():
+    previous = {"filings": "a", "news_high_water": "2024-01-01", "news_latest": "x", "price": 10.0}
+
+    assert detect_changes({**previous, "price": 10.4}, previous, 0.05) == []
+    assert detect_changes({**previous, "price": 11.0}, previous, 0.05) == ["price_move"]
+    assert detect_changes({**previous, "filings": "b", "news_latest": "y"}, previous, 0.05) == ["new_filing", "new_news"]
+
+
+def test_plan_watchlist_carries_forward_unchanged_tickers(tmp_path):
+    index = RunIndex(str(tmp_path / "run_index.json"))
+    _approved(index, "SAME", "run-same", fetch_fingerprint("SAME"))
+    _approved(index, "MOVED", "run-moved", {**fetch_fingerprint("MOVED"), "filings": "older"})
+
+    decisions = {decision.ticker: decision for decision in plan_watchlist(["SAME", "MOVED", "NEW"], index)}
+
+    assert not decisions["SAME"].changed
+    assert decisions["MOVED"].reasons == ["new_filing"]
+    assert decisions["NEW"].reasons == ["no_approved_run"]
+
+    entry = carry_forward(index, decisions["SAME"], date(2024, 1, 2))
+    latest = index.latest_approved("SAME")
+    assert latest["run_id"] == entry["run_id"] != "run-same"
+    assert latest["carried_forward_from"] == "run-same"
+    assert latest["report_s3_path"] == "report.md"
+
+
+def test_carried_forward_ticker_refreshes_metrics_textfile(tmp_path):
+    index = RunIndex(str(tmp_path / "run_index.json"))
+    _approved(index, "SAME", "run-same", fetch_fingerprint("SAME"))
+    textfile = tmp_path / "watchlist.prom"
+    textfile.write_text("stale\n", encoding="utf-8")
+    args = argparse.Namespace(force=False, price_move_threshold=0.05, metrics_textfile=str(textfile))
+
+    result = process_ticker("SAME", date(2024, 1, 2), args, index)
+
+    assert result["status"] == "carried_forward"
+    assert 'watchlist_tickers_total{outcome="carried_forward"}' in textfile.read_text(encoding="utf-8")
+
+
+def test_plan_watchlist_does_not_wait_on_a_hung_provider(tmp_path, monkeypatch):
+    monkeypatch.setenv("STOCK_PROVIDER_TIMEOUT_S", "0.1")
+    monkeypatch.setenv("STOCK_PROVIDER_HEDGE", "false")
+    get_settings.cache_clear()
+    get_provider_guards.cache_clear()
+    index = RunIndex(str(tmp_path / "run_index.json"))
+    _approved(index, "SAME", "run-same", fetch_fingerprint("SAME"))
+    hang = threading.Event()
+    monkeypatch.setattr(placeholder_tools, "fetch_news", lambda *_args, **_kwargs: hang.wait(5))
+    try:
+        start = time.monotonic()
+        decisions = plan_watchlist(["SAME", "NEW"], index)
+        elapsed = time.monotonic() - start
+    finally:
+        hang.set()
+        get_provider_guards().close()
+        get_provider_guards.cache_clear()
+        get_settings.cache_clear()
+
+    assert elapsed < 1.0
+    assert not decisions[0].changed and decisions[0].reasons == ["provider_unavailable"]
+    assert decisions[1].reasons == ["no_approved_run"]
+
+
+def test_changed_ticker_fetches_each_source_once(tmp_path, monkeypatch):
+    monkeypatch.setenv("STOCK_RUNS_DIR", str(tmp_path))
+    get_settings.cache_clear()
+    calls = []
+    for name in ("fetch_sec_filings", "fetch_news", "fetch_market_data"):
+        tool = getattr(placeholder_tools, name)
+        monkeypatch.setattr(
+            placeholder_tools, name, lambda *args, _name=name, _tool=tool, **kwargs: calls.append(_name) or _tool(*args, **kwargs)
+        )
+    index = RunIndex(str(tmp_path / "run_index.json"))
+    args = argparse.Namespace(
+        force=False, price_move_threshold=0.05, metrics_textfile=None, model_id="public:gpt-x", max_iters=1
+    )
+    try:
+        result = process_ticker("NEW", date(2024, 1, 2), args, index)
+    finally:
+        get_settings.cache_clear()
+
+    assert result["status"] in ("approved", "blocked")
+    assert sorted(calls) == ["fetch_market_data", "fetch_news", "fetch_sec_filings"]
@@ -0,0 +1,69 @@
+import json
+
+from services.mcp_server.context_packer import ContextPacker, context_budget
+from services.mcp_server.model_router import ModelRouter
+from services.mcp_server.snapshots import SnapshotStore
+from src.core.metrics import CACHE_REQUESTS
+from src.core.storage.run_index import RunIndex
+
+
+def _write_artifacts(tmp_path):
+    packet = {
+        "market_snapshot": {"price": 21.4, "market_cap": 5.6e9},
+        "news": {"articles": [{"title": f"Routine update {index}", "snippet": "nothing new"} for index in range(40)]},
+        "derived_metrics": {"runway_months_estimate": 14.5, "burn_rate": 1e7, "flags": ["cash runway below 18 months"]},
+    }
+    packet_path = tmp_path / "analysis_packet.json"
+    packet_path.write_text(json.dumps(packet), encoding="utf-8")
+    report_path = tmp_path / "final_report.md"
+    report_path.write_text(
+        "# Report\n\n" + "\n\n".join(f"Section {index} discusses spectrum partners." for index in range(20)),
+        encoding="utf-8",
+    )
+    return str(report_path), str(packet_path)
+
+
+def test_packer_ranks_relevant_chunks_within_budget(tmp_path):
+    refs = _write_artifacts(tmp_path)
+    packer = ContextPacker(max_chunk_tokens=32)
+
+    packed = packer.pack("what is the cash runway and burn rate?", list(refs), budget_tokens=40)
+
+    assert packed.tokens <= 40
+    assert "runway_months_estimate: 14.5" in packed.text
+    assert packer.chunks_for(refs[1]) is packer.chunks_for(refs[1])
+
+
+def test_router_injects_packed_context(tmp_path):
+    refs = _write_artifacts(tmp_path)
+    router = ModelRouter()
+
+    response = router.generate(
+        "public:gpt-x", [{"role": "user", "content": "cash runway?"}], False, {}, list(refs), "run-1", 0.2
+    )
+
+    trace = router._trace[-1]
+    assert trace["context_chunks"]
+    assert 0 < trace["context_tokens"] <= context_budget(None, [{"content": "cash runway?"}])
+    assert response["usage"]["prompt_tokens"] >= trace["context_tokens"]
+
+
+def test_snapshot_chunks_prime_the_packer(tmp_path):
+    report_path, packet_path = _write_artifacts(tmp_path)
+    index = RunIndex(str(tmp_path / "run_index.json"))
+    index.put(
+        "ACME",
+        "2024-01-01",
+        "run-1",
+        {"run_id": "run-1", "status": "approved", "report_s3_path": report_path, "analysis_packet_s3_path": packet_path},
+    )
+    SnapshotStore(index, str(tmp_path / "snapshots"), ContextPacker(max_chunk_tokens=32)).get("ACME")
+
+    # A restarted server loads the persisted snapshot and queries without re-chunking.
+    packer = ContextPacker(max_chunk_tokens=32)
+    SnapshotStore(index, str(tmp_path / "snapshots"), packer).get("ACME")
+    misses = CACHE_REQUESTS.value(cache="context_chunks", result="miss")
+    packed = packer.pack("what is the cash runway and burn rate?", [report_path, packet_path], budget_tokens=40)
+
+    assert "runway_months_estimate: 14.5" in packed.text
+    assert CACHE_REQUESTS.value(cache="context_chunks", result="miss") == misses
@@ -0,0 +1,60 @@
+import threading
+
+from src.core.metrics import SHARD_STRIPES, MetricsRegistry
+
+
+def test_counters_sum_across_threads():
+    registry = MetricsRegistry()
+    counter = registry.counter("jobs_total", "Jobs.", ["kind"])
+
+    def work():
+        for _ in range(1000):
+            counter.inc(kind="a")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter.value(kind="a") == 4000
+    assert 'jobs_total{kind="a"} 4000' in registry.render()
+
+
+def test_short_lived_threads_do_not_grow_shards():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests.")
+    histogram = registry.histogram("request_seconds", "Request time.")
+
+    for _ in range(20):
+        threads = [
+            threading.Thread(target=lambda: (counter.inc(), histogram.observe(0.01))) for _ in range(100)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert counter.value() == 2000
+    assert histogram.count() == 2000
+    assert len(counter._shards.snapshot()) <= SHARD_STRIPES
+    assert len(histogram._shards.snapshot()) <= SHARD_STRIPES
+
+
+def test_histogram_renders_cumulative_buckets(tmp_path):
+    registry = MetricsRegistry()
+    histogram = registry.histogram("stage_seconds", "Stage time.", ["stage"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage="fetch")
+    histogram.observe(0.5, stage="fetch")
+    histogram.observe(5.0, stage="fetch")
+
+    text = registry.render()
+    assert "# TYPE stage_seconds histogram" in text
+    assert 'stage_seconds_bucket{stage="fetch",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="fetch",le="1"} 2' in text
+    assert 'stage_seconds_bucket{stage="fetch",le="+Inf"} 3' in text
+    assert 'stage_seconds_count{stage="fetch"} 3' in text
+
+    path = tmp_path / "metrics.prom"
+    registry.write_textfile(str(path))
+    assert path.read_text(encoding="utf-8") == text
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from services.mcp_server.model_registry import ModelRegistry
+from services.mcp_server.model_router import ModelRouter
+
+CONFIG = """
+models:
+  - model_id: public:gpt-x
+    type: public
+    endpoint: https://api.example.com/v1/chat/completions
+    auth: none
+  - model_id: cluster:old
+    type: cluster
+    endpoint: http://localhost:8001/generate
+    auth: none
+"""
+
+
+def _bump_mtime(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_registry_indexes_and_hot_reloads(tmp_path):
+    config = tmp_path / "models.yaml"
+    config.write_text(CONFIG, encoding="utf-8")
+    registry = ModelRegistry(str(config))
+    router = ModelRouter(registry)
+
+    assert registry.get("cluster:old")["endpoint"] == "http://localhost:8001/generate"
+    client = router.clients.get(registry.get("cluster:old"))
+    kept = router.clients.get(registry.get("public:gpt-x"))
+    assert router.clients.get(registry.get("cluster:old")) is client
+    assert registry.reload_if_changed() == set()
+
+    config.write_text(CONFIG.replace("cluster:old", "cluster:new"), encoding="utf-8")
+    _bump_mtime(config)
+    changed = registry.reload_if_changed()
+
+    assert changed == {"cluster:old", "cluster:new"}
+    assert registry.get("cluster:new")
+    with pytest.raises(KeyError):
+        registry.get("cluster:old")
+    assert router.clients.peek("cluster:old") is None
+    assert client.is_closed
+    assert router.clients.peek("public:gpt-x") is kept
+    router.close()
+
+
+def test_registry_keeps_previous_config_on_bad_reload(tmp_path):
+    config = tmp_path / "models.yaml"
+    config.write_text(CONFIG, encoding="utf-8")
+    registry = ModelRegistry(str(config))
+
+    config.write_text(CONFIG + "\n  - model_id: public:gpt-x\n    type: public\n", encoding="utf-8")
+    _bump_mtime(config)
+
+    assert registry.reload_if_changed() == set()
+    assert [model["model_id"] for model in registry.list_models()] == ["public:gpt-x", "cluster:old"]
+
+
+def test_reload_closes_dropped_clients_only_after_in_flight_requests(tmp_path):
+    config = tmp_path / "models.yaml"
+    config.write_text(CONFIG, encoding="utf-8")
+    registry = ModelRegistry(str(config))
+    router = ModelRouter(registry)
+    batcher = router._batcher(registry.get("cluster:old"))
+
+    with router.clients.lease(registry.get("cluster:old")) as client:
+        config.write_text(CONFIG.replace("cluster:old", "cluster:new"), encoding="utf-8")
+        _bump_mtime(config)
+        registry.reload_if_changed()
+        assert router.clients.peek("cluster:old") is None
+        assert batcher._client is client
+        assert not client.is_closed
+
+    assert client.is_closed
+    router.close()
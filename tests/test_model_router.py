@@ -0,0 +1,185 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.mcp_server.batching import BatcherClosedError, MicroBatcher
+from services.mcp_server.model_registry import ModelRegistry
+from services.mcp_server.model_router import ModelRouter
+
+
+class StubClusterHandler(BaseHTTPRequestHandler):
+    batch_sizes = []
+    streamed = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if body.get("stream"):
+            self._stream(body)
+            return
+        requests = body["requests"]
+        self.batch_sizes.append(len(requests))
+        payload = json.dumps(
+            {
+                "responses": [
+                    {"text": f"echo:{request['messages'][-1]['content']}", "usage": {"prompt_tokens": 1, "completion_tokens": 2}}
+                    for request in requests
+                ]
+            }
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, body):
+        self.streamed.append(body)
+        if body["messages"][-1]["content"] == "fail":
+            # Announces a longer body than it sends, then drops the connection.
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Content-Length", "4096")
+            self.end_headers()
+            self.wfile.write((json.dumps({"type": "token", "text": "partial"}) + "\n").encode("utf-8"))
+            self.wfile.flush()
+            return
+        words = f"echo {body['messages'][-1]['content']}".split(" ")
+        events = [{"type": "token", "text": word if index == 0 else f" {word}"} for index, word in enumerate(words)]
+        events.append({"type": "done", "usage": {"prompt_tokens": 1, "completion_tokens": len(words)}, "model_version": "v2"})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        for event in events:
+            self.wfile.write((json.dumps(event) + "\n\n").encode("utf-8"))
+            self.wfile.flush()
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def stub_cluster():
+    StubClusterHandler.batch_sizes = []
+    StubClusterHandler.streamed = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubClusterHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/generate"
+    server.shutdown()
+
+
+def _registry(tmp_path, endpoint, max_batch_size=4, max_wait_ms=200):
+    config = tmp_path / "models.yaml"
+    config.write_text(
+        f"""
+models:
+  - model_id: cluster:test
+    type: cluster
+    endpoint: {endpoint}
+    max_tokens: 128
+    batching:
+      max_batch_size: {max_batch_size}
+      max_wait_ms: {max_wait_ms}
+""",
+        encoding="utf-8",
+    )
+    return ModelRegistry(str(config))
+
+
+def _generate(router, index):
+    return router.generate(
+        model_id="cluster:test",
+        messages=[{"role": "user", "content": f"q{index}"}],
+        tools_enabled=False,
+        tool_schema={},
+        context_refs=[],
+        run_id=f"run-{index}",
+        temperature=0.2,
+    )
+
+
+def test_cluster_requests_are_batched(tmp_path, stub_cluster):
+    router = ModelRouter(_registry(tmp_path, stub_cluster))
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda index: _generate(router, index), range(8)))
+    finally:
+        router.close()
+
+    assert [result["text"] for result in results] == [f"echo:q{index}" for index in range(8)]
+    assert [result["trace_id"] for result in results] == [f"run-{index}" for index in range(8)]
+    assert sum(StubClusterHandler.batch_sizes) == 8
+    assert max(StubClusterHandler.batch_sizes) <= 4
+    assert len(StubClusterHandler.batch_sizes) < 8
+
+
+def test_closed_batcher_rejects_submits_immediately(stub_cluster):
+    batcher = MicroBatcher(stub_cluster, timeout=30.0)
+    batcher.close()
+    with pytest.raises(BatcherClosedError):
+        batcher.submit({"messages": [{"role": "user", "content": "q"}]})
+
+
+def test_router_retries_when_reload_closes_its_batcher(tmp_path, stub_cluster, monkeypatch):
+    router = ModelRouter(_registry(tmp_path, stub_cluster))
+    # The first lookup returns a batcher that a reload has already closed.
+    stale = MicroBatcher(stub_cluster)
+    stale.close()
+    lookups = [stale]
+    lookup = router._batcher
+    monkeypatch.setattr(router, "_batcher", lambda model: lookups.pop() if lookups else lookup(model))
+    try:
+        result = _generate(router, 1)
+    finally:
+        router.close()
+
+    assert result["text"] == "echo:q1"
+
+
+def test_non_cluster_models_bypass_batching(tmp_path, stub_cluster):
+    router = ModelRouter(_registry(tmp_path, stub_cluster))
+    response = router.generate("public:gpt-x", [], False, {}, [], "run-1", 0.2)
+    assert response["text"] == "Model routing placeholder response."
+    assert StubClusterHandler.batch_sizes == []
+
+
+def test_cluster_streams_ndjson_events(tmp_path, stub_cluster):
+    router = ModelRouter(_registry(tmp_path, stub_cluster))
+    try:
+        events = list(
+            router.generate_stream("cluster:test", [{"role": "user", "content": "q1"}], False, {}, [], "run-1", 0.2)
+        )
+    finally:
+        router.close()
+
+    assert "".join(event["text"] for event in events if event["type"] == "token") == "echo q1"
+    assert events[-1] == {
+        "type": "done",
+        "tool_calls": [],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 2},
+        "model_version": "v2",
+        "trace_id": "run-1",
+    }
+    assert StubClusterHandler.streamed[0]["messages"] == [{"role": "user", "content": "q1"}]
+    assert StubClusterHandler.batch_sizes == []
+    assert router._trace[-1]["status"] == "completed"
+
+
+def test_cluster_stream_failure_ends_with_error_event(tmp_path, stub_cluster):
+    router = ModelRouter(_registry(tmp_path, stub_cluster))
+    try:
+        events = list(
+            router.generate_stream("cluster:test", [{"role": "user", "content": "fail"}], False, {}, [], "run-1", 0.2)
+        )
+    finally:
+        router.close()
+
+    assert events[0] == {"type": "token", "text": "partial"}
+    assert events[-1]["type"] == "error"
+    assert events[-1]["trace_id"] == "run-1"
+    assert events[-1]["message"]
+    assert not any(event["type"] == "done" for event in events)
+    assert router._trace[-1]["status"] == "error"
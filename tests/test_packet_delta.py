@@ -0,0 +1,70 @@
+import copy
+from datetime import date
+
+from src.core.config import get_settings
+from src.core.storage.packet_delta import apply, diff, load_packet
+from src.core.storage.retention import RetentionEngine, RetentionPolicy
+from src.core.storage.run_index import RunIndex
+from src.pipelines.stock_pipeline import run_pipeline
+
+
+def test_diff_and_apply_round_trip_with_keyed_lists():
+    old = {
+        "news": {"articles": [{"title": "a", "sha256": "1"}, {"title": "b", "sha256": "2"}]},
+        "market_snapshot": {"price": 10.0, "returns": {"1m": 0.1}},
+        "citations_map": {"x": "y"},
+    }
+    new = {
+        "news": {"articles": [{"title": "c", "sha256": "3"}, {"title": "a", "sha256": "1"}]},
+        "market_snapshot": {"price": 11.0, "returns": {"1m": 0.1}},
+        "guidance": {"guidance": ["raised"]},
+    }
+
+    ops = diff(old, new)
+
+    assert {op["op"] for op in ops} == {"list", "set", "remove"}
+    list_op = next(op for op in ops if op["op"] == "list")
+    assert list(list_op["values"].values()) == [{"title": "c", "sha256": "3"}]
+    assert apply(copy.deepcopy(old), ops) == new
+    assert diff(new, new) == []
+
+
+def test_pipeline_stores_deltas_with_periodic_snapshots(tmp_path, monkeypatch):
+    monkeypatch.setenv("STOCK_RUNS_DIR", str(tmp_path))
+    monkeypatch.setenv("STOCK_PACKET_SNAPSHOT_EVERY", "3")
+    get_settings.cache_clear()
+    index = RunIndex(str(tmp_path / "run_index.json"))
+
+    results = [
+        run_pipeline(ticker="ACME", as_of_date=date(2024, 1, day), mode="test", model_id="public:gpt-x")
+        for day in range(1, 5)
+    ]
+
+    entries = [index.find_by_run_id(result["run_id"]) for result in results]
+    assert [entry.get("packet_delta", {}).get("depth") for entry in entries] == [None, 1, 2, None]
+    assert entries[1]["analysis_packet_s3_path"].endswith("analysis_packet.delta.json")
+    packet = load_packet(entries[2]["analysis_packet_s3_path"])
+    assert packet["run_context"]["run_id"] == results[2]["run_id"]
+    assert packet["run_context"]["as_of_date"] == "2024-01-03"
+    get_settings.cache_clear()
+
+
+def test_rebuild_resolves_delta_bases_in_archives(tmp_path, monkeypatch):
+    monkeypatch.setenv("STOCK_RUNS_DIR", str(tmp_path))
+    get_settings.cache_clear()
+    index = RunIndex(str(tmp_path / "run_index.json"))
+    first, second = (
+        run_pipeline(ticker="ACME", as_of_date=date(2024, 1, day), mode="test", model_id="public:gpt-x")
+        for day in (1, 2)
+    )
+    assert index.find_by_run_id(second["run_id"])["packet_delta"]["base_run_id"] == first["run_id"]
+    engine = RetentionEngine(str(tmp_path), index, RetentionPolicy(keep_last_blocked=1), fsync=False)
+    assert engine.run(today=date(2024, 6, 1)).archived_runs == 1
+
+    (tmp_path / "run_index.json").write_text("{trunc", encoding="utf-8")
+    rebuilt = index.rebuild()
+
+    entry = rebuilt["ACME"][f"2024-01-02#{second['run_id']}"]
+    assert entry["packet_delta"]["base_run_id"] == first["run_id"]
+    assert rebuilt["ACME"][f"2024-01-01#{first['run_id']}"]["archived"]
+    get_settings.cache_clear()
@@ -1,6 +1,11 @@
+import json
 from datetime import date
+from pathlib import Path
+
+import pytest
 
 from src.core.config import get_settings
+from src.core.profiling import ProfilerBusyError, RunProfiler
 from src.core.storage.run_index import RunIndex
 from src.pipelines.stock_pipeline import run_pipeline
 
@@ -27,3 +32,39 @@ def test_run_pipeline_writes_outputs(tmp_path, monkeypatch):
     saved = run_index.find_by_run_id(result["run_id"])
     assert saved is not None
     assert saved["status"] == "blocked"
+
+
+def test_run_pipeline_profile_writes_trace(tmp_path, monkeypatch):
+    monkeypatch.setenv("STOCK_RUNS_DIR", str(tmp_path))
+    get_settings.cache_clear()
+
+    result = run_pipeline(
+        ticker="ACME",
+        as_of_date=date(2024, 1, 1),
+        mode="test",
+        model_id="public:gpt-x",
+        profile=True,
+    )
+
+    profile = json.loads(Path(result["profile_path"]).read_text(encoding="utf-8"))
+    stages = {stage["stage"] for stage in profile["stages"]}
+    assert {"init_run_context", "fetch_news", "render_report"} <= stages
+    assert profile["summary"]["peak_alloc_bytes"] > 0
+    collapsed = Path(result["profile_path"]).with_name("profile.collapsed")
+    assert collapsed.exists()
+    for line in collapsed.read_text(encoding="utf-8").splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert stack and int(count) > 0
+
+
+def test_only_one_profiler_runs_at_a_time():
+    first = RunProfiler()
+    first.start()
+    try:
+        with pytest.raises(ProfilerBusyError):
+            RunProfiler().start()
+    finally:
+        first.stop()
+    second = RunProfiler()
+    second.start()
+    second.stop()
@@ -0,0 +1,42 @@
+from datetime import date
+
+from src.core.config import get_settings
+from src.pipelines.prefetch import ProviderCache
+from src.pipelines.stock_pipeline import run_pipeline
+from src.tools import placeholder_tools
+
+
+def test_prefetch_batches_requests_and_pipeline_reads_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("STOCK_RUNS_DIR", str(tmp_path))
+    get_settings.cache_clear()
+    calls = {"bulk_market": [], "bulk_ownership": [], "single": 0}
+    bulk_market = placeholder_tools.fetch_market_data_bulk
+    bulk_ownership = placeholder_tools.fetch_ownership_and_holders_bulk
+
+    def single(*_args, **_kwargs):
+        calls["single"] += 1
+        raise AssertionError("pipeline should read the prefetched snapshot")
+
+    monkeypatch.setattr(
+        placeholder_tools,
+        "fetch_market_data_bulk",
+        lambda tickers, window: calls["bulk_market"].append(list(tickers)) or bulk_market(tickers, window),
+    )
+    monkeypatch.setattr(
+        placeholder_tools,
+        "fetch_ownership_and_holders_bulk",
+        lambda tickers: calls["bulk_ownership"].append(list(tickers)) or bulk_ownership(tickers),
+    )
+
+    tickers = ["AAA", "BBB", "CCC", "DDD", "EEE"]
+    cache = ProviderCache(batch_size=2)
+    cache.prefetch(tickers)
+    monkeypatch.setattr(placeholder_tools, "fetch_market_data", single)
+    monkeypatch.setattr(placeholder_tools, "fetch_ownership_and_holders", single)
+
+    for ticker in tickers:
+        run_pipeline(ticker, date(2024, 1, 1), "feeder", "public:gpt-x", provider_cache=cache)
+
+    assert calls["bulk_market"] == [["AAA", "BBB"], ["CCC", "DDD"], ["EEE"]]
+    assert len(calls["bulk_ownership"]) == 3
+    assert calls["single"] == 0
@@ -0,0 +1,58 @@
+import json
+import time
+from datetime import date
+
+import pytest
+
+from src.core.config import get_settings
+from src.core.recording import ReplayMissError
+from src.core.schemas.models import MarketSnapshot, NewsArticle, NewsBundle
+from src.core.storage.packet_delta import load_packet
+from src.core.storage.run_index import RunIndex
+from src.pipelines.providers import SOURCES
+from src.pipelines.stock_pipeline import run_pipeline
+from src.tools import placeholder_tools
+
+
+def _offline(*_args, **_kwargs):
+    raise AssertionError("replay must not call live providers")
+
+
+def test_replay_reruns_pipeline_without_provider_calls(tmp_path, monkeypatch):
+    monkeypatch.setenv("STOCK_RUNS_DIR", str(tmp_path))
+    monkeypatch.setenv("STOCK_RECORD_IO", "true")
+    get_settings.cache_clear()
+    monkeypatch.setattr(
+        placeholder_tools,
+        "fetch_news",
+        lambda ticker, days_back, recency_weighted: NewsBundle(
+            articles=[NewsArticle(title=f"{ticker} contract", date=date(2023, 12, 30), sha256="a1")]
+        ),
+    )
+    monkeypatch.setattr(
+        placeholder_tools, "fetch_market_data", lambda ticker, window: MarketSnapshot(price=12.5, **{"52w_high": 20.0})
+    )
+
+    recorded = run_pipeline("ACME", date(2024, 1, 1), "feeder", "public:gpt-x")
+    for name in SOURCES:
+        monkeypatch.setattr(placeholder_tools, name, _offline)
+    start = time.perf_counter()
+    replayed = run_pipeline("ACME", date(2024, 1, 1), "feeder", "public:gpt-x", replay_from=recorded["recording_path"])
+    elapsed = time.perf_counter() - start
+
+    original = load_packet(str(tmp_path / recorded["analysis_packet_path"]))
+    rerun = load_packet(str(tmp_path / replayed["analysis_packet_path"]))
+    assert "recording_path" not in replayed
+    assert replayed["run_id"] != recorded["run_id"]
+    assert f"{recorded['run_id']}/replays/{replayed['run_id']}/" in replayed["analysis_packet_path"]
+    assert json.dumps(rerun, sort_keys=True) == json.dumps(original, sort_keys=True)
+    assert rerun["market_snapshot"]["high_52w"] == 20.0
+    assert tmp_path.joinpath("training", "ACME", "2024-01-01", recorded["run_id"]).is_dir()
+    assert not tmp_path.joinpath("training", "ACME", "2024-01-01", replayed["run_id"]).exists()
+    index = RunIndex(str(tmp_path / "run_index.json"))
+    assert index.latest_run("ACME")["run_id"] == recorded["run_id"]
+    assert index.find_by_run_id(replayed["run_id"])["replay_of"] == recorded["run_id"]
+    assert elapsed < 1.0
+    with pytest.raises(ReplayMissError):
+        run_pipeline("OTHER", date(2024, 1, 1), "feeder", "public:gpt-x", replay_from=recorded["recording_path"])
+    get_settings.cache_clear()
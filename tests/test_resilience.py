@@ -0,0 +1,171 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+
+from src.core.config import get_settings
+from src.core.profiling import RunProfiler
+from src.core.resilience import BulkheadFullError, CircuitOpenError, Guard, GuardPolicy
+from src.core.schemas.models import SocialBundle
+from src.core.storage.packet_delta import load_packet
+from src.pipelines.providers import get_provider_guards
+from src.pipelines.stock_pipeline import run_pipeline
+from src.tools import placeholder_tools
+
+
+class FaultyProvider:
+    # Local stub: the first `slow_calls` calls block until released, and every
+    # call raises once `failing` is set.
+    def __init__(self, slow_calls=0):
+        self.calls = 0
+        self.slow_calls = slow_calls
+        self.failing = False
+        self.release = threading.Event()
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        if self.failing:
+            raise ConnectionError("injected failure")
+        if self.calls <= self.slow_calls:
+            self.release.wait(5)
+        return {"call": self.calls}
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        yield pool
+
+
+def test_guard_hedges_slow_requests(executor):
+    provider = FaultyProvider(slow_calls=1)
+    guard = Guard(GuardPolicy(slo_s=0.05, timeout_s=2.0), executor)
+
+    start = time.monotonic()
+    result = guard.call(provider)
+    provider.release.set()
+
+    assert result == {"call": 2}
+    assert time.monotonic() - start < 1.0
+    assert provider.calls == 2
+
+
+def test_breaker_opens_and_recovers(executor):
+    provider = FaultyProvider()
+    provider.failing = True
+    guard = Guard(GuardPolicy(failure_threshold=2, reset_after_s=0.1, hedge=False), executor)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            guard.call(provider)
+    with pytest.raises(CircuitOpenError):
+        guard.call(provider)
+    assert provider.calls == 2
+
+    time.sleep(0.15)
+    provider.failing = False
+    assert guard.call(provider) == {"call": 3}
+    assert guard.breaker.state == "closed"
+
+
+def test_bulkhead_isolates_a_hung_source():
+    hung = threading.Event()
+    calls = []
+
+    def hang():
+        calls.append(1)
+        hung.wait(5)
+
+    slow = Guard(GuardPolicy(slo_s=0.02, timeout_s=0.1, failure_threshold=100, max_concurrency=3), name="slow")
+    fast = Guard(GuardPolicy(timeout_s=1.0), name="fast")
+    try:
+        with pytest.raises(TimeoutError):
+            slow.call(hang)
+        assert len(calls) == 2
+        # Already timing out: no hedge, so this call takes the last slot only.
+        with pytest.raises(TimeoutError):
+            slow.call(hang)
+        assert len(calls) == 3
+        with pytest.raises(BulkheadFullError):
+            slow.call(hang)
+        assert len(calls) == 3
+        assert fast.call(lambda: "ok") == "ok"
+    finally:
+        hung.set()
+        slow.close()
+        fast.close()
+
+
+def test_full_bulkhead_does_not_open_the_circuit():
+    hung = threading.Event()
+    guard = Guard(GuardPolicy(timeout_s=0.05, failure_threshold=1, hedge=False, max_concurrency=1), name="busy")
+    try:
+        guard.breaker.state = "half_open"
+        guard._submit(hung.wait, (5,), {})
+        for _ in range(3):
+            with pytest.raises(BulkheadFullError):
+                guard.call(lambda: "ok")
+        assert guard.breaker.state == "half_open"
+        hung.set()
+        time.sleep(0.05)
+        assert guard.call(lambda: "ok") == "ok"
+        assert guard.breaker.state == "closed"
+    finally:
+        hung.set()
+        guard.close()
+
+
+def test_profiler_attributes_guard_workers_to_the_stage():
+    def spin():
+        deadline = time.thread_time() + 0.1
+        while time.thread_time() < deadline:
+            pass
+        return "ok"
+
+    guard = Guard(GuardPolicy(timeout_s=5.0, hedge=False), name="profiled")
+    profiler = RunProfiler(interval_s=0.002)
+    profiler.start()
+    try:
+        with profiler.stage("fetch_news"):
+            assert guard.call(spin) == "ok"
+    finally:
+        profiler.stop()
+        guard.close()
+
+    stage = profiler.report()["stages"][0]
+    assert stage["worker_cpu_s"] >= 0.1
+    assert stage["cpu_s"] >= stage["worker_cpu_s"]
+    assert any(line.startswith("fetch_news;") and "spin (" in line for line in profiler.collapsed().splitlines())
+
+
+def test_pipeline_degrades_tripped_providers(tmp_path, monkeypatch):
+    monkeypatch.setenv("STOCK_RUNS_DIR", str(tmp_path))
+    monkeypatch.setenv("STOCK_PROVIDER_TIMEOUT_S", "0.2")
+    monkeypatch.setenv("STOCK_PROVIDER_HEDGE", "false")
+    get_settings.cache_clear()
+    get_provider_guards.cache_clear()
+    hang = threading.Event()
+
+    def slow_social(*_args, **_kwargs):
+        hang.wait(5)
+        return SocialBundle()
+
+    monkeypatch.setattr(placeholder_tools, "fetch_social_sentiment", slow_social)
+    try:
+        first = run_pipeline("ACME", date(2024, 1, 1), "feeder", "public:gpt-x")
+        failing_news = FaultyProvider()
+        failing_news.failing = True
+        monkeypatch.setattr(placeholder_tools, "fetch_news", failing_news)
+        second = run_pipeline("ACME", date(2024, 1, 2), "feeder", "public:gpt-x")
+    finally:
+        hang.set()
+        get_provider_guards().close()
+        get_provider_guards.cache_clear()
+        get_settings.cache_clear()
+
+    first_gaps = load_packet(str(tmp_path / first["analysis_packet_path"]))["checklist"]["data_gaps"]
+    second_gaps = load_packet(str(tmp_path / second["analysis_packet_path"]))["checklist"]["data_gaps"]
+    assert "social: provider unavailable (timeout); no data" in first_gaps
+    assert any(gap.startswith("news: provider unavailable (error); using cached data") for gap in second_gaps)
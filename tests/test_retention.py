@@ -0,0 +1,122 @@
+import tarfile
+from datetime import date
+
+from src.core.storage.artifacts import read_artifact
+from src.core.storage.retention import RetentionEngine, RetentionPolicy
+from src.core.storage.run_index import RunIndex
+
+
+def _run(runs_dir, index, ticker, as_of_date, run_id, status):
+    run_dir = runs_dir / ticker / as_of_date / run_id
+    (run_dir / "report").mkdir(parents=True)
+    (run_dir / "report" / "report.md").write_text(f"report {run_id}")
+    training_dir = runs_dir / "training" / ticker / as_of_date / run_id
+    training_dir.mkdir(parents=True)
+    (training_dir / "trace.json").write_text("{}")
+    index.put(
+        ticker,
+        as_of_date,
+        run_id,
+        {
+            "run_id": run_id,
+            "status": status,
+            "approved": status == "approved",
+            "created_at": f"{as_of_date}T00:00:00",
+            "report_s3_path": str(run_dir / "report" / "report.md"),
+        },
+    )
+
+
+def test_retention_archives_old_blocked_runs(tmp_path):
+    index = RunIndex(str(tmp_path / "run_index.json"))
+    _run(tmp_path, index, "ACME", "2024-01-02", "approved-1", "approved")
+    for day in range(3, 7):
+        _run(tmp_path, index, "ACME", f"2024-01-0{day}", f"blocked-{day}", "blocked")
+    engine = RetentionEngine(str(tmp_path), index, RetentionPolicy(keep_last_blocked=1, min_age_days=30), fsync=False)
+
+    assert engine.run(today=date(2024, 6, 1), dry_run=True).archived_runs == 3
+    assert (tmp_path / "ACME" / "2024-01-03" / "blocked-3").exists()
+
+    first = engine.run(today=date(2024, 6, 1), max_runs=2)
+    second = engine.run(today=date(2024, 6, 1))
+
+    assert (first.archived_runs, first.remaining, second.archived_runs) == (2, 1, 1)
+    first_part = tmp_path / "archive" / "ACME" / "2024-01.part1.tar.gz"
+    archive = tmp_path / "archive" / "ACME" / "2024-01.part2.tar.gz"
+    with tarfile.open(first_part) as tar:
+        names = tar.getnames()
+    assert names[0] == "index_entries.json"
+    assert "ACME/2024-01-03/blocked-3/report/report.md" in names
+    assert "training/ACME/2024-01-04/blocked-4/trace.json" in names
+    with tarfile.open(archive) as tar:
+        assert "training/ACME/2024-01-05/blocked-5/trace.json" in tar.getnames()
+    entries = index.entries()["ACME"]
+    archived = entries["2024-01-05#blocked-5"]
+    assert archived["archived"] and archived["archive_path"] == str(archive)
+    assert read_artifact(archived["report_s3_path"]) == b"report blocked-5"
+    assert not (tmp_path / "ACME" / "2024-01-05").exists()
+    assert not entries["2024-01-06#blocked-6"].get("archived")
+    assert not entries["2024-01-02#approved-1"].get("archived")
+    assert (tmp_path / "ACME" / "2024-01-02" / "approved-1").exists()
+    assert engine.run(today=date(2024, 6, 1)).archived_runs == 0
+
+
+def test_rebuild_restores_archived_and_detached_entries(tmp_path):
+    index = RunIndex(str(tmp_path / "run_index.json"))
+    for day in range(3, 6):
+        _run(tmp_path, index, "ACME", f"2024-01-0{day}", f"blocked-{day}", "blocked")
+    index.put_detached("ACME", "2024-01-07", "carried-7", {"run_id": "carried-7", "carried_forward": True})
+    engine = RetentionEngine(str(tmp_path), index, RetentionPolicy(keep_last_blocked=0, min_age_days=30), fsync=False)
+    engine.run(today=date(2024, 6, 1), max_runs=1)
+    engine.run(today=date(2024, 6, 1), max_runs=1)
+    before = index.entries()
+
+    (tmp_path / "run_index.json").write_text("{trunc", encoding="utf-8")
+    rebuilt = index.rebuild()
+
+    assert rebuilt["ACME"]["2024-01-03#blocked-3"] == before["ACME"]["2024-01-03#blocked-3"]
+    assert rebuilt["ACME"]["2024-01-04#blocked-4"]["archive_path"].endswith("2024-01.part2.tar.gz")
+    assert rebuilt["ACME"]["2024-01-07#carried-7"]["carried_forward"]
+
+
+def _carried(index, ticker, as_of_date, run_id, source):
+    entry = index.entries()[ticker][source]
+    index.put_detached(
+        ticker,
+        as_of_date,
+        run_id,
+        {
+            **entry,
+            "run_id": run_id,
+            "created_at": f"{as_of_date}T00:00:00",
+            "carried_forward": True,
+            "carried_forward_from": entry["run_id"],
+        },
+    )
+
+
+def test_retention_archives_carried_forward_entries_and_pins_the_served_run(tmp_path):
+    index = RunIndex(str(tmp_path / "run_index.json"))
+    _run(tmp_path, index, "ACME", "2024-01-02", "orig-a", "approved")
+    _carried(index, "ACME", "2024-01-03", "carried-3", "2024-01-02#orig-a")
+    _carried(index, "ACME", "2024-01-04", "carried-4", "2024-01-02#orig-a")
+    _run(tmp_path, index, "ACME", "2024-02-01", "orig-b", "approved")
+    _carried(index, "ACME", "2024-02-02", "carried-5", "2024-02-01#orig-b")
+    engine = RetentionEngine(
+        str(tmp_path), index, RetentionPolicy(keep_approved=False, keep_last_blocked=0, min_age_days=30), fsync=False
+    )
+
+    assert engine.run(today=date(2024, 6, 1)).archived_runs == 4
+
+    entries = index.entries()["ACME"]
+    assert not entries["2024-02-01#orig-b"].get("archived")
+    assert (tmp_path / "ACME" / "2024-02-01" / "orig-b").exists()
+    assert all(entries[key]["archived"] for key in ("2024-01-02#orig-a", "2024-01-03#carried-3", "2024-02-02#carried-5"))
+    assert not (tmp_path / "ACME" / "2024-01-03" / "carried-3").exists()
+    assert read_artifact(entries["2024-01-04#carried-4"]["report_s3_path"]) == b"report orig-a"
+    assert read_artifact(entries["2024-02-02#carried-5"]["report_s3_path"]) == b"report orig-b"
+
+    (tmp_path / "run_index.json").write_text("{trunc", encoding="utf-8")
+    rebuilt = index.rebuild()["ACME"]
+    assert rebuilt["2024-01-03#carried-3"] == entries["2024-01-03#carried-3"]
+    assert read_artifact(rebuilt["2024-01-03#carried-3"]["report_s3_path"]) == b"report orig-a"
@@ -0,0 +1,235 @@
+import hashlib
+import io
+import threading
+
+import pytest
+
+from src.core.config import Settings, get_settings
+from src.core.storage.artifacts import read_artifact
+from src.core.storage import factory
+from src.core.storage.factory import close_storage, create_storage, get_storage
+from src.core.storage.local_storage import LocalStorage
+from src.core.storage.packet_delta import load_packet
+from src.core.storage.run_index import RunIndex
+from src.core.storage.s3_storage import S3Storage
+from src.core.storage.serialization import decode
+
+
+class NotFound(Exception):
+    response = {"Error": {"Code": "404"}}
+
+
+class PreconditionFailed(Exception):
+    response = {"Error": {"Code": "PreconditionFailed"}}
+
+
+class FakeS3Client:
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _record(self, name):
+        with self._lock:
+            self.calls.append(name)
+
+    def put_object(self, Bucket, Key, Body, ContentType=None, IfMatch=None, IfNoneMatch=None):
+        self._record("put_object")
+        with self._lock:
+            current = self.objects.get((Bucket, Key))
+            if IfNoneMatch == "*" and current is not None:
+                raise PreconditionFailed()
+            if IfMatch is not None and (current is None or _etag(current) != IfMatch):
+                raise PreconditionFailed()
+            self.objects[(Bucket, Key)] = bytes(Body)
+        return {"ETag": _etag(bytes(Body))}
+
+    def get_object(self, Bucket, Key):
+        self._record("get_object")
+        if (Bucket, Key) not in self.objects:
+            raise NotFound()
+        body = self.objects[(Bucket, Key)]
+        return {"Body": io.BytesIO(body), "ETag": _etag(body)}
+
+    def head_object(self, Bucket, Key):
+        self._record("head_object")
+        if (Bucket, Key) not in self.objects:
+            raise NotFound()
+        return {"ETag": _etag(self.objects[(Bucket, Key)])}
+
+    def list_objects_v2(self, Bucket, Prefix, Delimiter, ContinuationToken=None):
+        prefixes = sorted(
+            {
+                Prefix + key[len(Prefix):].split(Delimiter, 1)[0] + Delimiter
+                for bucket, key in self.objects
+                if bucket == Bucket and key.startswith(Prefix) and Delimiter in key[len(Prefix):]
+            }
+        )
+        return {"CommonPrefixes": [{"Prefix": prefix} for prefix in prefixes], "IsTruncated": False}
+
+    def create_multipart_upload(self, Bucket, Key, ContentType=None):
+        self._record("create_multipart_upload")
+        upload_id = f"upload-{len(self.uploads)}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self._record("upload_part")
+        self.uploads[UploadId][PartNumber] = bytes(Body)
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self._record("complete_multipart_upload")
+        parts = self.uploads.pop(UploadId)
+        numbers = [part["PartNumber"] for part in MultipartUpload["Parts"]]
+        self.objects[(Bucket, Key)] = b"".join(parts[number] for number in numbers)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self._record("abort_multipart_upload")
+        self.uploads.pop(UploadId, None)
+
+
+def _etag(body):
+    return f'"{hashlib.md5(body).hexdigest()}"'
+
+
+def test_s3_storage_batches_small_writes():
+    client = FakeS3Client()
+    storage = S3Storage("bucket", prefix="runs", client=client, batch_size=3)
+
+    path = storage.write_json("ACME/run-1/data.json", {"value": 42})
+    storage.write_text("ACME/run-1/notes.txt", "hello")
+
+    assert path == "s3://bucket/runs/ACME/run-1/data.json"
+    assert "put_object" not in client.calls
+    assert storage.read_json("ACME/run-1/data.json") == {"value": 42}
+    assert storage.exists("ACME/run-1/notes.txt")
+
+    storage.write_text("ACME/run-1/third.txt", "x")
+    assert client.calls.count("put_object") == 3
+    assert client.objects[("bucket", "runs/ACME/run-1/notes.txt")] == b"hello"
+    assert storage.list_runs() == ["ACME"]
+    assert not storage.exists("ACME/run-1/missing.json")
+    storage.close()
+
+
+def test_s3_storage_multipart_for_large_objects():
+    client = FakeS3Client()
+    storage = S3Storage(
+        "bucket", prefix="", client=client, multipart_threshold=1024, multipart_chunk_size=1
+    )
+    storage.multipart_chunk_size = 4096
+    body = bytes(range(256)) * 64
+
+    storage.write_bytes("big.bin", body)
+
+    assert client.calls.count("upload_part") == 4
+    assert client.objects[("bucket", "big.bin")] == body
+    assert storage.read_bytes("big.bin") == body
+    storage.close()
+
+
+def test_s3_storage_keeps_failed_writes_queued():
+    client = FakeS3Client()
+    storage = S3Storage("bucket", prefix="", client=client, batch_size=100)
+    put_object = client.put_object
+
+    def flaky_put(Bucket, Key, Body, **kwargs):
+        if Key == "b.txt":
+            raise ConnectionError("injected failure")
+        return put_object(Bucket, Key, Body, **kwargs)
+
+    client.put_object = flaky_put
+    storage.write_text("a.txt", "a")
+    storage.write_text("b.txt", "b")
+    with pytest.raises(RuntimeError, match="1 of 2"):
+        storage.flush()
+
+    assert client.objects == {("bucket", "a.txt"): b"a"}
+    assert storage.read_bytes("b.txt") == b"b"
+    client.put_object = put_object
+    storage.flush()
+    assert client.objects[("bucket", "b.txt")] == b"b"
+    storage.close()
+
+
+def test_s3_storage_multipart_supersedes_queued_write():
+    client = FakeS3Client()
+    storage = S3Storage("bucket", prefix="", client=client, batch_size=100, multipart_threshold=1024)
+    body = b"x" * 2048
+
+    storage.write_text("key.bin", "small")
+    storage.write_bytes("key.bin", body)
+
+    assert storage.read_bytes("key.bin") == body
+    storage.flush()
+    assert client.objects[("bucket", "key.bin")] == body
+    storage.close()
+
+
+def test_create_storage_selects_backend(tmp_path):
+    assert isinstance(create_storage(Settings(runs_dir=str(tmp_path))), LocalStorage)
+    with pytest.raises(ValueError):
+        create_storage(Settings(runs_dir=str(tmp_path), storage_backend="s3"))
+
+
+def test_get_storage_shares_one_backend_per_settings(tmp_path, monkeypatch):
+    close_storage()
+    closed = []
+    monkeypatch.setattr(LocalStorage, "close", lambda self: closed.append(self))
+    monkeypatch.setenv("STOCK_RUNS_DIR", str(tmp_path / "a"))
+    get_settings.cache_clear()
+    try:
+        first = get_storage()
+        assert get_storage() is first
+        assert closed == []
+
+        monkeypatch.setenv("STOCK_RUNS_DIR", str(tmp_path / "b"))
+        get_settings.cache_clear()
+        second = get_storage()
+        assert second is not first
+        assert closed == [first]
+
+        close_storage()
+        assert closed == [first, second]
+        assert factory._shared is None
+    finally:
+        close_storage()
+        get_settings.cache_clear()
+
+
+def test_run_index_and_artifacts_live_in_s3(tmp_path):
+    client = FakeS3Client()
+    storage = S3Storage("bucket", prefix="runs", client=client, batch_size=1)
+    packet_path = storage.write_json("ACME/2024-01-01/run-1/parsed/analysis_packet.json", {"ticker": "ACME"})
+    pipeline_index = RunIndex(str(tmp_path / "pipeline" / "run_index.json"), storage=storage)
+    server_index = RunIndex(str(tmp_path / "server" / "run_index.json"), storage=storage, version_ttl_s=0)
+
+    before = server_index.version()
+    pipeline_index.put("ACME", "2024-01-01", "run-1", {"run_id": "run-1", "analysis_packet_s3_path": packet_path})
+
+    assert ("bucket", "runs/run_index.json") in client.objects
+    assert not (tmp_path / "server" / "run_index.json").exists()
+    assert server_index.version() != before
+    entry = server_index.find_by_run_id("run-1")
+    assert decode(read_artifact(entry["analysis_packet_s3_path"], server_index.storage)) == {"ticker": "ACME"}
+    assert load_packet(entry["analysis_packet_s3_path"], storage=storage) == {"ticker": "ACME"}
+    with pytest.raises(FileNotFoundError):
+        storage.read_bytes("s3://bucket/runs/missing.json")
+
+    # A writer that lost the race re-reads and keeps the other writer's entry.
+    original = storage.read_versioned
+
+    def stale_once(path):
+        body, version = original(path)
+        storage.read_versioned = original
+        server_index.put("BETA", "2024-01-01", "run-2", {"run_id": "run-2"})
+        return body, version
+
+    storage.read_versioned = stale_once
+    pipeline_index.put("ACME", "2024-01-02", "run-3", {"run_id": "run-3"})
+    assert {"run-1", "run-2", "run-3"} <= {
+        entry["run_id"] for entries in server_index.entries().values() for entry in entries.values()
+    }
+    storage.close()
@@ -0,0 +1,25 @@
+from datetime import date
+
+import pytest
+
+from src.core.schemas.models import NewsArticle, NewsBundle, SocialBundle, trusted, trusted_list
+
+
+def test_trusted_models_match_validated_models():
+    rows = [
+        {"title": "Launch delayed", "date": date(2024, 1, 2), "url": "https://news.example.com/1"},
+        {"title": "Contract signed", "source": "wire"},
+    ]
+    posts = [{"platform": "x", "text": "bullish", "posted_at": "2024-01-01T00:00:00"}]
+
+    news = trusted(NewsBundle, articles=trusted_list(NewsArticle, rows))
+    social = trusted(SocialBundle, notable_posts=posts)
+
+    assert news.model_dump() == NewsBundle(articles=rows).model_dump()
+    assert news.model_dump_json() == NewsBundle(articles=rows).model_dump_json()
+    assert social.model_dump() == SocialBundle(notable_posts=posts).model_dump()
+    assert social.notable_posts is posts
+    assert news.articles[1].model_fields_set == {"title", "source"}
+    assert trusted(SocialBundle).themes is not trusted(SocialBundle).themes
+    with pytest.raises(TypeError):
+        trusted(NewsArticle, url="https://news.example.com/2")
@@ -0,0 +1,67 @@
+import json
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from src.core.config import get_settings
+from src.core.storage import serialization
+from src.core.storage.local_storage import LocalStorage
+from src.core.storage.serialization import Serializer, decode
+from src.pipelines.stock_pipeline import run_pipeline
+
+PAYLOAD = {"ticker": "ACME", "as_of_date": date(2024, 1, 1), "scores": [0.5, 1.0], "nested": {"ok": True}}
+EXPECTED = {"ticker": "ACME", "as_of_date": "2024-01-01", "scores": [0.5, 1.0], "nested": {"ok": True}}
+
+
+def _serializers():
+    serializers = [Serializer("json"), Serializer("compact")]
+    if serialization.msgpack is not None:
+        serializers.append(Serializer("msgpack"))
+    if serialization.zstandard is not None:
+        serializers.append(Serializer("compact", "zstd"))
+    return serializers
+
+
+@pytest.mark.parametrize("serializer", _serializers(), ids=lambda s: f"{s.format}-{s.compression}")
+def test_storage_reads_any_serialization_format(tmp_path, serializer):
+    writer = LocalStorage(str(tmp_path), serializer=serializer)
+    writer.write_json("run-1/data.json", PAYLOAD)
+
+    reader = LocalStorage(str(tmp_path))
+    assert reader.read_json("run-1/data.json") == EXPECTED
+
+
+def test_compact_json_is_smaller_than_indented():
+    assert len(Serializer("compact").encode(EXPECTED)) < len(Serializer("json").encode(EXPECTED))
+    assert decode(Serializer("json").encode(EXPECTED)) == EXPECTED
+
+
+def test_plain_json_artifacts_are_compact(tmp_path):
+    storage = LocalStorage(str(tmp_path), serializer=Serializer("json"))
+    storage.write_plain_json("run-1/profile.json", EXPECTED)
+
+    body = tmp_path.joinpath("run-1", "profile.json").read_bytes()
+    assert json.loads(body) == EXPECTED
+    assert b"\n" not in body
+
+
+def test_serializer_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        Serializer("yaml")
+
+
+@pytest.mark.skipif(serialization.msgpack is None, reason="msgpack not installed")
+def test_client_facing_artifacts_stay_json(tmp_path, monkeypatch):
+    monkeypatch.setenv("STOCK_RUNS_DIR", str(tmp_path))
+    monkeypatch.setenv("STOCK_SERIALIZATION_FORMAT", "msgpack")
+    get_settings.cache_clear()
+
+    result = run_pipeline(ticker="ACME", as_of_date=date(2024, 1, 1), mode="test", model_id="public:gpt-x")
+
+    packet = json.loads(Path(result["analysis_packet_path"]).read_text(encoding="utf-8"))
+    assert packet["run_context"]["run_id"] == result["run_id"]
+    assert json.loads(Path(result["citations_map_path"]).read_text(encoding="utf-8")) == {}
+    training = next(tmp_path.glob("training/ACME/*/*/metadata.json"))
+    assert training.read_bytes()[0] >= 0x80
+    get_settings.cache_clear()
@@ -0,0 +1,212 @@
+import importlib
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.core.config import get_settings
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setenv("STOCK_RUNS_DIR", str(tmp_path))
+    get_settings.cache_clear()
+    import services.mcp_server.main as main
+
+    main = importlib.reload(main)
+    yield main
+    if main.router.initialized:
+        main.router.get().close()
+    if main.registry.initialized:
+        main.registry.get().stop_watching()
+    get_settings.cache_clear()
+
+
+def test_model_generate_streams_ndjson(server):
+    client = TestClient(server.app)
+
+    with client.stream(
+        "POST",
+        "/v1/model/generate",
+        json={"model_id": "public:gpt-x", "messages": [{"role": "user", "content": "hi"}], "run_id": "run-1", "stream": True},
+    ) as response:
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        events = [json.loads(line) for line in response.iter_lines() if line]
+
+    tokens = [event["text"] for event in events if event["type"] == "token"]
+    assert "".join(tokens) == "Model routing placeholder response."
+    assert events[-1]["type"] == "done"
+    assert events[-1]["usage"]["completion_tokens"] == len(tokens)
+    assert server.router.get()._trace[-1]["status"] == "completed"
+
+    plain = client.post(
+        "/v1/model/generate",
+        json={"model_id": "public:gpt-x", "messages": [], "run_id": "run-2"},
+    ).json()
+    assert plain["text"] == "Model routing placeholder response."
+
+
+def test_model_generate_refuses_context_refs_outside_runs_dir(server, tmp_path):
+    client = TestClient(server.app)
+    tmp_path.joinpath("ACME").mkdir()
+    tmp_path.joinpath("ACME", "notes.md").write_text("Cash runway is short.", encoding="utf-8")
+    outside = tmp_path.parent / "outside.md"
+    outside.write_text("secret", encoding="utf-8")
+    request = {"model_id": "public:gpt-x", "messages": [{"role": "user", "content": "runway?"}], "run_id": "run-1"}
+
+    for ref in ["/etc/passwd", str(outside), "../outside.md", "ACME/../../outside.md", "archive/x.tar.gz#../../etc/passwd"]:
+        response = client.post("/v1/model/generate", json={**request, "context_refs": [ref]})
+        assert response.status_code == 400, ref
+    assert not server.router.initialized or not server.router.get()._trace
+
+    assert client.post("/v1/model/generate", json={**request, "context_refs": ["ACME/notes.md"]}).status_code == 200
+    assert server.router.get()._trace[-1]["context_chunks"] == ["notes.md#0"]
+
+
+def _approved_run(main, ticker, run_id):
+    storage = main.storage.get()
+    report_path = storage.write_text(f"{ticker}/2024-01-01/{run_id}/report/final_report.md", "# Report\n\nCash runway is short.")
+    packet_path = storage.write_json(f"{ticker}/2024-01-01/{run_id}/parsed/analysis_packet.json", {"ticker": ticker})
+    main.run_index.get().put(
+        ticker,
+        "2024-01-01",
+        run_id,
+        {
+            "run_id": run_id,
+            "status": "approved",
+            "created_at": f"2024-01-01T00:00:0{run_id[-1]}",
+            "report_s3_path": report_path,
+            "analysis_packet_s3_path": packet_path,
+        },
+    )
+
+
+def test_analysis_snapshot_supports_etag_and_gzip(server, tmp_path):
+    client = TestClient(server.app)
+    _approved_run(server, "ACME", "run-1")
+
+    response = client.get("/v1/analysis/acme")
+    etag = response.headers["etag"]
+    assert response.status_code == 200
+    assert etag.startswith('"') and etag.endswith('"')
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json()["analysis_packet"] == {"ticker": "ACME"}
+    assert response.json()["report"].startswith("# Report")
+
+    not_modified = client.get("/v1/analysis/ACME", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+
+    # The same run's index entry changes: the body and its ETag follow.
+    index = server.run_index.get()
+    entry = index.find_by_run_id("run-1")
+    index.update_entries({"ACME": {"2024-01-01#run-1": {**entry, "carried_forward_to": ["run-9"]}}})
+    updated = client.get("/v1/analysis/ACME", headers={"If-None-Match": etag})
+    assert updated.status_code == 200
+    assert updated.json()["entry"]["carried_forward_to"] == ["run-9"]
+    assert updated.headers["etag"] != etag
+
+    _approved_run(server, "ACME", "run-2")
+    refreshed = client.get("/v1/analysis/ACME", headers={"If-None-Match": updated.headers["etag"]})
+    assert refreshed.status_code == 200
+    assert refreshed.json()["run_id"] == "run-2"
+    assert tmp_path.joinpath("snapshots", "ACME.snapshot").exists()
+
+    assert client.get("/v1/analysis/NOPE").status_code == 404
+
+
+def test_query_streams_ndjson_for_approved_run(server):
+    client = TestClient(server.app)
+    _approved_run(server, "ACME", "run-1")
+
+    with client.stream(
+        "POST", "/v1/query", json={"ticker": "ACME", "query_text": "What is the runway?", "stream": True}
+    ) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        events = [json.loads(line) for line in response.iter_lines() if line]
+
+    assert "".join(event["text"] for event in events if event["type"] == "token") == "Model routing placeholder response."
+    assert events[-1]["type"] == "done" and events[-1]["trace_id"] == "run-1"
+    trace = server.router.get()._trace[-1]
+    assert trace["stream"] and trace["context_chunks"]
+
+
+def test_healthz_is_ready_before_subsystems_load(server):
+    client = TestClient(server.app)
+
+    assert client.get("/healthz").json() == {"status": "ok"}
+    assert not server.run_index.initialized
+    assert not server.router.initialized
+
+    assert client.get("/v1/models").status_code == 200
+    assert server.registry.initialized
+
+
+def test_metrics_endpoint_reports_route_latency(server):
+    client = TestClient(server.app)
+    client.get("/healthz")
+    client.get("/v1/run/missing")
+
+    text = client.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="GET",route="/healthz",status="200"}' in text
+    assert 'route="/v1/run/{run_id}",status="404"' in text
+    assert 'run_index_operation_seconds_count{operation="find_by_run_id"}' in text
+
+
+def test_streamed_responses_stay_in_flight_until_sent(server):
+    seen = []
+
+    def body():
+        yield b"first\n"
+        time.sleep(0.05)
+        seen.append(server.HTTP_IN_FLIGHT.value(route="/test/stream"))
+        yield b"second\n"
+
+    server.app.add_api_route("/test/stream", lambda: server.StreamingResponse(body()))
+    client = TestClient(server.app)
+
+    assert client.get("/test/stream").text == "first\nsecond\n"
+    assert seen == [1]
+    assert server.HTTP_IN_FLIGHT.value(route="/test/stream") == 0
+
+
+def test_run_diff_endpoint(server, tmp_path):
+    client = TestClient(server.app)
+    first = client.post("/v1/run", json={"ticker": "ACME", "as_of_date": "2024-01-01"}).json()
+    second = client.post("/v1/run", json={"ticker": "ACME", "as_of_date": "2024-01-02"}).json()
+
+    stored = client.get(f"/v1/run/{second['run_id']}/diff").json()
+    computed = client.get(f"/v1/run/{first['run_id']}/diff", params={"against": second["run_id"]}).json()
+
+    assert stored["base_run_id"] == first["run_id"]
+    assert stored["changed_sections"] == ["run_context"]
+    assert computed["base_run_id"] == second["run_id"]
+    assert client.get(f"/v1/run/{first['run_id']}/diff").json()["ops"] == []
+    assert client.get("/v1/run/missing/diff").status_code == 404
+
+
+def test_query_batch_streams_each_result(server):
+    client = TestClient(server.app)
+    _approved_run(server, "ACME", "run-1")
+    _approved_run(server, "BETA", "run-2")
+
+    queries = [
+        {"ticker": "acme", "query_text": "What is the cash runway?"},
+        {"ticker": "BETA", "query_text": "give me the analysis"},
+        {"ticker": "NOPE", "query_text": "Anything?"},
+        {"ticker": "ACME", "query_text": "Who are the holders?"},
+    ]
+    with client.stream("POST", "/v1/query/batch", json={"queries": queries, "max_concurrency": 2}) as response:
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        events = [json.loads(line) for line in response.iter_lines() if line]
+
+    results = {event["index"]: event for event in events if event["type"] == "result"}
+    assert sorted(results) == [0, 1, 2, 3]
+    assert results[0]["status"] == "ok" and results[0]["run_id"] == "run-1"
+    assert results[0]["response"]["text"] == "Model routing placeholder response."
+    assert results[1]["response"]["report_path"].endswith("final_report.md")
+    assert results[2]["status"] == "not_found"
+    assert events[-1] == {"type": "done", "count": 4, "errors": 1}
+
+    assert client.post("/v1/query/batch", json={"queries": []}).status_code == 422
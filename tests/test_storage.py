@@ -1,8 +1,13 @@
+import os
 from datetime import date
 
+import pytest
+
+from src.core.storage import atomic
 from src.core.storage.local_storage import LocalStorage
 from src.core.storage.run_index import RunIndex
 from src.core.storage.training_writer import TrainingArtifactWriter
+from src.core.storage.write_behind import WriteBehindStorage
 from src.tools import placeholder_tools
 
 
@@ -83,3 +88,87 @@ def test_init_run_context_creates_directories(tmp_path):
     assert tmp_path.joinpath(context.paths.parsed_path).exists()
     assert tmp_path.joinpath(context.paths.report_path).exists()
     assert tmp_path.joinpath(context.paths.trace_path).exists()
+
+
+def test_write_behind_storage_flushes_in_background(tmp_path):
+    storage = WriteBehindStorage(LocalStorage(str(tmp_path)))
+
+    json_path = storage.write_json("run-1/parsed/data.json", {"value": 42})
+    storage.write_text("run-1/report/final_report.md", "# Report")
+
+    assert not tmp_path.joinpath("run-1", "parsed", "data.json").exists()
+    assert storage.read_json("run-1/parsed/data.json") == {"value": 42}
+    assert storage.exists("run-1/report/final_report.md")
+
+    storage.flush()
+    storage.wait()
+
+    assert json_path == str(tmp_path / "run-1" / "parsed" / "data.json")
+    assert tmp_path.joinpath("run-1", "parsed", "data.json").read_text(encoding="utf-8") == '{"value":42}'
+    assert tmp_path.joinpath("run-1", "report", "final_report.md").read_text(encoding="utf-8") == "# Report"
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_write_behind_publishes_only_after_persisting(tmp_path, caplog):
+    storage = WriteBehindStorage(LocalStorage(str(tmp_path)))
+    published = []
+
+    storage.write_text("run-1/report/final_report.md", "# Report")
+    storage.flush_then(lambda: published.append(tmp_path.joinpath("run-1", "report", "final_report.md").exists()))
+    storage.wait()
+    assert published == [True]
+
+    tmp_path.joinpath("run-2").write_text("not a directory", encoding="utf-8")
+    storage.write_text("run-2/report/final_report.md", "# Report")
+    storage.flush_then(lambda: published.append(True))
+    with pytest.raises(OSError):
+        storage.wait()
+    assert published == [True]
+    assert "Write-behind batch of 1 artifacts failed" in caplog.text
+
+
+def test_local_storage_fsync_policies(tmp_path):
+    for policy in ("always", "batch", "never"):
+        storage = LocalStorage(str(tmp_path / policy), fsync_policy=policy)
+        storage.write_json("run-1/data.json", {"policy": policy})
+        storage.flush()
+        assert storage.read_json("run-1/data.json") == {"policy": policy}
+        assert not list((tmp_path / policy).rglob("*.tmp"))
+
+    with pytest.raises(ValueError):
+        LocalStorage(str(tmp_path), fsync_policy="sometimes")
+
+
+def test_run_index_rebuilds_after_truncated_write(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    context = placeholder_tools.init_run_context("ACME", date(2024, 1, 1), "test", "public:gpt-x", storage)
+    storage.write_json(
+        f"{context.paths.parsed_path}/analysis_packet.json",
+        {"run_context": context.model_dump(), "persona_review": {"approved": True}},
+    )
+    storage.write_text(f"{context.paths.report_path}/final_report.md", "# Report")
+    tmp_path.joinpath("run_index.json").write_text('{"ACME": {"2024-01-01#', encoding="utf-8")
+
+    run_index = RunIndex(str(tmp_path / "run_index.json"))
+    assert run_index.recover() is True
+
+    latest = run_index.latest_approved("ACME")
+    assert latest["run_id"] == context.run_id
+    assert latest["created_at"] == context.created_at.isoformat()
+    assert latest["report_s3_path"] == storage.path(f"{context.paths.report_path}/final_report.md")
+    assert run_index.recover() is False
+
+
+def test_batch_policy_syncs_file_contents_before_rename(tmp_path, monkeypatch):
+    calls = []
+    replace = os.replace
+    monkeypatch.setattr(atomic.os, "fsync", lambda fd: calls.append("fsync"))
+    monkeypatch.setattr(atomic.os, "replace", lambda src, dst: (calls.append("rename"), replace(src, dst)))
+    storage = LocalStorage(str(tmp_path), fsync_policy="batch")
+
+    storage.write_text("run-1/report/final_report.md", "# Report")
+    storage.write_text("run-1/report/citations_map.json", "{}")
+    assert calls == ["fsync", "rename", "fsync", "rename"]
+
+    storage.flush()
+    assert calls[4:] == ["fsync"]
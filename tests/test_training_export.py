@@ -0,0 +1,75 @@
+from src.core.storage.local_storage import LocalStorage
+from src.core.storage.run_index import RunIndex
+from src.core.storage.training_export import TrainingDatasetExporter, iter_training_records
+from src.core.storage.training_writer import TrainingArtifactWriter
+
+
+def _write_run(storage, index, ticker, as_of_date, run_id):
+    TrainingArtifactWriter(storage).write(
+        f"training/{ticker}/{as_of_date}/{run_id}",
+        {
+            "analysis_packet": {"ticker": ticker, "padding": "x" * 200},
+            "final_report": f"report for {run_id}",
+            "metadata": {"approved": True},
+        },
+    )
+    # The pipeline's run directory, where the index keeps its entry copy.
+    storage.ensure_dir(f"{ticker}/{as_of_date}/{run_id}")
+    index.put(ticker, as_of_date, run_id, {"run_id": run_id, "status": "approved"})
+
+
+def test_exporter_shards_and_appends_incrementally(tmp_path, monkeypatch):
+    storage = LocalStorage(str(tmp_path))
+    index = RunIndex(str(tmp_path / "run_index.json"))
+    for number in range(5):
+        _write_run(storage, index, "ACME", "2024-01-01", f"run-{number}")
+    # A carried-forward entry has no training data of its own.
+    index.put("ACME", "2024-01-02", "carried", {"run_id": "carried", "carried_forward": True})
+
+    exporter = TrainingDatasetExporter(str(tmp_path), max_shard_bytes=600, run_index=index)
+    manifest = exporter.export()
+
+    assert manifest["records"] == 5
+    assert len(manifest["shards"]) > 1
+    assert all(tmp_path.joinpath("datasets", "training", shard["path"]).exists() for shard in manifest["shards"])
+
+    shard_count = len(manifest["shards"])
+    assert exporter.export()["records"] == 5
+    assert len(exporter.load_manifest()["shards"]) == shard_count
+
+    # Only runs published after the previous export are read again.
+    built = []
+    build_record = exporter._build_record
+
+    def tracked(run_dir):
+        built.append(run_dir.name)
+        return build_record(run_dir)
+
+    monkeypatch.setattr(exporter, "_build_record", tracked)
+    _write_run(storage, index, "BETA", "2023-06-30", "run-new")
+    manifest = exporter.export()
+    assert manifest["records"] == 6
+    assert manifest["shards"][-1]["records"] == 1
+    assert built == ["run-new"]
+    assert manifest["exported_through"] == index.find_by_run_id("run-new")["indexed_at"]
+
+    records = list(iter_training_records(exporter.output_dir, fields=["ticker", "run_id", "final_report"]))
+    assert [record["run_id"] for record in records][-1] == "run-new"
+    assert records[0] == {"ticker": "ACME", "run_id": "run-0", "final_report": "report for run-0"}
+
+
+def test_export_after_index_rebuild_picks_up_new_runs(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    index = RunIndex(str(tmp_path / "run_index.json"))
+    exporter = TrainingDatasetExporter(str(tmp_path), run_index=index)
+    _write_run(storage, index, "ACME", "2024-01-01", "run-old")
+    assert exporter.export()["records"] == 1
+
+    _write_run(storage, index, "ACME", "2024-01-02", "run-new")
+    index.path.write_text("{not json", encoding="utf-8")
+    assert index.recover()
+
+    assert index.find_by_run_id("run-new")["indexed_at"]
+    manifest = exporter.export()
+    assert manifest["records"] == 2
+    assert [record["run_id"] for record in iter_training_records(exporter.output_dir)] == ["run-old", "run-new"]
@@ -0,0 +1,102 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core.queue.backend import LeaseKeeper
+from src.core.queue.sqlite_queue import SQLiteWorkQueue
+
+
+def _items(count):
+    return [{"ticker": f"T{index}", "as_of_date": "2024-01-01"} for index in range(count)]
+
+
+def test_concurrent_workers_claim_each_task_once(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.sqlite3"))
+    assert queue.enqueue(_items(40)) == 40
+    assert queue.enqueue(_items(40)) == 0
+
+    def worker(name):
+        done = []
+        while (lease := queue.claim(name, lease_seconds=30)) is not None:
+            assert queue.complete(lease, {"status": "ok"})
+            done.append(lease.payload["ticker"])
+        return done
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(worker, ["w1", "w2", "w3", "w4"]))
+
+    claimed = [ticker for done in results for ticker in done]
+    assert sorted(claimed) == sorted(item["ticker"] for item in _items(40))
+    assert queue.stats() == {"pending": 0, "leased": 0, "done": 40, "failed": 0}
+
+
+def test_expired_lease_is_requeued_and_stale_owner_cannot_complete(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.sqlite3"), max_attempts=2)
+    queue.enqueue(_items(1))
+
+    crashed = queue.claim("crashed", lease_seconds=0.05)
+    time.sleep(0.1)
+    retry = queue.claim("healthy", lease_seconds=30)
+
+    assert retry.task_id == crashed.task_id
+    assert retry.attempts == 2
+    assert not queue.complete(crashed)
+    assert queue.complete(retry)
+
+
+def test_failures_retry_until_max_attempts(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.sqlite3"), max_attempts=2)
+    queue.enqueue(_items(1))
+
+    queue.fail(queue.claim("w", lease_seconds=30), "boom")
+    queue.fail(queue.claim("w", lease_seconds=30), "boom")
+
+    assert queue.claim("w", lease_seconds=30) is None
+    assert queue.stats()["failed"] == 1
+
+
+def test_lease_keeper_renews_while_working(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.sqlite3"))
+    queue.enqueue(_items(1))
+    lease = queue.claim("w", lease_seconds=0.2)
+
+    with LeaseKeeper(queue, lease, lease_seconds=0.2, interval_seconds=0.05) as keeper:
+        time.sleep(0.5)
+        assert queue.claim("other", lease_seconds=30) is None
+
+    assert not keeper.lost.is_set()
+    assert queue.complete(lease)
+
+
+def test_worker_completes_lease_only_after_write_behind_persists(tmp_path, monkeypatch):
+    import argparse
+
+    from scripts import daily_watchlist_runner
+    from src.core.storage.local_storage import LocalStorage
+    from src.core.storage.write_behind import WriteBehindStorage
+
+    storage = WriteBehindStorage(LocalStorage(str(tmp_path / "runs")))
+    report = tmp_path / "runs" / "T0" / "final_report.md"
+    published = []
+
+    def process_ticker(ticker, as_of_date, args, run_index):
+        storage.write_text(f"{ticker}/final_report.md", "# Report")
+        storage.flush_then(lambda: published.append(ticker))
+        return {"run_id": "run-1", "status": "approved"}
+
+    queue = SQLiteWorkQueue(str(tmp_path / "queue.sqlite3"))
+    complete = queue.complete
+    seen = []
+
+    def checked_complete(lease, result):
+        seen.append((report.exists(), list(published)))
+        return complete(lease, result)
+
+    monkeypatch.setattr(queue, "complete", checked_complete)
+    monkeypatch.setattr(daily_watchlist_runner, "process_ticker", process_ticker)
+    monkeypatch.setattr(daily_watchlist_runner, "get_storage", lambda: storage)
+    queue.enqueue(_items(1))
+    args = argparse.Namespace(worker_id="w1", wait=0.0)
+
+    assert daily_watchlist_runner.run_worker(args, queue, None, lease_seconds=30) == 1
+    assert seen == [(True, ["T0"])]
+    assert queue.stats()["done"] == 1